@@ -264,9 +264,10 @@ class FetchAIOrchestrator:
                 }
                 self.pending_requests[msg.request_id]["status"] = "completed"
     
-    async def process_knowledge_ingestion(self, knowledge_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_knowledge_ingestion(self, knowledge_data: Dict[str, Any], raise_transient: bool = False) -> Dict[str, Any]:
         """
         Orchestrate the full knowledge ingestion pipeline using decentralized agents
+        (raise_transient: see IngestionAgent.process)
         """
         request_id = f"ingest_{datetime.now(timezone.utc).timestamp()}"
         
@@ -294,7 +295,7 @@ class FetchAIOrchestrator:
         ingestion = IngestionAgent()
         encoder = SymbolicEncoder()
         
-        processed = await ingestion.process(knowledge_data)
+        processed = await ingestion.process(knowledge_data, raise_transient=raise_transient)
         symbolic = await encoder.encode(processed)
         
         return {
@@ -4,8 +4,192 @@ Uses ASI Cloud (CUDOS) for intelligent keyword extraction
 """
 import re
 import os
-from typing import Dict, Any, List
+import copy
+import json
+import time
+import asyncio
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
 import openai
+from agents.llm_client import LLM_CALL_TIMEOUT, TransientLLMError, is_transient
+from agents.llm_gateway import complete
+from storage.disk_cache import DiskCache, cache_key
+from storage.keyword_matcher import KeywordMatcher
+from storage.text_analysis import analyze
+
+# Part of the extraction cache key: bump it whenever a prompt, the schema or the
+# response parsing changes, so results produced by the old version are not reused
+EXTRACTION_PROMPT_VERSION = 1
+
+# Keyword vocabularies for the non-LLM fallbacks, compiled into one automaton:
+# a single pass over the analyzed content finds every group's hits, whole words only
+FALLBACK_KEYWORDS = {
+    "concepts": {
+        word: [word] for word in [
+            "community", "wisdom", "ancestor", "unity", "respect",
+            "fairness", "justice", "harmony", "balance", "truth",
+            "family", "elder", "tradition", "spirit", "nature"
+        ]
+    },
+    "themes": {
+        "collective_good": ["community", "together", "we", "collective"],
+        "wisdom": ["wisdom", "knowledge", "learn", "teach"],
+        "ethics": ["right", "wrong", "moral", "virtue", "honor"],
+        "nature": ["earth", "nature", "land", "water", "tree"],
+        "spirituality": ["spirit", "ancestor", "divine", "sacred"]
+    },
+    "values": {word: [word] for word in ["respect", "honor", "truth", "justice", "fairness", "unity"]},
+    "actions": {word: [word] for word in ["share", "give", "help", "teach", "learn", "protect"]},
+    "patterns": {
+        "collective_good": ["community", "together", "we", "collective", "shared"],
+        "wisdom_transmission": ["ancestor", "elder", "teach", "learn", "tradition"],
+        "ethics": ["right", "wrong", "moral", "virtue", "honor", "just"],
+        "humility": ["humble", "modest", "return", "origin", "home"],
+        "reciprocity": ["give", "receive", "exchange", "mutual", "share"],
+        "resilience": ["overcome", "endure", "persist", "strength", "survive"],
+        "truth_integrity": ["truth", "honest", "authentic", "genuine", "real"],
+        "human_dignity": ["respect", "dignity", "worth", "value", "honor"]
+    },
+    # A proverb about returning home is likely about humility
+    "humility_proverb": {"humility": ["return", "home", "origin"]},
+}
+FALLBACK_MATCHER = KeywordMatcher(FALLBACK_KEYWORDS)
+
+# Reasoning pattern types the LLM may assign, with the description shown in prompts
+PATTERN_TYPES = {
+    "collective_good": "prioritizing community over individual",
+    "wisdom_transmission": "passing knowledge across generations",
+    "ethics": "moral principles and values",
+    "nature_harmony": "balance with natural world",
+    "spirituality": "connection to ancestors/divine",
+    "reciprocity": "mutual exchange and fairness",
+    "respect_hierarchy": "honoring elders/authority",
+    "unity_diversity": "strength in togetherness",
+    "resilience": "overcoming adversity",
+    "humility": "recognizing limitations",
+    "truth_integrity": "honesty and authenticity",
+    "human_dignity": "inherent worth of all people",
+}
+PATTERN_CHOICES = "\n".join(f"- {name} ({description})" for name, description in PATTERN_TYPES.items())
+
+# Structured output for fused extraction: everything the three separate prompts return
+STRING_LIST = {"type": "array", "items": {"type": "string"}}
+EXTRACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "concepts": {**STRING_LIST, "maxItems": 7},
+        "entities": {
+            "type": "object",
+            "properties": {"values": STRING_LIST, "concepts": STRING_LIST, "actions": STRING_LIST},
+            "required": ["values", "concepts", "actions"],
+            "additionalProperties": False
+        },
+        "patterns": {"type": "array", "items": {"type": "string", "enum": list(PATTERN_TYPES)}}
+    },
+    "required": ["concepts", "entities", "patterns"],
+    "additionalProperties": False
+}
+
+# Batched extraction: several documents per structured request, demultiplexed by "id"
+BATCH_EXTRACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "documents": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, **EXTRACTION_SCHEMA["properties"]},
+                "required": ["id", *EXTRACTION_SCHEMA["required"]],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["documents"],
+    "additionalProperties": False
+}
+CHARS_PER_TOKEN = 4
+# Completion tokens allowed per document in a batch (a single fused call allows 300)
+BATCH_TOKENS_PER_DOCUMENT = 250
+
+
+def parse_extraction(text: str) -> Dict[str, Any]:
+    """JSON object from a completion, tolerating reasoning blocks, code fences and chatter"""
+    text = re.sub(r"<think>.*?</think>", "", text or "", flags=re.DOTALL)
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        parsed = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def clean_terms(values: Any, limit: Optional[int] = None) -> Optional[List[str]]:
+    """Lowercased, de-duplicated strings from a JSON list; None if it isn't one"""
+    if not isinstance(values, list):
+        return None
+    cleaned = list(dict.fromkeys(v.strip().lower() for v in values if isinstance(v, str) and v.strip()))
+    return cleaned[:limit] if limit else cleaned
+
+
+def validate_extraction(parsed: Dict[str, Any]) -> Tuple[Optional[List[str]], Optional[Dict[str, List[str]]], Optional[List[str]]]:
+    """Cleaned (concepts, entities, patterns) from a parsed completion; None for a missing or malformed field"""
+    concepts = clean_terms(parsed.get("concepts"), limit=7) or None
+    
+    entities = parsed.get("entities")
+    if isinstance(entities, dict) and any(isinstance(entities.get(k), list) for k in ("values", "concepts", "actions")):
+        entities = {k: clean_terms(entities.get(k)) or [] for k in ("values", "concepts", "actions")}
+    else:
+        entities = None
+    
+    patterns = clean_terms(parsed.get("patterns"))
+    if patterns is not None:
+        patterns = [p for p in patterns if p in PATTERN_TYPES]
+    return concepts, entities, patterns
+
+
+# Extraction results persist on disk, shared by every IngestionAgent in the process
+# (routes and the orchestrator create one per request). EXTRACTION_CACHE_SIZE=0 disables
+_extraction_cache: Optional[DiskCache] = None
+# Extractions in flight by cache key, so identical content arriving concurrently waits for one call
+_inflight: Dict[str, "asyncio.Future"] = {}
+_shared_inflight = 0
+# Steps of the current process() call that fell back to keywords, with the LLM error if
+# there was one; results with fallbacks are not cached
+_fallbacks: ContextVar[Optional[List[Tuple[str, Optional[Exception]]]]] = ContextVar("extraction_fallbacks", default=None)
+
+
+def get_extraction_cache() -> Optional[DiskCache]:
+    global _extraction_cache
+    if _extraction_cache is None and int(os.getenv("EXTRACTION_CACHE_SIZE", "50000")) > 0:
+        _extraction_cache = DiskCache(
+            os.getenv("EXTRACTION_CACHE_PATH", "./search_index/extraction_cache.db"),
+            max_entries=int(os.getenv("EXTRACTION_CACHE_SIZE", "50000")),
+            max_bytes=int(float(os.getenv("EXTRACTION_CACHE_MAX_MB", "128")) * 1024 * 1024),
+            # Model and prompt version are in the key, so entries don't go stale by default
+            ttl_seconds=float(os.getenv("EXTRACTION_CACHE_TTL", "0"))
+        )
+    return _extraction_cache
+
+
+def extraction_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters of the extraction cache, plus calls shared while in flight"""
+    cache = get_extraction_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {
+        **cache.stats(),
+        "prompt_version": EXTRACTION_PROMPT_VERSION,
+        "model": os.getenv("ASI_MODEL", "qwen/qwen3-32b"),
+        "shared_inflight": _shared_inflight,
+    }
+
+
+def _note_fallback(step: str, error: Optional[Exception] = None):
+    fallbacks = _fallbacks.get()
+    if fallbacks is not None:
+        fallbacks.append((step, error))
 
 class IngestionAgent:
     def __init__(self):
@@ -15,26 +199,116 @@ class IngestionAgent:
         self.asi_model = os.getenv("ASI_MODEL", "qwen/qwen3-32b")
         self.use_asi = bool(self.asi_api_key)
         
-        if self.use_asi:
-            self.client = openai.OpenAI(
-                api_key=self.asi_api_key,
-                base_url=self.asi_base_url
-            )
+        # "fused": one JSON completion for concepts, entities and patterns; "separate": three calls
+        self.extraction_mode = os.getenv("EXTRACTION_MODE", "fused").lower()
+        # Cleared the first time the endpoint rejects a json_schema response_format
+        self.json_schema_supported = True
         
-    async def process(self, knowledge: Dict[str, Any]) -> Dict[str, Any]:
-        """Process incoming cultural knowledge"""
+        self.call_timeout = LLM_CALL_TIMEOUT
+        # Completions requested by this agent (bulk import reports it)
+        self.llm_calls = 0
         
-        # Extract key concepts using OpenAI or fallback
-        concepts = await self._extract_concepts(knowledge["content"])
+        # process_batch(): documents and document-text tokens per request
+        self.batch_size = int(os.getenv("EXTRACTION_BATCH_SIZE", "8"))
+        self.batch_token_budget = int(os.getenv("EXTRACTION_BATCH_TOKENS", "2000"))
         
-        # Identify themes
-        themes = self._identify_themes(knowledge["content"], knowledge["category"])
+    async def process(self, knowledge: Dict[str, Any], raise_transient: bool = False) -> Dict[str, Any]:
+        """Process incoming cultural knowledge.
         
-        # Extract entities (people, places, values)
-        entities = await self._extract_entities(knowledge["content"])
+        With raise_transient, an LLM failure worth retrying (timeout, rate limit,
+        connection or server error) raises TransientLLMError instead of settling
+        for the keyword fallback, so a job runner can try again later.
+        """
         
-        # Extract reasoning patterns for better inference
-        patterns = await self._extract_reasoning_patterns(knowledge["content"], knowledge["category"])
+        # One matcher pass; every keyword fallback reads its group from these hits
+        hits = FALLBACK_MATCHER.match(analyze(knowledge["content"], knowledge.get("language") or "en"))
+        
+        fallbacks: List[Tuple[str, Optional[Exception]]] = []
+        token = _fallbacks.set(fallbacks)
+        try:
+            concepts, entities, patterns = await self._extract_cached(knowledge["content"], knowledge["category"], hits)
+        finally:
+            _fallbacks.reset(token)
+        
+        if raise_transient:
+            for step, error in fallbacks:
+                if error is not None and is_transient(error):
+                    raise TransientLLMError(f"{step} extraction failed: {error}") from error
+        
+        return self._assemble(knowledge, hits, concepts, entities, patterns)
+    
+    async def process_batch(self, knowledges: List[Dict[str, Any]], concurrency: int = 4) -> List[Dict[str, Any]]:
+        """process() for many entries, packing several documents into each LLM request.
+        
+        In fused mode, cache misses are grouped up to EXTRACTION_BATCH_SIZE documents
+        and EXTRACTION_BATCH_TOKENS of text per request; at most `concurrency`
+        requests run at once. A document the batched reply leaves out or gets
+        wrong goes through the single-document path on its own. Results are
+        cached under the same key as single-document fused extraction.
+        """
+        hits = [
+            FALLBACK_MATCHER.match(analyze(knowledge["content"], knowledge.get("language") or "en"))
+            for knowledge in knowledges
+        ]
+        semaphore = asyncio.Semaphore(concurrency)
+        results: List[Optional[tuple]] = [None] * len(knowledges)
+        
+        async def single(i: int):
+            async with semaphore:
+                results[i] = await self._extract_cached(knowledges[i]["content"], knowledges[i]["category"], hits[i])
+        
+        cache = get_extraction_cache()
+        pending = list(range(len(knowledges)))
+        if self.use_asi and self.extraction_mode == "fused" and self.batch_size > 1:
+            if cache is not None:
+                keys = [self._cache_key(knowledges[i]["content"], knowledges[i]["category"]) for i in pending]
+                found = await asyncio.to_thread(lambda: [cache.get(key) for key in keys])
+                for i, cached in zip(pending, found):
+                    if cached is not None:
+                        results[i] = (cached["concepts"], cached["entities"], cached["patterns"])
+                pending = [i for i in pending if results[i] is None]
+            
+            retry: List[int] = []
+            
+            async def batched(group: List[int]):
+                async with semaphore:
+                    started = time.perf_counter()
+                    documents = await self._extract_documents([knowledges[i] for i in group])
+                    latency = time.perf_counter() - started
+                extractions = []
+                for position, i in enumerate(group):
+                    extracted = validate_extraction(documents.get(position, {}))
+                    if None in extracted:
+                        retry.append(i)
+                        continue
+                    results[i] = extracted
+                    extractions.append((
+                        self._cache_key(knowledges[i]["content"], knowledges[i]["category"]),
+                        dict(zip(("concepts", "entities", "patterns"), extracted)),
+                        {"latency_s": latency / len(group), "llm_calls": 1 / len(group)}
+                    ))
+                if cache is not None:
+                    await asyncio.to_thread(cache.put_many, extractions)
+            
+            groups = self._pack_batches([knowledges[i] for i in pending])
+            await asyncio.gather(*[
+                batched([pending[j] for j in group]) if len(group) > 1 else single(pending[group[0]])
+                for group in groups
+            ])
+            if retry:
+                print(f"Batched extraction: {len(retry)} of {len(pending)} documents retried one by one")
+            pending = retry
+        
+        await asyncio.gather(*[single(i) for i in pending])
+        return [
+            self._assemble(knowledge, hits[i], *results[i])
+            for i, knowledge in enumerate(knowledges)
+        ]
+    
+    def _assemble(self, knowledge: Dict[str, Any], hits: Dict[str, List[str]], concepts: List[str], entities: Dict[str, List[str]], patterns: List[str]) -> Dict[str, Any]:
+        """The processed record: extraction results plus themes, validation and metadata"""
+        # Identify themes
+        themes = self._identify_themes(hits, knowledge["category"])
         
         # Validate cultural context
         validated = self._validate_context(knowledge)
@@ -53,12 +327,238 @@ class IngestionAgent:
             }
         }
     
-    async def _extract_concepts(self, content: str) -> List[str]:
+    async def _extract_cached(self, content: str, category: str, hits: Dict[str, List[str]]) -> Tuple[List[str], Dict[str, List[str]], List[str]]:
+        """LLM extraction memoized by a hash of (content, category, model, prompt version, mode).
+        
+        Results that needed a keyword fallback are returned but not cached, so a
+        transient ASI Cloud failure doesn't pin the fallback output.
+        """
+        global _shared_inflight
+        cache = get_extraction_cache() if self.use_asi else None
+        if cache is None:
+            return await self._extract(content, category, hits)
+        
+        key = self._cache_key(content, category)
+        fallbacks = _fallbacks.get()
+        if fallbacks is None:
+            fallbacks = []
+        
+        pending = _inflight.get(key)
+        if pending is not None:
+            await asyncio.wait([pending])
+            if not pending.cancelled():
+                _shared_inflight += 1
+                result, degraded = pending.result()
+                fallbacks.extend(degraded)
+                return copy.deepcopy(result)
+        
+        # Registered before the cache lookup, so identical concurrent requests share it too
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        first_note = len(fallbacks)
+        try:
+            cached = await asyncio.to_thread(cache.get, key)
+            if cached is not None:
+                result = (cached["concepts"], cached["entities"], cached["patterns"])
+                future.set_result((result, []))
+                return result
+            
+            started = time.perf_counter()
+            result = await self._extract(content, category, hits)
+            degraded = fallbacks[first_note:]
+            future.set_result((result, degraded))
+            if not degraded:
+                await asyncio.to_thread(
+                    cache.put,
+                    key,
+                    dict(zip(("concepts", "entities", "patterns"), result)),
+                    cost={"latency_s": time.perf_counter() - started, "llm_calls": 1 if self.extraction_mode == "fused" else 3}
+                )
+            return result
+        finally:
+            if not future.done():
+                future.cancel()
+            if _inflight.get(key) is future:
+                del _inflight[key]
+    
+    def _cache_key(self, content: str, category: str) -> str:
+        return cache_key("extraction", content, category, self.asi_model, EXTRACTION_PROMPT_VERSION, self.extraction_mode)
+    
+    def _pack_batches(self, knowledges: List[Dict[str, Any]]) -> List[List[int]]:
+        """Consecutive groups of at most batch_size documents and batch_token_budget tokens of text"""
+        groups: List[List[int]] = []
+        tokens = 0
+        for i, knowledge in enumerate(knowledges):
+            document_tokens = len(knowledge["content"]) // CHARS_PER_TOKEN + 1
+            if not groups or len(groups[-1]) >= self.batch_size or tokens + document_tokens > self.batch_token_budget:
+                groups.append([])
+                tokens = 0
+            groups[-1].append(i)
+            tokens += document_tokens
+        return groups
+    
+    async def _extract_documents(self, knowledges: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """One structured request for several documents: parsed fields by document position.
+        
+        Documents the reply leaves out or mangles are simply absent; a failed
+        request returns {} so every document is retried on its own.
+        """
+        documents_text = "\n\n".join(
+            f"Document {position} ({knowledge['category']}): {knowledge['content']}"
+            for position, knowledge in enumerate(knowledges)
+        )
+        messages = [
+            {
+                "role": "system",
+                "content": "You are an expert in cultural anthropology, knowledge extraction and philosophical reasoning. Reply with a single JSON object only."
+            },
+            {
+                "role": "user",
+                "content": f"""Analyze each of these {len(knowledges)} documents of cultural knowledge and return a JSON object {{"documents": [...]}} with one item per document, each with these fields:
+
+"id": the document number
+"concepts": 3-7 key concepts, each a single word or short phrase (2-3 words max)
+"entities": {{"values": [moral principles], "concepts": [abstract ideas], "actions": [behaviors or practices]}}
+"patterns": the underlying reasoning patterns or principles it teaches, chosen from (select all that apply):
+{PATTERN_CHOICES}
+
+{documents_text}
+
+Example: {{"documents": [{{"id": 0, "concepts": ["community", "shared responsibility"], "entities": {{"values": ["unity"], "concepts": ["interdependence"], "actions": ["raise children together"]}}, "patterns": ["collective_good"]}}]}}"""
+            }
+        ]
+        
+        try:
+            response = await self._create_structured_completion(
+                messages,
+                max_tokens=BATCH_TOKENS_PER_DOCUMENT * len(knowledges),
+                schema=BATCH_EXTRACTION_SCHEMA,
+                schema_name="cultural_extraction_batch"
+            )
+            parsed = parse_extraction(response.choices[0].message.content)
+        except Exception as e:
+            print(f"ASI Cloud batched extraction of {len(knowledges)} documents failed: {e}")
+            return {}
+        
+        documents: Dict[int, Dict[str, Any]] = {}
+        for item in parsed.get("documents") or []:
+            if isinstance(item, dict) and isinstance(item.get("id"), int) and 0 <= item["id"] < len(knowledges):
+                documents.setdefault(item["id"], item)
+        return documents
+    
+    async def _extract(self, content: str, category: str, hits: Dict[str, List[str]]) -> Tuple[List[str], Dict[str, List[str]], List[str]]:
+        """Concepts, entities and reasoning patterns, from the LLM or keyword fallbacks"""
+        if self.use_asi and self.extraction_mode == "fused":
+            # Concepts, entities and patterns from a single structured completion
+            return await self._extract_fused(content, category, hits)
+        # Key concepts, entities (people, places, values) and reasoning patterns are
+        # independent calls: run them concurrently, each falling back on its own
+        return tuple(await asyncio.gather(
+            self._extract_concepts(content, hits),
+            self._extract_entities(content, hits),
+            self._extract_reasoning_patterns(content, category, hits)
+        ))
+    
+    async def _extract_fused(self, content: str, category: str, hits: Dict[str, List[str]]):
+        """Concepts, entities and patterns from one JSON-schema completion.
+        
+        Each field is validated on its own; a missing or malformed field falls
+        back to keyword extraction without discarding the others.
+        """
+        messages = [
+            {
+                "role": "system",
+                "content": "You are an expert in cultural anthropology, knowledge extraction and philosophical reasoning. Reply with a single JSON object only."
+            },
+            {
+                "role": "user",
+                "content": f"""Analyze this {category} and return a JSON object with these fields:
+
+"concepts": 3-7 key concepts, each a single word or short phrase (2-3 words max)
+"entities": {{"values": [moral principles], "concepts": [abstract ideas], "actions": [behaviors or practices]}}
+"patterns": the underlying reasoning patterns or principles it teaches, chosen from (select all that apply):
+{PATTERN_CHOICES}
+
+Cultural Knowledge: {content}
+
+Example: {{"concepts": ["community", "shared responsibility"], "entities": {{"values": ["unity"], "concepts": ["interdependence"], "actions": ["raise children together"]}}, "patterns": ["collective_good"]}}"""
+            }
+        ]
+        
+        parsed: Dict[str, Any] = {}
+        error = None
+        try:
+            response = await self._create_structured_completion(messages, max_tokens=300)
+            parsed = parse_extraction(response.choices[0].message.content)
+        except Exception as e:
+            print(f"ASI Cloud fused extraction failed, using fallback: {e}")
+            error = e
+        
+        concepts, entities, patterns = validate_extraction(parsed)
+        if concepts is None:
+            _note_fallback("concepts", error)
+            concepts = self._extract_concepts_fallback(hits)
+        
+        if entities is None:
+            _note_fallback("entities", error)
+            entities = self._extract_entities_fallback(hits)
+        
+        if patterns is None:
+            _note_fallback("patterns", error)
+            patterns = self._extract_patterns_fallback(hits, category)
+        
+        if parsed:
+            missing = [field for field in ("concepts", "entities", "patterns") if field not in parsed]
+            if missing:
+                print(f"Fused extraction missing {', '.join(missing)}, used fallback for those fields")
+        
+        return concepts, entities, patterns
+    
+    async def _chat(self, **kwargs):
+        """One completion through the shared gateway, at the caller's priority.
+        
+        Request handlers run interactive; the job workers and the bulk-load
+        scripts call set_priority(BACKGROUND) so their extraction yields to queries.
+        """
+        self.llm_calls += 1
+        return await complete(
+            self.asi_api_key, self.asi_base_url, timeout=self.call_timeout, model=self.asi_model, **kwargs
+        )
+    
+    async def _create_structured_completion(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        schema: Dict[str, Any] = EXTRACTION_SCHEMA,
+        schema_name: str = "cultural_extraction"
+    ):
+        """Chat completion constrained to a JSON schema where the endpoint supports it"""
+        if self.json_schema_supported:
+            try:
+                return await self._chat(
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=0.3,
+                    response_format={
+                        "type": "json_schema",
+                        "json_schema": {"name": schema_name, "schema": schema}
+                    }
+                )
+            except openai.BadRequestError as e:
+                # The prompt still asks for JSON, so the unconstrained call usually parses too
+                print(f"json_schema response_format rejected, prompting for JSON instead: {e}")
+                self.json_schema_supported = False
+        return await self._chat(
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.3
+        )
+    
+    async def _extract_concepts(self, content: str, hits: Dict[str, List[str]]) -> List[str]:
         """Extract key concepts from content using ASI Cloud"""
         if self.use_asi:
             try:
-                response = self.client.chat.completions.create(
-                    model=self.asi_model,
+                response = await self._chat(
                     messages=[
                         {
                             "role": "system",
@@ -83,48 +583,24 @@ Key Concepts:"""
                 
             except Exception as e:
                 print(f"ASI Cloud extraction failed, using fallback: {e}")
-                return self._extract_concepts_fallback(content)
+                _note_fallback("concepts", e)
+                return self._extract_concepts_fallback(hits)
         else:
-            return self._extract_concepts_fallback(content)
+            return self._extract_concepts_fallback(hits)
     
-    def _extract_concepts_fallback(self, content: str) -> List[str]:
+    def _extract_concepts_fallback(self, hits: Dict[str, List[str]]) -> List[str]:
         """Fallback keyword extraction without OpenAI"""
-        keywords = [
-            "community", "wisdom", "ancestor", "unity", "respect",
-            "fairness", "justice", "harmony", "balance", "truth",
-            "family", "elder", "tradition", "spirit", "nature"
-        ]
-        
-        content_lower = content.lower()
-        found_concepts = [kw for kw in keywords if kw in content_lower]
-        
-        return found_concepts
+        return list(hits["concepts"])
     
-    def _identify_themes(self, content: str, category: str) -> List[str]:
+    def _identify_themes(self, hits: Dict[str, List[str]], category: str) -> List[str]:
         """Identify thematic elements"""
-        themes = []
-        
-        theme_patterns = {
-            "collective_good": ["community", "together", "we", "collective"],
-            "wisdom": ["wisdom", "knowledge", "learn", "teach"],
-            "ethics": ["right", "wrong", "moral", "virtue", "honor"],
-            "nature": ["earth", "nature", "land", "water", "tree"],
-            "spirituality": ["spirit", "ancestor", "divine", "sacred"]
-        }
-        
-        content_lower = content.lower()
-        for theme, patterns in theme_patterns.items():
-            if any(pattern in content_lower for pattern in patterns):
-                themes.append(theme)
-        
-        return themes
+        return list(hits["themes"])
     
-    async def _extract_entities(self, content: str) -> Dict[str, List[str]]:
+    async def _extract_entities(self, content: str, hits: Dict[str, List[str]]) -> Dict[str, List[str]]:
         """Extract entities using ASI Cloud"""
         if self.use_asi:
             try:
-                response = self.client.chat.completions.create(
-                    model=self.asi_model,
+                response = await self._chat(
                     messages=[
                         {
                             "role": "system",
@@ -155,9 +631,10 @@ Cultural Knowledge: {content}"""
                 
             except Exception as e:
                 print(f"ASI Cloud entity extraction failed, using fallback: {e}")
-                return self._extract_entities_fallback(content)
+                _note_fallback("entities", e)
+                return self._extract_entities_fallback(hits)
         else:
-            return self._extract_entities_fallback(content)
+            return self._extract_entities_fallback(hits)
     
     def _parse_entities_response(self, response: str) -> Dict[str, List[str]]:
         """Parse OpenAI response into entities dict"""
@@ -178,36 +655,19 @@ Cultural Knowledge: {content}"""
         
         return entities
     
-    def _extract_entities_fallback(self, content: str) -> Dict[str, List[str]]:
+    def _extract_entities_fallback(self, hits: Dict[str, List[str]]) -> Dict[str, List[str]]:
         """Fallback entity extraction without OpenAI"""
-        entities = {
-            "values": [],
+        return {
+            "values": list(hits["values"]),
             "concepts": [],
-            "actions": []
+            "actions": list(hits["actions"])
         }
-        
-        # Simple pattern matching
-        value_words = ["respect", "honor", "truth", "justice", "fairness", "unity"]
-        action_words = ["share", "give", "help", "teach", "learn", "protect"]
-        
-        content_lower = content.lower()
-        
-        for value in value_words:
-            if value in content_lower:
-                entities["values"].append(value)
-        
-        for action in action_words:
-            if action in content_lower:
-                entities["actions"].append(action)
-        
-        return entities
     
-    async def _extract_reasoning_patterns(self, content: str, category: str) -> List[str]:
+    async def _extract_reasoning_patterns(self, content: str, category: str, hits: Dict[str, List[str]]) -> List[str]:
         """Extract reasoning patterns that can be used for inference"""
         if self.use_asi:
             try:
-                response = self.client.chat.completions.create(
-                    model=self.asi_model,
+                response = await self._chat(
                     messages=[
                         {
                             "role": "system",
@@ -218,18 +678,7 @@ Cultural Knowledge: {content}"""
                             "content": f"""Analyze this {category} and identify the underlying reasoning patterns or principles it teaches.
 
 Choose from these pattern types (select all that apply):
-- collective_good (prioritizing community over individual)
-- wisdom_transmission (passing knowledge across generations)
-- ethics (moral principles and values)
-- nature_harmony (balance with natural world)
-- spirituality (connection to ancestors/divine)
-- reciprocity (mutual exchange and fairness)
-- respect_hierarchy (honoring elders/authority)
-- unity_diversity (strength in togetherness)
-- resilience (overcoming adversity)
-- humility (recognizing limitations)
-- truth_integrity (honesty and authenticity)
-- human_dignity (inherent worth of all people)
+{PATTERN_CHOICES}
 
 Cultural Knowledge: {content}
 
@@ -246,42 +695,21 @@ Patterns:"""
                 patterns = [p.strip().lower() for p in patterns_text.split(',') if p.strip()]
                 
                 # Validate patterns against known types
-                valid_patterns = [
-                    "collective_good", "wisdom_transmission", "ethics", "nature_harmony",
-                    "spirituality", "reciprocity", "respect_hierarchy", "unity_diversity",
-                    "resilience", "humility", "truth_integrity", "human_dignity"
-                ]
-                
-                return [p for p in patterns if p in valid_patterns]
+                return [p for p in patterns if p in PATTERN_TYPES]
                 
             except Exception as e:
                 print(f"ASI Cloud pattern extraction failed, using fallback: {e}")
-                return self._extract_patterns_fallback(content, category)
+                _note_fallback("patterns", e)
+                return self._extract_patterns_fallback(hits, category)
         else:
-            return self._extract_patterns_fallback(content, category)
+            return self._extract_patterns_fallback(hits, category)
     
-    def _extract_patterns_fallback(self, content: str, category: str) -> List[str]:
+    def _extract_patterns_fallback(self, hits: Dict[str, List[str]], category: str) -> List[str]:
         """Fallback pattern extraction using keyword matching"""
-        patterns = []
-        content_lower = content.lower()
-        
-        pattern_keywords = {
-            "collective_good": ["community", "together", "we", "collective", "shared"],
-            "wisdom_transmission": ["ancestor", "elder", "teach", "learn", "tradition"],
-            "ethics": ["right", "wrong", "moral", "virtue", "honor", "just"],
-            "humility": ["humble", "modest", "return", "origin", "home"],
-            "reciprocity": ["give", "receive", "exchange", "mutual", "share"],
-            "resilience": ["overcome", "endure", "persist", "strength", "survive"],
-            "truth_integrity": ["truth", "honest", "authentic", "genuine", "real"],
-            "human_dignity": ["respect", "dignity", "worth", "value", "honor"]
-        }
-        
-        for pattern, keywords in pattern_keywords.items():
-            if any(keyword in content_lower for keyword in keywords):
-                patterns.append(pattern)
+        patterns = list(hits["patterns"])
         
         # If it's a proverb and mentions returning/home, likely about humility
-        if category == "proverb" and any(word in content_lower for word in ["return", "home", "origin"]):
+        if category == "proverb" and hits["humility_proverb"]:
             if "humility" not in patterns:
                 patterns.append("humility")
         
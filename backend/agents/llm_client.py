@@ -0,0 +1,57 @@
+"""
+LLM Client - Shared async ASI Cloud (OpenAI-compatible) clients
+Agents get one client per endpoint and event loop, so calls reuse a pooled HTTP connection
+"""
+import asyncio
+import os
+import weakref
+from typing import Dict, Optional, Tuple
+
+import openai
+
+# Upper bound for a single completion; callers fall back to keyword extraction past it
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "30"))
+# Retried by the gateway (agents/llm_gateway.py) rather than the SDK, so every attempt is rate limited
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# Failures worth retrying later: the request may succeed once the endpoint recovers
+TRANSIENT_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    TimeoutError,
+)
+
+
+class TransientLLMError(Exception):
+    """An LLM call failed in a way that is likely to succeed on retry"""
+
+
+def is_transient(error: BaseException) -> bool:
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+# The HTTP pool is bound to the loop it was opened on (uvicorn's, or a script's asyncio.run)
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Optional[str]], openai.AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client(api_key: str, base_url: Optional[str]) -> openai.AsyncOpenAI:
+    """The shared AsyncOpenAI client for this endpoint on the running event loop"""
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get((api_key, base_url))
+    if client is None:
+        client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=LLM_CALL_TIMEOUT,
+            max_retries=0
+        )
+        clients[(api_key, base_url)] = client
+    return client
+
+
+async def close_async_clients():
+    """Close the pooled connections opened on the running event loop"""
+    for client in _clients.pop(asyncio.get_running_loop(), {}).values():
+        await client.close()
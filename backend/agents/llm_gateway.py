@@ -0,0 +1,306 @@
+"""
+LLM Gateway - One rate-limited, adaptively sized queue in front of each LLM endpoint
+Ingestion, translation, reranking and multi-modal calls share it, so a burst of ingests
+can't spend the provider's quota that queries need
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import time
+import weakref
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import openai
+
+from agents.llm_client import LLM_CALL_TIMEOUT, LLM_MAX_RETRIES, get_async_client, is_transient
+
+# Waiting calls are served interactive first, FIFO within a class
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = {INTERACTIVE: 0, BACKGROUND: 1}
+
+# Per endpoint and process; LLM_RATE_LIMIT=0 disables the token bucket
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "5"))
+LLM_BURST = int(os.getenv("LLM_BURST", "10"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+# A completion slower than this counts as congestion, like a 429
+LLM_LATENCY_TARGET = float(os.getenv("LLM_LATENCY_TARGET", "10"))
+
+RETRY_BASE_SECONDS = 0.5
+# Pause after a 429 without a usable Retry-After header, and the most we honour
+DEFAULT_RATE_LIMIT_PAUSE = 1.0
+MAX_RATE_LIMIT_PAUSE = 60.0
+WAIT_SAMPLES = 512
+
+_priority: "contextvars.ContextVar[str]" = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+def set_priority(priority: str):
+    """Priority class for LLM calls made by the current task and the tasks it starts"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"unknown LLM priority {priority!r}")
+    _priority.set(priority)
+
+
+class LLMGateway:
+    """Admission control for one endpoint.
+
+    A call waits until a rate token and a concurrency slot are both free. The
+    concurrency limit is AIMD: each call that finishes under latency_target
+    adds 1/limit (about +1 per round of calls), while a 429, a timeout or a
+    slow call halves it. Only calls started after the last cut can cut again,
+    so one burst of failures halves the limit once instead of collapsing it.
+    A 429 also pauses dispatch for its Retry-After. Transient failures retry
+    through the queue, so a retry waits its turn like any other call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = LLM_RATE_LIMIT,
+        burst: int = LLM_BURST,
+        min_concurrency: int = LLM_MIN_CONCURRENCY,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        initial_concurrency: int = LLM_INITIAL_CONCURRENCY,
+        latency_target: float = LLM_LATENCY_TARGET,
+        max_retries: int = LLM_MAX_RETRIES
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+
+        self.tokens = float(self.burst)
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.in_flight = 0
+        self.latency_ewma: Optional[float] = None
+        # (priority rank, arrival order, future resolved when the call may start)
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.arrivals = itertools.count()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+        self.queued: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self.waits: Dict[str, Deque[float]] = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITIES}
+        self.counters = {
+            "calls": 0, "succeeded": 0, "failed": 0, "retries": 0,
+            "rate_limited": 0, "timeouts": 0, "slow": 0, "limit_cuts": 0,
+        }
+
+    async def call(
+        self,
+        attempt: Callable[[], Awaitable[Any]],
+        priority: Optional[str] = None,
+        timeout: Optional[float] = LLM_CALL_TIMEOUT,
+        adaptive: bool = True
+    ) -> Any:
+        """Run attempt() once admitted, retrying transient failures.
+
+        timeout bounds each attempt, not the time spent queued. adaptive=False
+        is for calls whose latency grows with their input (transcription), so
+        their duration isn't read as congestion; their 429s still count.
+        """
+        priority = priority or _priority.get()
+        self.counters["calls"] += 1
+        for retry in itertools.count():
+            await self._acquire(priority)
+            started = time.monotonic()
+            try:
+                try:
+                    result = await asyncio.wait_for(attempt(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"no response within {timeout:g}s") from None
+            except Exception as e:
+                error = e
+                self._observe(started, e, adaptive)
+            else:
+                self._observe(started, None, adaptive)
+                return result
+            finally:
+                self._release()
+
+            if retry >= self.max_retries or not is_transient(error):
+                self.counters["failed"] += 1
+                raise error
+            self.counters["retries"] += 1
+            # A 429 already paused the whole gateway; other failures back off per call
+            if not isinstance(error, openai.RateLimitError):
+                await asyncio.sleep(RETRY_BASE_SECONDS * 2 ** retry * (0.5 + random.random()))
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "endpoint": self.name,
+            "concurrency_limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": dict(self.queued),
+            "wait_ms": {priority: _summary(samples) for priority, samples in self.waits.items()},
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "rate_per_second": self.rate,
+            "tokens": round(self.tokens, 2) if self.rate > 0 else None,
+            "paused_for_s": round(max(0.0, self.paused_until - now), 2),
+            **self.counters,
+        }
+
+    async def _acquire(self, priority: str):
+        future = asyncio.get_running_loop().create_future()
+        queued_at = time.monotonic()
+        heapq.heappush(self.waiters, (PRIORITIES[priority], next(self.arrivals), future))
+        self.queued[priority] += 1
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted a slot in the same tick we were cancelled: hand it on
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        finally:
+            self.queued[priority] -= 1
+        self.waits[priority].append(time.monotonic() - queued_at)
+
+    def _release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Start as many queued calls as the limit, the bucket and any pause allow"""
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+            self.refilled_at = now
+        while self.waiters:
+            future = self.waiters[0][2]
+            if future.cancelled():
+                heapq.heappop(self.waiters)
+                continue
+            if self.in_flight >= int(self.limit):
+                return  # the next release dispatches again
+            if now < self.paused_until:
+                return self._wake_in(self.paused_until - now)
+            if self.rate > 0 and self.tokens < 1:
+                return self._wake_in((1 - self.tokens) / self.rate)
+            heapq.heappop(self.waiters)
+            if self.rate > 0:
+                self.tokens -= 1
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _wake_in(self, delay: float):
+        if self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self):
+        self.timer = None
+        self._dispatch()
+
+    def _observe(self, started: float, error: Optional[Exception], adaptive: bool):
+        """Feed one attempt's outcome into the concurrency limit"""
+        now = time.monotonic()
+        latency = now - started
+        if isinstance(error, openai.RateLimitError):
+            self.counters["rate_limited"] += 1
+            self.paused_until = max(self.paused_until, now + _retry_after(error))
+            self._decrease(started, now, "rate limited")
+        elif isinstance(error, (TimeoutError, openai.APITimeoutError)):
+            self.counters["timeouts"] += 1
+            if adaptive:
+                self._decrease(started, now, "timeout")
+        elif error is None:
+            self.counters["succeeded"] += 1
+            if not adaptive:
+                return
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            if latency > self.latency_target:
+                self.counters["slow"] += 1
+                self._decrease(started, now, f"{latency:.1f}s response")
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        # Other errors (bad request, auth) say nothing about the endpoint's capacity
+
+    def _decrease(self, started: float, now: float, reason: str):
+        if started < self.last_decrease:
+            return  # sized by the limit before the last cut
+        self.limit = max(self.min_concurrency, self.limit / 2)
+        self.last_decrease = now
+        self.counters["limit_cuts"] += 1
+        print(f"🐢 LLM gateway {self.name}: concurrency limit cut to {int(self.limit)} ({reason})")
+
+
+def _retry_after(error: openai.RateLimitError) -> float:
+    try:
+        seconds = float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return DEFAULT_RATE_LIMIT_PAUSE
+    return min(MAX_RATE_LIMIT_PAUSE, max(0.0, seconds))
+
+
+def _summary(samples: Deque[float]) -> Dict[str, Any]:
+    if not samples:
+        return {"samples": 0}
+    ordered = sorted(samples)
+    return {
+        "samples": len(ordered),
+        "avg": round(sum(ordered) / len(ordered) * 1000, 1),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        "max": round(ordered[-1] * 1000, 1),
+    }
+
+
+# Futures and timers belong to one loop, so each loop gets its own gateways
+_gateways: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, LLMGateway]]" = weakref.WeakKeyDictionary()
+
+
+def get_gateway(base_url: Optional[str]) -> LLMGateway:
+    """The gateway for this endpoint on the running event loop (None = OpenAI's default)"""
+    gateways = _gateways.setdefault(asyncio.get_running_loop(), {})
+    name = base_url or "openai"
+    gateway = gateways.get(name)
+    if gateway is None:
+        gateway = gateways[name] = LLMGateway(name)
+    return gateway
+
+
+async def complete(
+    api_key: str,
+    base_url: Optional[str],
+    priority: Optional[str] = None,
+    timeout: Optional[float] = LLM_CALL_TIMEOUT,
+    **kwargs
+):
+    """A chat completion through the endpoint's gateway; kwargs go to chat.completions.create"""
+    client = get_async_client(api_key, base_url)
+    return await get_gateway(base_url).call(
+        lambda: client.chat.completions.create(**kwargs), priority=priority, timeout=timeout
+    )
+
+
+def gateway_stats() -> Dict[str, Any]:
+    """Queue depth, wait times and the adaptive limit of each endpoint used on this loop"""
+    try:
+        gateways = _gateways.get(asyncio.get_running_loop(), {})
+    except RuntimeError:
+        gateways = {}
+    return {
+        "gateways": [gateway.stats() for gateway in gateways.values()],
+        "settings": {
+            "rate_per_second": LLM_RATE_LIMIT,
+            "burst": LLM_BURST,
+            "min_concurrency": LLM_MIN_CONCURRENCY,
+            "max_concurrency": LLM_MAX_CONCURRENCY,
+            "initial_concurrency": LLM_INITIAL_CONCURRENCY,
+            "latency_target_s": LLM_LATENCY_TARGET,
+            "max_retries": LLM_MAX_RETRIES,
+        },
+    }
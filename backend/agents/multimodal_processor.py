@@ -5,8 +5,12 @@ from typing import Dict, Any, Optional
 import os
 import base64
 from io import BytesIO
-import openai
-import tempfile
+
+from agents.llm_client import get_async_client
+from agents.llm_gateway import complete, get_gateway
+
+# Whisper's latency grows with the recording, so it gets its own per-attempt deadline
+TRANSCRIPTION_TIMEOUT = float(os.getenv("TRANSCRIPTION_TIMEOUT", "300"))
 
 class MultiModalProcessor:
     def __init__(self):
@@ -18,14 +22,6 @@ class MultiModalProcessor:
         self.asi_api_key = os.getenv("ASI_API_KEY", "")
         self.asi_base_url = os.getenv("ASI_BASE_URL", "https://inference.asicloud.cudos.org/v1")
         
-        if self.use_openai:
-            self.openai_client = openai.OpenAI(api_key=self.openai_api_key)
-        
-        if self.asi_api_key:
-            self.asi_client = openai.OpenAI(
-                api_key=self.asi_api_key,
-                base_url=self.asi_base_url
-            )
     
     async def process_audio(self, audio_data: bytes, language: str = "en") -> Dict[str, Any]:
         """
@@ -42,41 +38,34 @@ class MultiModalProcessor:
                     "note": "Set OPENAI_API_KEY to enable audio transcription"
                 }
             
-            # Save audio to temporary file for Whisper API
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio:
-                temp_audio.write(audio_data)
-                temp_audio_path = temp_audio.name
+            # Through the OpenAI gateway; the upload is in memory, so a retry can resend it
+            client = get_async_client(self.openai_api_key, None)
+            transcript = await get_gateway(None).call(
+                lambda: client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=("audio.wav", audio_data),
+                    language=language if language != "en" else None,  # Auto-detect if English
+                    response_format="verbose_json",
+                    timeout=TRANSCRIPTION_TIMEOUT
+                ),
+                timeout=TRANSCRIPTION_TIMEOUT,
+                adaptive=False
+            )
             
-            try:
-                # Use OpenAI Whisper for transcription
-                with open(temp_audio_path, "rb") as audio_file:
-                    transcript = self.openai_client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        language=language if language != "en" else None,  # Auto-detect if English
-                        response_format="verbose_json"
-                    )
-                
-                result = {
-                    "transcription": transcript.text,
-                    "language": transcript.language if hasattr(transcript, 'language') else language,
-                    "confidence": 0.95,  # Whisper doesn't provide confidence, using high default
-                    "duration": str(transcript.duration) if hasattr(transcript, 'duration') else "unknown",
-                    "type": "oral_tradition",
-                    "metadata": {
-                        "model": "whisper-1",
-                        "audio_quality": "processed",
-                        "segments": len(transcript.segments) if hasattr(transcript, 'segments') else 0
-                    }
+            result = {
+                "transcription": transcript.text,
+                "language": transcript.language if hasattr(transcript, 'language') else language,
+                "confidence": 0.95,  # Whisper doesn't provide confidence, using high default
+                "duration": str(transcript.duration) if hasattr(transcript, 'duration') else "unknown",
+                "type": "oral_tradition",
+                "metadata": {
+                    "model": "whisper-1",
+                    "audio_quality": "processed",
+                    "segments": len(transcript.segments) if hasattr(transcript, 'segments') else 0
                 }
-                
-                return result
-                
-            finally:
-                # Clean up temporary file
-                import os as os_module
-                if os_module.path.exists(temp_audio_path):
-                    os_module.unlink(temp_audio_path)
+            }
+            
+            return result
             
         except Exception as e:
             return {
@@ -105,7 +94,9 @@ class MultiModalProcessor:
             image_base64 = base64.b64encode(image_data).decode('utf-8')
             
             # Use GPT-4 Vision to analyze the image
-            response = self.openai_client.chat.completions.create(
+            response = await complete(
+                self.openai_api_key,
+                None,
                 model="gpt-4o-mini",  # or "gpt-4-vision-preview"
                 messages=[
                     {
@@ -225,7 +216,9 @@ Create a unified description that integrates all modalities (text, audio, visual
 
                 # Try OpenAI first, fallback to ASI Cloud
                 if self.use_openai:
-                    response = self.openai_client.chat.completions.create(
+                    response = await complete(
+                        self.openai_api_key,
+                        None,
                         model="gpt-4o-mini",
                         messages=[
                             {"role": "system", "content": "You are a cultural knowledge curator synthesizing multi-modal information."},
@@ -235,7 +228,9 @@ Create a unified description that integrates all modalities (text, audio, visual
                         temperature=0.7
                     )
                 elif self.asi_api_key:
-                    response = self.asi_client.chat.completions.create(
+                    response = await complete(
+                        self.asi_api_key,
+                        self.asi_base_url,
                         model=os.getenv("ASI_MODEL", "qwen/qwen3-32b"),
                         messages=[
                             {"role": "system", "content": "You are a cultural knowledge curator synthesizing multi-modal information."},
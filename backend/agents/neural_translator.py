@@ -3,7 +3,8 @@ Neural Translator - Converts symbolic reasoning to natural language using ASI Cl
 """
 from typing import Dict, Any, List
 import os
-import openai
+
+from agents.llm_gateway import complete
 
 class NeuralTranslator:
     def __init__(self):
@@ -12,12 +13,6 @@ class NeuralTranslator:
         self.asi_model = os.getenv("ASI_MODEL", "qwen/qwen3-32b")
         self.use_llm = bool(self.asi_api_key)
         
-        if self.use_llm:
-            self.client = openai.OpenAI(
-                api_key=self.asi_api_key,
-                base_url=self.asi_base_url
-            )
-        
     async def translate(self, reasoning_result: Dict[str, Any], question: str, web_fallback: Dict = None) -> Dict[str, Any]:
         """Translate symbolic reasoning to natural language"""
         
@@ -68,7 +63,9 @@ class NeuralTranslator:
                 
                 # Frame the web result through ancestral wisdom lens
                 try:
-                    response = self.client.chat.completions.create(
+                    response = await complete(
+                        self.asi_api_key,
+                        self.asi_base_url,
                         model=os.getenv("ASI_MODEL", "qwen/qwen3-32b"),
                         messages=[
                             {
@@ -1,25 +1,78 @@
 """
 Reasoning Engine - Performs symbolic reasoning using MeTTa-like logic
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import re
+from storage.keyword_matcher import KeywordMatcher
+from storage.text_analysis import analyze
+
+# Theme that marks an entry as answering each question type
+INTENT_THEMES = {
+    "ethical": "ethics",
+    "social": "collective_good",
+    "learning": "wisdom"
+}
+
+# What each question type is seeking
+INTENT_SEEKING = {
+    "learning": "wisdom",
+    "ethical": "moral_guidance",
+    "social": "social_principle"
+}
+
+# Question and content keyword tables, compiled into one automaton and matched as
+# whole analyzed words ("respected" or "Harmonies" still find their concept)
+REASONING_KEYWORDS = {
+    # Question type keywords; the first type in this order that matches wins
+    "intent": {
+        "learning": ["teach", "teacher", "learn", "lesson"],
+        "ethical": ["fair", "fairness", "just", "justice", "right", "wrong", "ethical"],
+        "social": ["community", "together", "collective"]
+    },
+    "concepts": {
+        concept: [concept] for concept in [
+            "fairness", "justice", "community", "wisdom", "respect",
+            "honor", "truth", "unity", "balance", "harmony"
+        ]
+    },
+    # Content keywords behind each fallback pattern
+    "content_patterns": {
+        "peace_and_harmony_principle": ["peace", "harmony"],
+        "community_first_principle": ["community", "collective"],
+        "truth_and_integrity_principle": ["truth", "honesty"],
+        "human_dignity_principle": ["respect", "dignity"]
+    },
+}
+REASONING_MATCHER = KeywordMatcher(REASONING_KEYWORDS)
 
 class ReasoningEngine:
-    def __init__(self):
+    def __init__(self, db=None):
         self.knowledge_graph = {}
         self.reasoning_rules = []
+        # Optional Database: candidates, relevance scores and pattern aggregates come from the indexed tag tables
+        self.db = db
         
-    async def reason(self, question: str, knowledge_entries: List[Dict]) -> Dict[str, Any]:
-        """Perform symbolic reasoning on the question"""
+    async def reason(self, question: str, knowledge_entries: List[Dict], filters: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Perform symbolic reasoning on the question (filters: culture/category/language scope of the query)"""
         
         # Parse question to extract intent
-        intent = self._parse_question(question)
+        intent = self._parse_question(question, (filters or {}).get("language") or "en")
+        
+        # Retrieval found nothing: look up entries tagged with the question's concepts/theme
+        if not knowledge_entries and self.db:
+            intent_theme = INTENT_THEMES.get(intent["type"])
+            if intent["concepts"] or intent_theme:
+                knowledge_entries = await self.db.find_entries_by_tags(
+                    concepts=intent["concepts"],
+                    themes=[intent_theme] if intent_theme else None,
+                    filters=filters
+                )
         
         # Build reasoning chain
         reasoning_chain = []
         
         # Step 1: Identify relevant knowledge
-        relevant = self._find_relevant_knowledge(intent, knowledge_entries)
+        relevant = await self._find_relevant_knowledge(intent, knowledge_entries)
         reasoning_chain.append({
             "step": 1,
             "action": "identify_relevant_knowledge",
@@ -28,7 +81,7 @@ class ReasoningEngine:
         })
         
         # Step 2: Extract symbolic patterns
-        patterns = self._extract_patterns(relevant)
+        patterns = await self._extract_patterns(relevant)
         reasoning_chain.append({
             "step": 2,
             "action": "extract_symbolic_patterns",
@@ -61,9 +114,9 @@ class ReasoningEngine:
             "patterns": patterns
         }
     
-    def _parse_question(self, question: str) -> Dict[str, Any]:
-        """Parse question to understand intent"""
-        question_lower = question.lower()
+    def _parse_question(self, question: str, language: str = "en") -> Dict[str, Any]:
+        """Parse question to understand intent (analyzed like content stored in that language)"""
+        hits = REASONING_MATCHER.match(analyze(question, language))
         
         intent = {
             "type": "general",
@@ -72,55 +125,34 @@ class ReasoningEngine:
         }
         
         # Identify question type
-        if any(word in question_lower for word in ["teach", "learn", "lesson"]):
-            intent["type"] = "learning"
-            intent["seeking"] = "wisdom"
-        elif any(word in question_lower for word in ["fair", "just", "right", "wrong", "ethical"]):
-            intent["type"] = "ethical"
-            intent["seeking"] = "moral_guidance"
-        elif any(word in question_lower for word in ["community", "together", "collective"]):
-            intent["type"] = "social"
-            intent["seeking"] = "social_principle"
+        if hits["intent"]:
+            intent["type"] = hits["intent"][0]
+            intent["seeking"] = INTENT_SEEKING[intent["type"]]
         
         # Extract key concepts
-        concept_keywords = [
-            "fairness", "justice", "community", "wisdom", "respect",
-            "honor", "truth", "unity", "balance", "harmony"
-        ]
-        
-        for concept in concept_keywords:
-            if concept in question_lower:
-                intent["concepts"].append(concept)
+        intent["concepts"] = hits["concepts"]
         
         return intent
     
-    def _find_relevant_knowledge(self, intent: Dict, knowledge_entries: List[Dict]) -> List[Dict]:
+    async def _find_relevant_knowledge(self, intent: Dict, knowledge_entries: List[Dict]) -> List[Dict]:
         """Find knowledge entries relevant to the intent"""
         # If database already scored entries, use those
         if knowledge_entries and knowledge_entries[0].get("relevance_score", 0) > 0:
             return knowledge_entries[:5]  # Top 5 from database
         
-        # Otherwise, score them here
-        relevant = []
+        # Otherwise, score them here: 2 per matching concept, 3 for the intent's theme
+        intent_theme = INTENT_THEMES.get(intent["type"])
+        if self._can_use_tag_tables(knowledge_entries):
+            scores = await self.db.score_entries_by_tags(
+                [entry["id"] for entry in knowledge_entries],
+                {"concepts": (intent["concepts"], 2), "themes": ([intent_theme] if intent_theme else [], 3)}
+            )
+            scored = [(entry, scores.get(entry["id"], 0)) for entry in knowledge_entries]
+        else:
+            scored = [(entry, self._tag_score(entry, intent["concepts"], intent_theme)) for entry in knowledge_entries]
         
-        for entry in knowledge_entries:
-            score = 0
-            
-            # Check if concepts match
-            entry_concepts = entry.get("concepts", [])
-            for concept in intent["concepts"]:
-                if concept in entry_concepts:
-                    score += 2
-            
-            # Check if themes match intent type
-            entry_themes = entry.get("themes", [])
-            if intent["type"] == "ethical" and "ethics" in entry_themes:
-                score += 3
-            if intent["type"] == "social" and "collective_good" in entry_themes:
-                score += 3
-            if intent["type"] == "learning" and "wisdom" in entry_themes:
-                score += 3
-            
+        relevant = []
+        for entry, score in scored:
             if score > 0:
                 entry["relevance_score"] = score
                 relevant.append(entry)
@@ -130,42 +162,63 @@ class ReasoningEngine:
         
         return relevant[:5]  # Top 5 most relevant
     
-    def _extract_patterns(self, knowledge_entries: List[Dict]) -> List[str]:
+    def _can_use_tag_tables(self, knowledge_entries: List[Dict]) -> bool:
+        """Stored entries are scored and aggregated through the indexed tag tables"""
+        return bool(self.db and knowledge_entries and all(entry.get("id") for entry in knowledge_entries))
+    
+    @staticmethod
+    def _tag_score(entry: Dict, concepts: List[str], theme: Optional[str]) -> int:
+        """_find_relevant_knowledge scoring over an entry's own lists (entries without a database)"""
+        entry_concepts = [str(c).lower() for c in entry.get("concepts") or []]
+        entry_themes = [str(t).lower() for t in entry.get("themes") or []]
+        score = 2 * sum(1 for concept in concepts if concept in entry_concepts)
+        if theme in entry_themes:
+            score += 3
+        return score
+    
+    async def _extract_patterns(self, knowledge_entries: List[Dict]) -> List[str]:
         """Extract reasoning patterns from knowledge"""
         patterns = []
         
+        # Fallback: Extract key concepts from the analyzed terms stored at ingest
         for entry in knowledge_entries:
-            # First priority: use AI-extracted patterns from ingestion
-            entry_patterns = entry.get("patterns", [])
-            if entry_patterns:
-                patterns.extend(entry_patterns)
-                print(f"   Using AI-extracted patterns: {entry_patterns}")
-            
-            themes = entry.get("themes", [])
-            concepts = entry.get("concepts", [])
             culture = entry.get("culture", "")
-            content = entry.get("content", "")
-            
-            # Fallback: Extract key concepts from content
-            if "peace" in content.lower() or "harmony" in content.lower():
-                patterns.append(f"{culture}: peace_and_harmony_principle")
-            
-            if "community" in content.lower() or "collective" in content.lower():
-                patterns.append(f"{culture}: community_first_principle")
-            
-            if "truth" in content.lower() or "honesty" in content.lower():
-                patterns.append(f"{culture}: truth_and_integrity_principle")
-            
-            if "respect" in content.lower() or "dignity" in content.lower():
-                patterns.append(f"{culture}: human_dignity_principle")
-            
-            # Pattern: If theme X, then principle Y
-            if "collective_good" in themes:
-                patterns.append("collective_good")
-            if "ethics" in themes and "fairness" in concepts:
-                patterns.append("ethics")
-            if "wisdom" in themes:
-                patterns.append("wisdom")
+            tokens = entry.get("tokens")
+            if tokens is None:
+                tokens = analyze(entry.get("content", ""), entry.get("language") or "en")
+            for pattern in REASONING_MATCHER.match(tokens)["content_patterns"]:
+                patterns.append(f"{culture}: {pattern}")
+        
+        # First priority: AI-extracted patterns from ingestion, plus theme-based principles
+        if self._can_use_tag_tables(knowledge_entries):
+            ids = [entry["id"] for entry in knowledge_entries]
+            counts = await self.db.tag_counts(ids, ["patterns", "themes"])
+            # "ethics" needs the theme and the concept on the same entry
+            ethical = await self.db.score_entries_by_tags(ids, {"themes": (["ethics"], 1), "concepts": (["fairness"], 1)})
+            entry_patterns = list(counts["patterns"])
+            themes = set(counts["themes"])
+            has_ethics = any(score >= 2 for score in ethical.values())
+        else:
+            entry_patterns = [p for entry in knowledge_entries for p in entry.get("patterns") or []]
+            # Case-insensitive, like the normalized tag tables
+            themes = {str(t).lower() for entry in knowledge_entries for t in entry.get("themes") or []}
+            has_ethics = any(
+                "ethics" in [str(t).lower() for t in entry.get("themes") or []]
+                and "fairness" in [str(c).lower() for c in entry.get("concepts") or []]
+                for entry in knowledge_entries
+            )
+        
+        if entry_patterns:
+            patterns.extend(entry_patterns)
+            print(f"   Using AI-extracted patterns: {entry_patterns}")
+        
+        # Pattern: If theme X, then principle Y
+        if "collective_good" in themes:
+            patterns.append("collective_good")
+        if has_ethics:
+            patterns.append("ethics")
+        if "wisdom" in themes:
+            patterns.append("wisdom")
         
         return list(set(patterns))  # Remove duplicates
     
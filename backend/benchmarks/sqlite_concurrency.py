@@ -0,0 +1,120 @@
+"""
+Benchmark: concurrent /knowledge/list readers against /knowledge/ingest writers on SQLite
+Compares SQLITE_PROFILE=legacy (shared connection, rollback journal) with the performance profile
+
+Usage (from backend/): python -m benchmarks.sqlite_concurrency [--readers 16] [--writers 2] [--seconds 10]
+Set DB_ASYNC=false to drive the sync engine from worker threads instead of aiosqlite
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SAMPLE_ENTRY = {
+    "content": "Ubuntu: I am because we are. A person is a person through other persons.",
+    "culture": "Zulu/Xhosa (South Africa)",
+    "category": "ethics",
+    "source": "Benchmark",
+    "language": "en",
+    "symbolic_representation": "(knowledge (culture \"Zulu\"))",
+    "processed_data": {"concepts": ["community", "humanity"], "themes": ["collective_good"], "patterns": []}
+}
+
+
+async def run_profile(readers: int, writers: int, seconds: float, seed_rows: int) -> dict:
+    """Run readers and writers concurrently against a fresh database and collect latencies"""
+    from storage.database import Database
+
+    db = Database()
+    for _ in range(seed_rows):
+        await db.store_knowledge(SAMPLE_ENTRY)
+
+    deadline = time.perf_counter() + seconds
+    read_latencies = []
+    write_latencies = []
+    errors = {"reads": 0, "writes": 0}
+
+    async def timed(operation, latencies, kind):
+        started = time.perf_counter()
+        try:
+            await operation()
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            # e.g. a shared connection rolling back another session's insert, or "database is locked"
+            errors[kind] += 1
+
+    async def reader():
+        while time.perf_counter() < deadline:
+            await timed(lambda: db.list_knowledge(limit=50), read_latencies, "reads")
+
+    async def writer():
+        while time.perf_counter() < deadline:
+            await timed(lambda: db.store_knowledge(SAMPLE_ENTRY), write_latencies, "writes")
+
+    await asyncio.gather(*[reader() for _ in range(readers)], *[writer() for _ in range(writers)])
+    await db.close()
+
+    def percentiles(values, kind):
+        if not values:
+            return {"count": 0, "errors": errors[kind]}
+        ordered = sorted(values)
+        return {
+            "count": len(values),
+            "errors": errors[kind],
+            "per_second": round(len(values) / seconds, 1),
+            "p50_ms": round(statistics.median(ordered) * 1000, 2),
+            "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+        }
+
+    return {"reads": percentiles(read_latencies, "reads"), "writes": percentiles(write_latencies, "writes")}
+
+
+def run_in_subprocess(profile: str, args) -> dict:
+    """Each profile gets its own process and database file so engine settings don't leak"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "SQLITE_PROFILE": profile,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            "ANN_INDEX_PATH": os.path.join(tmp, "ann"),
+            "BENCH_CHILD": "1",
+        }
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.sqlite_concurrency",
+             "--readers", str(args.readers), "--writers", str(args.writers),
+             "--seconds", str(args.seconds), "--seed-rows", str(args.seed_rows)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite reader/writer concurrency benchmark")
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed-rows", type=int, default=500)
+    args = parser.parse_args()
+
+    if os.getenv("BENCH_CHILD"):
+        print(json.dumps(asyncio.run(run_profile(args.readers, args.writers, args.seconds, args.seed_rows))))
+        return
+
+    print(f"⏱️  {args.readers} readers (/knowledge/list) vs {args.writers} writers (/knowledge/ingest), {args.seconds}s per profile\n")
+    print(f"   {'profile':<12} {'op':<6} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'errors':>7}")
+    for profile in ("legacy", "performance"):
+        result = run_in_subprocess(profile, args)
+        for op in ("reads", "writes"):
+            r = result[op]
+            print(f"   {profile:<12} {op:<6} {r.get('per_second', 0):>8} {r.get('p50_ms', '-'):>8} "
+                  f"{r.get('p95_ms', '-'):>8} {r.get('max_ms', '-'):>8} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
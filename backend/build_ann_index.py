@@ -0,0 +1,41 @@
+"""
+Script to (re)build the approximate nearest-neighbour index and report its recall
+Usage: python build_ann_index.py [--lists N] [--nprobe 1,4,8,16] [--k 10] [--sample 200]
+"""
+import argparse
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def build(n_lists: int, nprobes: list, k: int, sample: int):
+    """Train an IVF index from the stored embeddings, save it and measure recall@k"""
+    # Load exact vectors straight from the database rather than a stale saved index
+    os.environ["VECTOR_INDEX"] = "flat"
+    from storage.database import Database
+
+    db = Database()
+    exact = db.vector_index
+    if not len(exact):
+        print("❌ No knowledge entries to index")
+        return
+
+    index = db.build_ann_index(exact, n_lists=n_lists or None)
+    db.vector_index = index
+    db.save_vector_index()
+
+    print(f"\n📏 Recall@{k} against exact search ({min(sample, len(index))} queries)")
+    print(f"   {'nprobe':>6}  {'recall':>7}  {'ann ms':>8}  {'exact ms':>8}")
+    for nprobe in nprobes:
+        report = index.evaluate_recall(k=k, sample_size=sample, nprobe=nprobe)
+        print(f"   {report['nprobe']:>6}  {report['recall_at_k']:>7}  {report['ann_ms']:>8}  {report['exact_ms']:>8}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the ANN index for semantic search")
+    parser.add_argument("--lists", type=int, default=0, help="Number of IVF lists (default: 4 * sqrt(N))")
+    parser.add_argument("--nprobe", default="1,4,8,16,32", help="Comma-separated nprobe values to evaluate")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=200, help="Number of evaluation queries")
+    args = parser.parse_args()
+
+    build(args.lists, [int(n) for n in args.nprobe.split(",")], args.k, args.sample)
@@ -0,0 +1,100 @@
+"""
+Script to report near-duplicate clusters in the existing knowledge base
+Usage: python dedup_report.py [--threshold 0.8] [--limit 20] [--json]
+"""
+import argparse
+import json
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def report(threshold: float, limit: int, as_json: bool):
+    """Group entries whose MinHash similarity is at or above threshold"""
+    # Only the dedup index is needed; building it also backfills missing signatures
+    os.environ["SEARCH_MODE"] = "fulltext"
+    os.environ.setdefault("DEDUP_POLICY", "link")
+    os.environ["DEDUP_THRESHOLD"] = str(threshold)
+    from storage.database import Database, KnowledgeEntry
+    from storage.dedup import similarity
+
+    db = Database()
+    index = db.dedup_index
+    if index is None:
+        print("❌ DEDUP_POLICY=off, nothing to report")
+        return
+    # Fulltext mode leaves the in-memory LSH index empty; the report needs every signature
+    db.build_dedup_index()
+
+    # Union-find over LSH candidate pairs that pass the threshold
+    started = time.perf_counter()
+    parent = {entry_id: entry_id for entry_id in index.signatures}
+
+    def find(entry_id):
+        while parent[entry_id] != entry_id:
+            parent[entry_id] = parent[parent[entry_id]]
+            entry_id = parent[entry_id]
+        return entry_id
+
+    pairs = 0
+    for entry_id, signature in index.signatures.items():
+        for other in index.candidates(signature):
+            if other != entry_id and similarity(signature, index.signatures[other]) >= threshold:
+                pairs += 1
+                parent[find(other)] = find(entry_id)
+
+    clusters = {}
+    for entry_id in parent:
+        clusters.setdefault(find(entry_id), []).append(entry_id)
+    clusters = sorted((ids for ids in clusters.values() if len(ids) > 1), key=len, reverse=True)
+    elapsed = time.perf_counter() - started
+
+    session = db.SessionLocal()
+    try:
+        entries = {
+            row.id: row for row in session.query(
+                KnowledgeEntry.id, KnowledgeEntry.culture, KnowledgeEntry.category,
+                KnowledgeEntry.content, KnowledgeEntry.created_at
+            ).filter(KnowledgeEntry.id.in_([i for ids in clusters[:limit] for i in ids]))
+        }
+    finally:
+        session.close()
+
+    redundant = sum(len(ids) - 1 for ids in clusters)
+    summary = {
+        "entries": len(index),
+        "threshold": threshold,
+        "duplicate_pairs": pairs // 2,
+        "clusters": len(clusters),
+        "redundant_entries": redundant,
+        "seconds": round(elapsed, 3),
+    }
+
+    if as_json:
+        print(json.dumps({
+            **summary,
+            "top_clusters": [
+                [{"id": i, "culture": entries[i].culture, "content": entries[i].content} for i in ids]
+                for ids in clusters[:limit]
+            ]
+        }, indent=2))
+        return
+
+    print(f"\n♻️  {summary['clusters']} near-duplicate clusters in {summary['entries']} entries "
+          f"({redundant} redundant, threshold {threshold}, {elapsed:.2f}s)")
+    for n, ids in enumerate(clusters[:limit], 1):
+        # Oldest entry first: that's the one duplicates would be linked to
+        rows = sorted((entries[i] for i in ids), key=lambda row: row.created_at or 0)
+        print(f"\n   #{n} ({len(ids)} entries)")
+        for row in rows:
+            print(f"      {row.id}  {row.culture} / {row.category}: {row.content[:80]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report near-duplicate knowledge entries")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Minimum estimated Jaccard similarity")
+    parser.add_argument("--limit", type=int, default=20, help="Number of clusters to print")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report(args.threshold, args.limit, args.json)
@@ -0,0 +1,268 @@
+"""
+Script to bulk-import a JSONL or CSV corpus through the ingestion pipeline
+Streams the file, extracts with bounded concurrency, commits in chunks and checkpoints
+after each one, so an interrupted import resumes where it stopped.
+
+Each record needs content, culture and category; source and language are optional.
+Usage: python import_corpus.py corpus.jsonl [--concurrency 16] [--chunk-size 200] [--restart]
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agents.ingestion_agent import IngestionAgent, extraction_cache_stats
+from agents.llm_gateway import BACKGROUND, set_priority
+from agents.symbolic_encoder import SymbolicEncoder
+from storage.database import Database
+from storage.ipfs_client import IPFSClient
+
+REQUIRED_FIELDS = ("content", "culture", "category")
+COUNTERS = ("records", "stored", "duplicates", "failed", "invalid")
+OPTIONAL_FIELDS = ("source", "language")
+
+
+def read_records(path: str, file_format: str, offset: int) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yield (byte offset just past the record, record or None, error) starting at offset.
+
+    Offsets are exact for both formats, including CSV fields spanning lines,
+    because the CSV reader is fed one line at a time from a binary file.
+    """
+    with open(path, "rb") as f:
+        header = None
+        if file_format == "csv":
+            header = next(csv.reader([f.readline().decode("utf-8-sig")]), None)
+            if not header:
+                return
+            offset = max(offset, f.tell())
+        f.seek(offset)
+        position = offset
+
+        def lines():
+            nonlocal position
+            for line in iter(f.readline, b""):
+                position += len(line)
+                yield line.decode("utf-8")
+
+        if file_format == "csv":
+            for row in csv.reader(lines()):
+                if not row:
+                    continue
+                yield position, dict(zip(header, row)), None
+        else:
+            for line in lines():
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield position, None, f"invalid JSON: {e}"
+                    continue
+                if not isinstance(record, dict):
+                    yield position, None, "not a JSON object"
+                    continue
+                yield position, record, None
+
+
+def to_knowledge(record: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """The knowledge entry for a record, or an error naming the missing fields"""
+    missing = [field for field in REQUIRED_FIELDS if not str(record.get(field) or "").strip()]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    knowledge = {field: str(record[field]).strip() for field in REQUIRED_FIELDS}
+    for field in OPTIONAL_FIELDS:
+        if record.get(field):
+            knowledge[field] = str(record[field]).strip()
+    knowledge.setdefault("language", "en")
+    return knowledge, None
+
+
+def load_checkpoint(path: str, source: str) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if checkpoint.get("source") != source:
+        raise SystemExit(f"❌ Checkpoint {path} belongs to {checkpoint.get('source')}; use --restart or --checkpoint")
+    if checkpoint.get("offset", 0) > os.path.getsize(source):
+        raise SystemExit(f"❌ {source} is shorter than the checkpoint offset; it changed since the last run, use --restart")
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]):
+    """Write-then-rename, so a crash never leaves a torn checkpoint"""
+    checkpoint["updated_at"] = datetime.now(timezone.utc).isoformat()
+    staging = f"{path}.tmp"
+    with open(staging, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(staging, path)
+
+
+async def import_corpus(args):
+    # Bulk work: extraction waits behind any interactive calls sharing the gateway
+    set_priority(BACKGROUND)
+    source = os.path.abspath(args.path)
+    file_format = args.format
+    if file_format == "auto":
+        file_format = "csv" if source.lower().endswith(".csv") else "jsonl"
+    checkpoint_path = args.checkpoint or f"{source}.checkpoint.json"
+    errors_path = args.errors or f"{source}.errors.jsonl"
+
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = load_checkpoint(checkpoint_path, source)
+    # totals cover the whole file across runs (and go into the checkpoint); run covers this run only
+    totals = {
+        "records": 0, "stored": 0, "duplicates": 0, "failed": 0, "invalid": 0,
+        **{k: checkpoint[k] for k in COUNTERS if k in checkpoint}
+    }
+    run = {k: 0 for k in COUNTERS}
+    offset = checkpoint.get("offset", 0)
+    if offset:
+        print(f"⏩ Resuming {source} at byte {offset} ({totals['records']} records already done)")
+
+    print(f"📥 Importing {source} ({file_format}, concurrency {args.concurrency}, chunks of {args.chunk_size})")
+    db = Database()
+    ipfs_client = IPFSClient()
+    ingestion_agent = IngestionAgent()
+    symbolic_encoder = SymbolicEncoder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    cache_hits_before = extraction_cache_stats().get("hits", 0)
+
+    async def prepare(knowledge: Dict[str, Any], processed: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            symbolic = await symbolic_encoder.encode(processed)
+            ipfs_hash = await ipfs_client.add_json({
+                "content": knowledge["content"],
+                "culture": knowledge["culture"],
+                "symbolic": symbolic,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            })
+        return {
+            **knowledge,
+            "symbolic_representation": symbolic,
+            "ipfs_hash": ipfs_hash,
+            "processed_data": processed
+        }
+
+    # Rejects of records past the checkpoint were written by a run that crashed before
+    # checkpointing them; they will be rejected (and written) again, so drop them
+    errors_size = checkpoint.get("errors_size")
+    if errors_size is not None and os.path.exists(errors_path) and os.path.getsize(errors_path) > errors_size:
+        os.truncate(errors_path, errors_size)
+    errors = open(errors_path, "a")
+    # Rejects of the current chunk, written just before its checkpoint
+    pending_rejects = []
+
+    def count(kind: str, n: int = 1):
+        totals[kind] += n
+        run[kind] += n
+
+    def reject(record: Any, error: str, kind: str):
+        count(kind)
+        pending_rejects.append(json.dumps({"error": error, "record": record}, default=str) + "\n")
+
+    async def flush(chunk, chunk_offset: int):
+        """Extract, store and checkpoint one chunk of (record, knowledge) pairs"""
+        duplicates = await db.find_duplicates([knowledge["content"] for _, knowledge in chunk])
+        fresh = [(record, knowledge) for (record, knowledge), duplicate in zip(chunk, duplicates) if not duplicate]
+        count("duplicates", len(chunk) - len(fresh))
+
+        # Several documents per extraction request, then encoding and IPFS per entry
+        extracted = await ingestion_agent.process_batch([knowledge for _, knowledge in fresh], concurrency=args.concurrency)
+        prepared = await asyncio.gather(*[
+            prepare(knowledge, processed) for (_, knowledge), processed in zip(fresh, extracted)
+        ], return_exceptions=True)
+        ready = []
+        for (record, _), result in zip(fresh, prepared):
+            if isinstance(result, Exception):
+                reject(record, f"extraction failed: {result}", "failed")
+            else:
+                ready.append((record, result))
+
+        ids = await db.store_knowledge_batch([result for _, result in ready]) if ready else []
+        for (record, _), knowledge_id in zip(ready, ids):
+            if knowledge_id:
+                count("stored")
+            else:
+                reject(record, "database insert failed", "failed")
+
+        errors.writelines(pending_rejects)
+        errors.flush()
+        pending_rejects.clear()
+        save_checkpoint(checkpoint_path, {
+            "source": source, "format": file_format, "offset": chunk_offset,
+            "errors_size": os.path.getsize(errors_path), **totals
+        })
+
+    started = time.perf_counter()
+    chunk = []
+    chunk_offset = offset
+    try:
+        for position, record, error in read_records(source, file_format, offset):
+            if args.limit and run["records"] >= args.limit:
+                break
+            count("records")
+            chunk_offset = position
+
+            knowledge = None
+            if error is None:
+                knowledge, error = to_knowledge(record)
+            if error:
+                reject(record, error, "invalid")
+            else:
+                chunk.append((record, knowledge))
+
+            if len(chunk) >= args.chunk_size:
+                await flush(chunk, chunk_offset)
+                chunk = []
+                elapsed = time.perf_counter() - started
+                print(f"   {run['records']} records, {run['stored']} stored this run "
+                      f"({run['records'] / elapsed:.1f} records/s)")
+
+        # Trailing partial chunk (also records the offset past trailing invalid rows)
+        await flush(chunk, chunk_offset)
+    finally:
+        errors.close()
+        db.save_vector_index()
+        db.save_snapshot(min_pending=db.snapshot_refresh_rows)
+        await db.close()
+
+    elapsed = time.perf_counter() - started
+    cache = extraction_cache_stats()
+    print(f"\n✅ Imported {run['records']} records in {elapsed:.1f}s "
+          f"({run['records'] / elapsed if elapsed else 0:.1f} records/s)")
+    print(f"   this run: stored {run['stored']}, duplicates {run['duplicates']}, "
+          f"failed {run['failed']}, invalid {run['invalid']}")
+    print(f"   whole file so far: {totals['records']} records, stored {totals['stored']}, "
+          f"duplicates {totals['duplicates']}, failed {totals['failed']}, invalid {totals['invalid']}")
+    print(f"   LLM calls {ingestion_agent.llm_calls}, extraction cache hits "
+          f"{cache.get('hits', 0) - cache_hits_before if cache.get('enabled', True) else 'n/a (disabled)'}")
+    if totals["failed"] or totals["invalid"]:
+        print(f"   rejected records: {errors_path}")
+    print(f"   checkpoint: {checkpoint_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import a JSONL or CSV corpus of knowledge entries")
+    parser.add_argument("path", help="JSONL (one object per line) or CSV (with a header row) file")
+    parser.add_argument("--format", choices=("auto", "jsonl", "csv"), default="auto", help="Defaults to the file extension")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("INGEST_BATCH_CONCURRENCY", "16")),
+                        help="Entries extracted at once")
+    parser.add_argument("--chunk-size", type=int, default=int(os.getenv("DB_INSERT_CHUNK_SIZE", "200")),
+                        help="Entries per commit and checkpoint")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint.json)")
+    parser.add_argument("--errors", help="Where rejected records are appended (default: <path>.errors.jsonl)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the top")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many records (0 = all)")
+    args = parser.parse_args()
+
+    asyncio.run(import_corpus(args))
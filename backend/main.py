@@ -1,16 +1,22 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Awaitable, Callable
+import asyncio
 import json
 import os
+import uuid
 from datetime import datetime, timezone
+from sqlalchemy.exc import OperationalError
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-from agents.ingestion_agent import IngestionAgent
+from agents.ingestion_agent import IngestionAgent, extraction_cache_stats
+from agents.llm_client import TransientLLMError, close_async_clients, is_transient
+from agents.llm_gateway import BACKGROUND, INTERACTIVE, gateway_stats, set_priority
 from agents.symbolic_encoder import SymbolicEncoder
 from agents.reasoning_engine import ReasoningEngine
 from agents.neural_translator import NeuralTranslator
@@ -19,6 +25,7 @@ from agents.multimodal_processor import MultiModalProcessor
 from agents.search_agent import SearchAgent
 from storage.ipfs_client import IPFSClient
 from storage.database import Database
+from storage.job_queue import JobQueue, LeaseLost, QueueFull
 
 app = FastAPI(title="Oríkì - Ancestral Intelligence Network")
 
@@ -47,9 +54,54 @@ else:
     # Use direct agents (fallback)
     ingestion_agent = IngestionAgent()
     symbolic_encoder = SymbolicEncoder()
-    reasoning_engine = ReasoningEngine()
+    reasoning_engine = ReasoningEngine(db=db)
     neural_translator = NeuralTranslator()
 
+# Bulk ingestion: entries extracted concurrently, and the most accepted per request
+INGEST_BATCH_CONCURRENCY = int(os.getenv("INGEST_BATCH_CONCURRENCY", "16"))
+INGEST_BATCH_MAX_ENTRIES = int(os.getenv("INGEST_BATCH_MAX_ENTRIES", "1000"))
+
+# Ingestion jobs: /knowledge/ingest and /multimodal/ingest queue the work (202 + job id)
+# and a pool of workers drains the durable queue
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_SPOOL_PATH = os.getenv("JOB_SPOOL_PATH", "./search_index/job_uploads")
+job_queue = JobQueue(
+    os.getenv("JOB_QUEUE_PATH", "./search_index/jobs.db"),
+    max_pending=int(os.getenv("JOB_QUEUE_MAX_PENDING", "1000")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "300")),
+    retry_base_seconds=float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+)
+ingest_workers: List[asyncio.Task] = []
+# Set on enqueue so idle workers don't wait out the poll interval (created on the server's loop)
+job_wakeup: Optional[asyncio.Event] = None
+
+@app.on_event("startup")
+async def startup():
+    """Start the ingestion workers; jobs left from a previous run are picked up again"""
+    global job_wakeup
+    job_wakeup = asyncio.Event()
+    pruned = job_queue.prune()
+    if pruned:
+        print(f"🧹 Pruned {pruned} finished ingestion jobs")
+    for n in range(INGEST_WORKERS):
+        ingest_workers.append(asyncio.create_task(ingestion_worker(n)))
+    print(f"🧵 Started {INGEST_WORKERS} ingestion workers ({job_queue.counts().get('queued', 0)} jobs queued)")
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Persist in-memory search state and release DB connections before the process exits"""
+    # Interrupted jobs go back to the queue for the next start
+    for task in ingest_workers:
+        task.cancel()
+    await asyncio.gather(*ingest_workers, return_exceptions=True)
+    job_queue.close()
+    db.save_vector_index()
+    db.save_snapshot(min_pending=db.snapshot_refresh_rows)
+    await close_async_clients()
+    await db.close()
+
 # Pydantic models
 class KnowledgeInput(BaseModel):
     content: str
@@ -58,9 +110,21 @@ class KnowledgeInput(BaseModel):
     source: Optional[str] = None
     language: Optional[str] = "en"
 
+class BatchKnowledgeInput(BaseModel):
+    entries: List[KnowledgeInput]
+
 class QueryInput(BaseModel):
     question: str
     context: Optional[str] = None
+    # Restrict retrieval to entries with these exact values
+    culture: Optional[str] = None
+    category: Optional[str] = None
+    language: Optional[str] = None
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
 
 class KnowledgeResponse(BaseModel):
     id: str
@@ -70,6 +134,8 @@ class KnowledgeResponse(BaseModel):
     symbolic_representation: str
     ipfs_hash: Optional[str] = None
     created_at: str
+    duplicate_of: Optional[str] = None  # set when the entry was linked to an existing near-duplicate
+    similarity: Optional[float] = None
 
 class ReasoningResponse(BaseModel):
     question: str
@@ -89,62 +155,386 @@ async def root():
         "agent_mode": "fetchai_decentralized" if USE_FETCHAI else "direct"
     }
 
-@app.post("/knowledge/ingest", response_model=KnowledgeResponse)
+async def prepare_knowledge(
+    knowledge_data: Dict[str, Any],
+    on_stage: Optional[Callable[[str], Awaitable[None]]] = None,
+    raise_transient: bool = False,
+    ipfs_extra: Optional[Dict[str, Any]] = None,
+    processed: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Run extraction, symbolic encoding and IPFS storage; returns the record to store.
+    
+    on_stage is told when each step starts; raise_transient is passed to the
+    ingestion agent; ipfs_extra adds fields to the IPFS document; processed is
+    an extraction already done by IngestionAgent.process_batch (direct agents only).
+    """
+    if on_stage:
+        await on_stage("extracting")
+    if processed is not None:
+        symbolic = await symbolic_encoder.encode(processed)
+    elif USE_FETCHAI:
+        # Use Fetch.ai decentralized agent orchestration
+        result = await fetchai_orchestrator.process_knowledge_ingestion(knowledge_data, raise_transient=raise_transient)
+        processed = result["processed_data"]
+        symbolic = result["symbolic_representation"]
+    else:
+        # Use direct agents
+        processed = await ingestion_agent.process(knowledge_data, raise_transient=raise_transient)
+        symbolic = await symbolic_encoder.encode(processed)
+    
+    # Store in IPFS
+    if on_stage:
+        await on_stage("ipfs")
+    ipfs_hash = await ipfs_client.add_json({
+        "content": knowledge_data["content"],
+        "culture": knowledge_data["culture"],
+        "symbolic": symbolic,
+        **(ipfs_extra or {}),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    })
+    
+    return {
+        **knowledge_data,
+        "symbolic_representation": symbolic,
+        "ipfs_hash": ipfs_hash,
+        "processed_data": processed
+    }
+
+async def resolve_duplicate(content: str) -> Optional[Dict[str, Any]]:
+    """Apply DEDUP_POLICY before any LLM work.
+    
+    Raises 409 for a near-duplicate under "reject"; under "link" returns the
+    existing entry (with its similarity) so the caller can answer with it.
+    """
+    duplicate = await db.find_duplicate(content)
+    if not duplicate:
+        return None
+    
+    print(f"♻️  Near-duplicate of {duplicate['id']} (similarity {duplicate['similarity']})")
+    if db.dedup_policy == "reject":
+        raise HTTPException(status_code=409, detail={
+            "message": "Near-duplicate of an existing entry",
+            "duplicate_of": duplicate["id"],
+            "similarity": duplicate["similarity"]
+        })
+    
+    existing = await db.get_knowledge(duplicate["id"])
+    if existing:
+        existing["similarity"] = duplicate["similarity"]
+    return existing
+
+async def enqueue_job(kind: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> JSONResponse:
+    """Queue an ingestion job and answer 202 with where to poll; 503 when the backlog is full"""
+    try:
+        job_id = await asyncio.to_thread(job_queue.enqueue, kind, payload, job_id)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(JOB_POLL_SECONDS * 15))})
+    if job_wakeup:
+        job_wakeup.set()
+    accepted = JobAccepted(job_id=job_id, status="queued", status_url=f"/jobs/{job_id}")
+    return JSONResponse(status_code=202, content=accepted.model_dump())
+
+async def run_knowledge_job(job: Dict[str, Any], on_stage: Callable[[str], Awaitable[None]], raise_transient: bool) -> Dict[str, Any]:
+    """Extraction, encoding, IPFS and DB insert for one queued KnowledgeInput"""
+    knowledge_data = job["payload"]["knowledge"]
+    
+    # Another job may have stored the same text since this one was queued
+    await on_stage("dedup")
+    existing = await resolve_duplicate(knowledge_data["content"])
+    if existing:
+        return {**existing, "duplicate_of": existing["id"]}
+    
+    record = await prepare_knowledge(knowledge_data, on_stage=on_stage, raise_transient=raise_transient)
+    await on_stage("storing")
+    knowledge_id = await db.store_knowledge(record)
+    return {
+        "id": knowledge_id,
+        "content": knowledge_data["content"],
+        "culture": knowledge_data["culture"],
+        "category": knowledge_data["category"],
+        "symbolic_representation": record["symbolic_representation"],
+        "ipfs_hash": record["ipfs_hash"],
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+
+async def run_multimodal_job(job: Dict[str, Any], on_stage: Callable[[str], Awaitable[None]], raise_transient: bool) -> Dict[str, Any]:
+    """Transcribe/analyze the spooled uploads, synthesize the entry, then ingest it"""
+    payload = job["payload"]
+    audio_result = None
+    image_result = None
+    
+    # Process audio if provided
+    if "audio" in payload["files"]:
+        await on_stage("audio")
+        with open(payload["files"]["audio"], "rb") as f:
+            audio_result = await multimodal_processor.process_audio(f.read(), payload["language"])
+    
+    # Process image if provided
+    if "image" in payload["files"]:
+        await on_stage("image")
+        with open(payload["files"]["image"], "rb") as f:
+            image_result = await multimodal_processor.process_image(f.read())
+    
+    # Combine all modalities
+    await on_stage("synthesizing")
+    combined = await multimodal_processor.combine_multimodal(
+        text=payload["text"],
+        audio_result=audio_result,
+        image_result=image_result
+    )
+    
+    # Extract metadata
+    metadata = await multimodal_processor.extract_cultural_metadata(combined)
+    
+    # Create knowledge entry with synthesized content
+    knowledge_data = {
+        "content": combined["synthesized_content"],
+        "culture": payload["culture"],
+        "category": payload["category"],
+        "source": payload["source"] or "Multi-modal submission",
+        "language": payload["language"]
+    }
+    
+    await on_stage("dedup")
+    existing = await resolve_duplicate(knowledge_data["content"])
+    if existing:
+        return {
+            **existing,
+            "multimodal_metadata": metadata,
+            "modalities_used": combined["modalities"],
+            "duplicate_of": existing["id"]
+        }
+    
+    # Store in IPFS with multi-modal metadata
+    record = await prepare_knowledge(
+        knowledge_data,
+        on_stage=on_stage,
+        raise_transient=raise_transient,
+        ipfs_extra={
+            "multimodal_metadata": metadata,
+            "modalities": combined["modalities"],
+            "enriched_context": combined.get("enriched_context", {})
+        }
+    )
+    await on_stage("storing")
+    knowledge_id = await db.store_knowledge(record)
+    return {
+        "id": knowledge_id,
+        "content": knowledge_data["content"],
+        "culture": payload["culture"],
+        "category": payload["category"],
+        "symbolic_representation": record["symbolic_representation"],
+        "ipfs_hash": record["ipfs_hash"],
+        "multimodal_metadata": metadata,
+        "modalities_used": combined["modalities"],
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+
+JOB_HANDLERS = {
+    "knowledge": run_knowledge_job,
+    "multimodal": run_multimodal_job
+}
+
+def is_retryable(error: Exception) -> bool:
+    """LLM outages, network errors and a locked/unavailable database are worth another attempt"""
+    return isinstance(error, (TransientLLMError, OSError, OperationalError)) or is_transient(error)
+
+async def run_job(job: Dict[str, Any]):
+    """Run one claimed job, recording its stages, and complete, retry or fail it"""
+    job_id = job["id"]
+    attempt = job["attempts"]
+    # On the last attempt, settle for keyword extraction rather than failing the job
+    last_attempt = attempt >= job_queue.max_attempts
+    
+    async def on_stage(stage: str):
+        await asyncio.to_thread(job_queue.set_stage, job_id, attempt, stage)
+    
+    async def heartbeat():
+        # A stage can wait on the LLM gateway for longer than a lease
+        while True:
+            await asyncio.sleep(job_queue.lease_seconds / 3)
+            try:
+                if not await asyncio.to_thread(job_queue.renew, job_id, attempt):
+                    return
+            except Exception as e:
+                print(f"⚠️  Lease renewal for job {job_id} failed: {e}")
+    
+    beat = asyncio.create_task(heartbeat())
+    finished = True
+    try:
+        result = await JOB_HANDLERS[job["kind"]](job, on_stage, raise_transient=not last_attempt)
+        await asyncio.to_thread(job_queue.complete, job_id, attempt, result)
+    except asyncio.CancelledError:
+        finished = False
+        try:
+            await asyncio.to_thread(job_queue.release, job_id, attempt)
+        except LeaseLost:
+            pass
+        raise
+    except LeaseLost as e:
+        # Another worker holds the job now (and needs its spooled files)
+        finished = False
+        print(f"⚠️  Ingestion job {job_id} attempt {attempt} abandoned: {e}")
+    except HTTPException as e:
+        # Rejected near-duplicate: retrying can't change the answer
+        detail = e.detail.get("message", str(e.detail)) if isinstance(e.detail, dict) else str(e.detail)
+        try:
+            await asyncio.to_thread(job_queue.fail, job_id, attempt, detail)
+        except LeaseLost:
+            finished = False
+    except Exception as e:
+        try:
+            finished = not await asyncio.to_thread(job_queue.fail, job_id, attempt, str(e), is_retryable(e))
+        except LeaseLost:
+            finished = False
+        print(f"⚠️  Ingestion job {job_id} attempt {attempt} failed: {e}"
+              f"{'' if finished else ' (will retry)'}")
+    finally:
+        beat.cancel()
+        if finished:
+            for path in job["payload"].get("files", {}).values():
+                if os.path.exists(path):
+                    os.remove(path)
+
+async def ingestion_worker(n: int):
+    """Drain the job queue until cancelled, sleeping while it is empty"""
+    # Queued ingestion is never waited on by a user, so its LLM calls go after queries
+    set_priority(BACKGROUND)
+    while True:
+        try:
+            job_wakeup.clear()
+            job = await asyncio.to_thread(job_queue.claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(job_wakeup.wait(), timeout=JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await run_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Queue file unavailable: back off instead of spinning
+            print(f"❌ Ingestion worker {n} error: {e}")
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+@app.post(
+    "/knowledge/ingest",
+    response_model=KnowledgeResponse,
+    responses={202: {"model": JobAccepted, "description": "Queued; poll status_url for the result"}}
+)
 async def ingest_knowledge(knowledge: KnowledgeInput):
-    """Ingest cultural knowledge into the system"""
+    """Ingest cultural knowledge into the system.
+    
+    Near-duplicates are answered right away (200, or 409 under DEDUP_POLICY=reject);
+    everything else is queued and answered with 202 and a job id.
+    """
     try:
-        knowledge_data = knowledge.model_dump()
-        
-        if USE_FETCHAI:
-            # Use Fetch.ai decentralized agent orchestration
-            result = await fetchai_orchestrator.process_knowledge_ingestion(knowledge_data)
-            processed = result["processed_data"]
-            symbolic = result["symbolic_representation"]
-        else:
-            # Use direct agents
-            processed = await ingestion_agent.process(knowledge_data)
-            symbolic = await symbolic_encoder.encode(processed)
-        
-        # Store in IPFS
-        ipfs_hash = await ipfs_client.add_json({
-            "content": knowledge.content,
-            "culture": knowledge.culture,
-            "symbolic": symbolic,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        })
-        
-        # Store metadata in database
-        knowledge_id = await db.store_knowledge({
-            **knowledge_data,
-            "symbolic_representation": symbolic,
-            "ipfs_hash": ipfs_hash,
-            "processed_data": processed
-        })
+        existing = await resolve_duplicate(knowledge.content)
+        if existing:
+            return KnowledgeResponse(
+                id=existing["id"],
+                content=existing["content"],
+                culture=existing["culture"],
+                category=existing["category"],
+                symbolic_representation=existing["symbolic_representation"] or "",
+                ipfs_hash=existing["ipfs_hash"],
+                created_at=existing["created_at"],
+                duplicate_of=existing["id"],
+                similarity=existing["similarity"]
+            )
         
-        return KnowledgeResponse(
-            id=knowledge_id,
-            content=knowledge.content,
-            culture=knowledge.culture,
-            category=knowledge.category,
-            symbolic_representation=symbolic,
-            ipfs_hash=ipfs_hash,
-            created_at=datetime.now(timezone.utc).isoformat()
-        )
+        return await enqueue_job("knowledge", {"knowledge": knowledge.model_dump()})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/knowledge/ingest/batch")
+async def ingest_knowledge_batch(batch: BatchKnowledgeInput):
+    """Ingest many entries: bounded-concurrency extraction, then chunked multi-row inserts.
+    
+    Each entry gets its own status; a failed extraction doesn't fail the batch.
+    """
+    # Someone is waiting on this response, so its extraction goes ahead of queued jobs
+    set_priority(INTERACTIVE)
+    if not batch.entries:
+        raise HTTPException(status_code=400, detail="No entries provided")
+    if len(batch.entries) > INGEST_BATCH_MAX_ENTRIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(batch.entries)} entries (max {INGEST_BATCH_MAX_ENTRIES})"
+        )
+    
+    results: List[Dict[str, Any]] = [{"index": i, "status": "pending"} for i in range(len(batch.entries))]
+    
+    # Near-duplicates (of stored entries or of earlier entries in this batch) skip extraction
+    duplicates = await db.find_duplicates([k.content for k in batch.entries])
+    for result, duplicate in zip(results, duplicates):
+        if duplicate:
+            status = "rejected_duplicate" if db.dedup_policy == "reject" else "duplicate"
+            result.update(status=status, similarity=duplicate["similarity"])
+            if "id" in duplicate:
+                result["duplicate_of"] = duplicate["id"]
+            else:
+                result["duplicate_of_index"] = duplicate["index"]
+    to_prepare = [i for i, result in enumerate(results) if result["status"] == "pending"]
+    
+    # Direct agents pack several entries into each extraction request
+    extracted: List[Optional[Dict[str, Any]]] = [None] * len(to_prepare)
+    if not USE_FETCHAI and to_prepare:
+        extracted = await ingestion_agent.process_batch(
+            [batch.entries[i].model_dump() for i in to_prepare],
+            concurrency=INGEST_BATCH_CONCURRENCY
+        )
+    
+    # Extraction awaits the shared async LLM client; the semaphore bounds in-flight entries
+    semaphore = asyncio.Semaphore(INGEST_BATCH_CONCURRENCY)
+    
+    async def prepare_bounded(knowledge_data: Dict[str, Any], processed: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        async with semaphore:
+            return await prepare_knowledge(knowledge_data, processed=processed)
+    
+    prepared = dict(zip(to_prepare, await asyncio.gather(*[
+        prepare_bounded(batch.entries[i].model_dump(), processed) for i, processed in zip(to_prepare, extracted)
+    ], return_exceptions=True)))
+    
+    for i, record in prepared.items():
+        if isinstance(record, Exception):
+            results[i].update(status="failed", error=str(record))
+    pending = [i for i in to_prepare if results[i]["status"] == "pending"]
+    
+    ids = await db.store_knowledge_batch([prepared[i] for i in pending]) if pending else []
+    for i, knowledge_id in zip(pending, ids):
+        if knowledge_id:
+            results[i].update(status="stored", id=knowledge_id, ipfs_hash=prepared[i]["ipfs_hash"])
+        else:
+            results[i].update(status="failed", error="Database insert failed")
+    
+    return {
+        "results": results,
+        "stored": sum(1 for result in results if result["status"] == "stored"),
+        "duplicates": sum(1 for result in results if result["status"] in ("duplicate", "rejected_duplicate")),
+        "failed": sum(1 for result in results if result["status"] == "failed")
+    }
+
 @app.post("/query", response_model=ReasoningResponse)
 async def query_knowledge(query: QueryInput):
     """Query the cultural knowledge base with reasoning and web search enrichment"""
     try:
         import traceback
         # Retrieve relevant knowledge from database
-        relevant_knowledge = await db.query_knowledge(query.question)
+        query_filters = {
+            field: value
+            for field, value in (("culture", query.culture), ("category", query.category), ("language", query.language))
+            if value
+        }
+        relevant_knowledge = await db.query_knowledge(query.question, **query_filters)
         
         # Enrich with web search if available
         search_results = await search_agent.search_cultural_context(
             query.question,
-            culture=None,  # Will be extracted from relevant_knowledge if available
+            culture=query.culture,
             max_results=3
         )
         print(f"🔍 Search results: enabled={search_results.get('enabled')}, has_answer={bool(search_results.get('answer'))}, results_count={len(search_results.get('results', []))}")
@@ -259,7 +649,8 @@ async def query_knowledge(query: QueryInput):
             # For regular queries, use local knowledge
             reasoning_result = await reasoning_engine.reason(
                 query.question,
-                relevant_knowledge
+                relevant_knowledge,
+                filters=query_filters
             )
             
             # Check if we found local knowledge
@@ -302,12 +693,23 @@ async def query_knowledge(query: QueryInput):
 async def list_knowledge(
     culture: Optional[str] = None,
     category: Optional[str] = None,
-    limit: int = 50
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ):
-    """List stored cultural knowledge"""
+    """List stored cultural knowledge, newest first.
+    
+    Pass next_cursor from the previous page as cursor to continue, and a
+    comma-separated fields list (e.g. fields=culture,concepts,themes) to
+    return only those columns.
+    """
     try:
-        knowledge_list = await db.list_knowledge(culture, category, limit)
-        return {"knowledge": knowledge_list, "count": len(knowledge_list)}
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        knowledge_list = await db.list_knowledge(culture, category, limit, cursor, field_list)
+        next_cursor = db.make_cursor(knowledge_list[-1]) if len(knowledge_list) == limit else None
+        return {"knowledge": knowledge_list, "count": len(knowledge_list), "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -372,7 +774,11 @@ async def process_image(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/multimodal/ingest")
+@app.post(
+    "/multimodal/ingest",
+    status_code=202,
+    response_model=JobAccepted
+)
 async def ingest_multimodal(
     text: Optional[str] = None,
     culture: str = "",
@@ -382,84 +788,61 @@ async def ingest_multimodal(
     source: Optional[str] = None,
     language: str = "en"
 ):
-    """Ingest multi-modal cultural knowledge (text + audio + image)"""
+    """Ingest multi-modal cultural knowledge (text + audio + image).
+    
+    Uploads are spooled to disk and the whole pipeline (transcription, image
+    analysis, synthesis, extraction, IPFS, DB) runs as a job: answers 202 with a job id.
+    """
+    job_id = str(uuid.uuid4())
+    files: Dict[str, str] = {}
     try:
-        audio_result = None
-        image_result = None
-        
-        # Process audio if provided
-        if audio_file:
-            audio_data = await audio_file.read()
-            audio_result = await multimodal_processor.process_audio(audio_data, language)
-        
-        # Process image if provided
-        if image_file:
-            image_data = await image_file.read()
-            image_result = await multimodal_processor.process_image(image_data)
-        
-        # Combine all modalities
-        combined = await multimodal_processor.combine_multimodal(
-            text=text,
-            audio_result=audio_result,
-            image_result=image_result
-        )
-        
-        # Extract metadata
-        metadata = await multimodal_processor.extract_cultural_metadata(combined)
-        
-        # Create knowledge entry with synthesized content
-        knowledge_data = {
-            "content": combined["synthesized_content"],
-            "culture": culture,
-            "category": category,
-            "source": source or "Multi-modal submission",
-            "language": language
-        }
-        
-        # Process through standard pipeline
-        if USE_FETCHAI:
-            result = await fetchai_orchestrator.process_knowledge_ingestion(knowledge_data)
-            processed = result["processed_data"]
-            symbolic = result["symbolic_representation"]
-        else:
-            processed = await ingestion_agent.process(knowledge_data)
-            symbolic = await symbolic_encoder.encode(processed)
-        
-        # Store in IPFS with multi-modal metadata
-        ipfs_data = {
-            "content": knowledge_data["content"],
-            "culture": culture,
-            "symbolic": symbolic,
-            "multimodal_metadata": metadata,
-            "modalities": combined["modalities"],
-            "enriched_context": combined.get("enriched_context", {}),
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        ipfs_hash = await ipfs_client.add_json(ipfs_data)
-        
-        # Store in database
-        knowledge_id = await db.store_knowledge({
-            **knowledge_data,
-            "symbolic_representation": symbolic,
-            "ipfs_hash": ipfs_hash,
-            "processed_data": processed
-        })
+        for name, upload in (("audio", audio_file), ("image", image_file)):
+            if upload:
+                os.makedirs(JOB_SPOOL_PATH, exist_ok=True)
+                path = os.path.join(JOB_SPOOL_PATH, f"{job_id}-{name}")
+                with open(path, "wb") as f:
+                    f.write(await upload.read())
+                files[name] = path
         
-        return {
-            "id": knowledge_id,
-            "content": knowledge_data["content"],
+        return await enqueue_job("multimodal", {
+            "text": text,
             "culture": culture,
             "category": category,
-            "symbolic_representation": symbolic,
-            "ipfs_hash": ipfs_hash,
-            "multimodal_metadata": metadata,
-            "modalities_used": combined["modalities"],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        
+            "source": source,
+            "language": language,
+            "files": files
+        }, job_id=job_id)
     except Exception as e:
+        # Not queued: nothing will ever read the spooled uploads
+        for path in files.values():
+            os.remove(path)
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of an ingestion job: current stage, per-stage timestamps, attempts, result or error"""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    def timestamp(seconds: float) -> str:
+        return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+    
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "stages": [{"stage": s["stage"], "at": timestamp(s["at"])} for s in job["stages"]],
+        "attempts": job["attempts"],
+        "error": job["error"],
+        "result": job["result"],
+        "created_at": timestamp(job["created_at"]),
+        "updated_at": timestamp(job["updated_at"])
+    }
+
 @app.get("/search/status")
 async def search_status():
     """Get search agent status"""
@@ -520,6 +903,17 @@ async def add_web_result_to_knowledge(
             "language": language
         }
         
+        existing = await resolve_duplicate(content)
+        if existing:
+            return {
+                "success": True,
+                "id": existing["id"],
+                "message": "This knowledge is already in the knowledge base",
+                "ipfs_hash": existing["ipfs_hash"],
+                "duplicate_of": existing["id"],
+                "similarity": existing["similarity"]
+            }
+        
         # Process through standard pipeline
         if USE_FETCHAI:
             result = await fetchai_orchestrator.process_knowledge_ingestion(knowledge_data)
@@ -555,9 +949,26 @@ async def add_web_result_to_knowledge(
             "ipfs_hash": ipfs_hash
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/stats/cache")
+async def cache_stats():
+    """Retrieval and extraction cache counters (hits, misses, evictions, memory use)"""
+    return {**db.cache_stats(), "extraction_cache": extraction_cache_stats()}
+
+@app.get("/stats/jobs")
+async def job_stats():
+    """Ingestion job counts by status and queue limits"""
+    return {**await asyncio.to_thread(job_queue.stats), "workers": INGEST_WORKERS}
+
+@app.get("/stats/llm")
+async def llm_stats():
+    """Per-endpoint LLM gateway state: adaptive concurrency limit, queue depth and wait times by priority"""
+    return gateway_stats()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -0,0 +1,42 @@
+"""
+Migration script to add minhash (near-duplicate signature) column to knowledge_entries table
+Existing rows get signatures the next time the API (Database) starts, or via dedup_report.py
+"""
+import os
+from sqlalchemy import create_engine, inspect, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def migrate():
+    """Add minhash column to existing database"""
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./oriki.db")
+    if database_url.startswith("postgres://"):
+        database_url = database_url.replace("postgres://", "postgresql://", 1)
+
+    print("🔄 Connecting to database...")
+    engine = create_engine(database_url)
+
+    try:
+        columns = [c["name"] for c in inspect(engine).get_columns("knowledge_entries")]
+        if "minhash" in columns:
+            print("✅ Column 'minhash' already exists")
+            return
+
+        column_type = "BYTEA" if engine.dialect.name == "postgresql" else "BLOB"
+
+        with engine.connect() as conn:
+            print("📝 Adding 'minhash' column...")
+            conn.execute(text(f"ALTER TABLE knowledge_entries ADD COLUMN minhash {column_type}"))
+            conn.commit()
+
+        print("✅ Migration successful! Column 'minhash' added to knowledge_entries table")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        raise
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,60 @@
+"""
+Migration script to create the entry_concepts / entry_themes / entry_patterns tables
+and backfill them from the JSON columns of existing knowledge_entries rows
+"""
+import os
+from sqlalchemy import create_engine, insert, select
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from storage.database import KnowledgeEntry, TAG_TABLES, tag_rows
+
+BATCH_SIZE = 1000
+
+def migrate():
+    """Create the association tables and fill them for entries that have no tag rows yet"""
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./oriki.db")
+    if database_url.startswith("postgres://"):
+        database_url = database_url.replace("postgres://", "postgresql://", 1)
+
+    print("🔄 Connecting to database...")
+    engine = create_engine(database_url)
+
+    try:
+        for model, _ in TAG_TABLES.values():
+            model.__table__.create(bind=engine, checkfirst=True)
+        print("✅ Association tables ready: " + ", ".join(model.__tablename__ for model, _ in TAG_TABLES.values()))
+
+        with engine.connect() as conn:
+            # Entries written before the tables existed have no rows in any of them
+            tagged = set()
+            for model, _ in TAG_TABLES.values():
+                tagged.update(conn.execute(select(model.entry_id).distinct()).scalars())
+
+            rows = conn.execute(select(
+                KnowledgeEntry.id, KnowledgeEntry.concepts, KnowledgeEntry.themes, KnowledgeEntry.patterns
+            )).all()
+            pending = [row._asdict() for row in rows if row.id not in tagged]
+            print(f"📝 Backfilling tags for {len(pending)} of {len(rows)} entries...")
+
+            written = {field: 0 for field in TAG_TABLES}
+            for start in range(0, len(pending), BATCH_SIZE):
+                batch = pending[start:start + BATCH_SIZE]
+                for field, (model, column) in TAG_TABLES.items():
+                    tags = [tag for row in batch for tag in tag_rows(row["id"], row[field], column)]
+                    if tags:
+                        conn.execute(insert(model), tags)
+                        written[field] += len(tags)
+                conn.commit()
+
+        print("✅ Migration successful! " + ", ".join(f"{count} {field}" for field, count in written.items()) + " rows added")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        raise
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,40 @@
+"""
+Migration script to add tokens (analyzed content terms) column to knowledge_entries table
+Existing rows are analyzed the next time the API (Database) starts and builds its search index
+"""
+import os
+from sqlalchemy import create_engine, inspect, text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def migrate():
+    """Add tokens column to existing database"""
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./oriki.db")
+    if database_url.startswith("postgres://"):
+        database_url = database_url.replace("postgres://", "postgresql://", 1)
+
+    print("🔄 Connecting to database...")
+    engine = create_engine(database_url)
+
+    try:
+        columns = [c["name"] for c in inspect(engine).get_columns("knowledge_entries")]
+        if "tokens" in columns:
+            print("✅ Column 'tokens' already exists")
+            return
+
+        with engine.connect() as conn:
+            print("📝 Adding 'tokens' column...")
+            conn.execute(text("ALTER TABLE knowledge_entries ADD COLUMN tokens TEXT"))
+            conn.commit()
+
+        print("✅ Migration successful! Column 'tokens' added to knowledge_entries table")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        raise
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    migrate()
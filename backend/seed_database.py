@@ -4,7 +4,8 @@ Script to seed the database with example cultural knowledge
 import asyncio
 import sys
 from seed_data import SEED_KNOWLEDGE
-from agents.ingestion_agent import IngestionAgent
+from agents.ingestion_agent import IngestionAgent, extraction_cache_stats
+from agents.llm_gateway import BACKGROUND, set_priority
 from agents.symbolic_encoder import SymbolicEncoder
 from storage.database import Database
 from storage.ipfs_client import IPFSClient
@@ -12,6 +13,7 @@ from datetime import datetime, timezone
 
 async def seed_database():
     """Seed database with example knowledge"""
+    set_priority(BACKGROUND)
     print("🌱 Seeding Oríkì database with cultural knowledge...")
     
     # Initialize components
@@ -20,12 +22,15 @@ async def seed_database():
     ingestion_agent = IngestionAgent()
     symbolic_encoder = SymbolicEncoder()
     
-    for idx, knowledge in enumerate(SEED_KNOWLEDGE, 1):
+    # Extract everything up front, several entries per LLM request
+    print(f"🔍 Extracting concepts and patterns for {len(SEED_KNOWLEDGE)} entries...")
+    extracted = await ingestion_agent.process_batch(SEED_KNOWLEDGE)
+    
+    for idx, (knowledge, processed) in enumerate(zip(SEED_KNOWLEDGE, extracted), 1):
         try:
             print(f"\n[{idx}/{len(SEED_KNOWLEDGE)}] Processing: {knowledge['culture']} - {knowledge['category']}")
             
-            # Process through ingestion agent
-            processed = await ingestion_agent.process(knowledge)
+            # Processed by the ingestion agent
             print(f"  ✓ Extracted {len(processed['concepts'])} concepts, {len(processed['themes'])} themes")
             
             # Encode to symbolic representation
@@ -55,6 +60,9 @@ async def seed_database():
             continue
     
     print(f"\n✅ Successfully seeded {len(SEED_KNOWLEDGE)} knowledge entries")
+    cache = extraction_cache_stats()
+    if cache.get("hits"):
+        print(f"♻️  Reused {cache['hits']} cached extractions ({cache.get('saved_llm_calls', 0):g} LLM calls skipped)")
     cultures = await db.get_cultures()
     print(f"📚 Cultures represented: {', '.join(cultures)}")
     
@@ -0,0 +1,326 @@
+"""
+ANN Index - Inverted-file (IVF) approximate nearest-neighbour search over entry embeddings
+Persisted as .npy files and memory-mapped at startup; new entries go to an in-memory delta
+"""
+import json
+import os
+import re
+import shutil
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from storage.vector_index import AttributeCodes, FILTER_FIELDS, top_k, _grow
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+
+# Older versions kept around for workers that still have them mapped
+KEEP_VERSIONS = 2
+VERSION_NAME = re.compile(r"^v(\d+)-\d+$")
+
+
+def current_index_dir(path: str) -> Optional[str]:
+    """Directory of the current saved version, or None if nothing was saved yet"""
+    try:
+        with open(os.path.join(path, CURRENT_FILE)) as f:
+            return os.path.join(path, f.read().strip())
+    except OSError:
+        pass
+    # Indexes saved before versioning wrote their files straight into path
+    return path if os.path.exists(os.path.join(path, "meta.json")) else None
+
+
+class IVFIndex:
+    """Vectors are clustered around n_lists k-means centroids.
+
+    A query scores only the nprobe lists whose centroids are closest, which
+    trades a little recall for a scan that is roughly nprobe / n_lists of the
+    corpus. culture/category/language filters are applied as a row mask inside
+    each probed list, before any similarity is computed.
+
+    The trained base is immutable and can be memory-mapped from disk; vectors
+    added afterwards are assigned to their nearest list in a delta that is
+    folded into the base on the next save().
+    """
+
+    def __init__(self, dim: int, n_lists: int = 256, nprobe: int = 8):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.codes = AttributeCodes()
+
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+
+        # Base segment, grouped by list: rows offsets[l]:offsets[l + 1] belong to list l
+        self.base_vectors = np.zeros((0, dim), dtype=np.float32)
+        self.base_attributes = np.zeros((0, len(FILTER_FIELDS)), dtype=np.int32)
+        self.base_ids: List[str] = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+        # Delta segment for entries added since the base was built
+        self.delta_vectors = np.zeros((0, dim), dtype=np.float32)
+        self.delta_attributes = np.zeros((0, len(FILTER_FIELDS)), dtype=np.int32)
+        self.delta_ids: List[str] = []
+        self.delta_lists: List[List[int]] = []
+
+        self.positions: Dict[str, Tuple[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, entry_id: str) -> bool:
+        return entry_id in self.positions
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids.shape[0] > 0
+
+    def train(self, vectors: np.ndarray, iterations: int = 10, sample_size: Optional[int] = None, seed: int = 0):
+        """Fit spherical k-means centroids on a sample of the vectors"""
+        rng = np.random.default_rng(seed)
+        n_lists = max(1, min(self.n_lists, len(vectors)))
+        sample_size = sample_size or n_lists * 64
+        if len(vectors) > sample_size:
+            vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+        centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for l in range(n_lists):
+                members = vectors[assignment == l]
+                if len(members):
+                    centroids[l] = members.sum(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            centroids /= np.maximum(norms, 1e-12)
+
+        self.centroids = centroids.astype(np.float32)
+        self.n_lists = n_lists
+        self.delta_lists = [[] for _ in range(n_lists)]
+        self.offsets = np.zeros(n_lists + 1, dtype=np.int64)
+
+    def add(self, entry_id: str, vector: np.ndarray, attributes: Optional[Dict[str, Any]] = None):
+        """Assign a new vector to its nearest list (base vectors are immutable until save)"""
+        if not self.is_trained:
+            raise ValueError("IVFIndex must be trained before vectors are added")
+
+        existing = self.positions.get(entry_id)
+        if existing and existing[0] == "delta":
+            self.delta_vectors[existing[1]] = vector
+            self.delta_attributes[existing[1]] = self.codes.encode(attributes)
+            return
+        if existing:
+            return
+
+        position = len(self.delta_ids)
+        if position == self.delta_vectors.shape[0]:
+            self.delta_vectors = _grow(self.delta_vectors)
+            self.delta_attributes = _grow(self.delta_attributes)
+        self.delta_vectors[position] = vector
+        self.delta_attributes[position] = self.codes.encode(attributes)
+        self.delta_ids.append(entry_id)
+        self.delta_lists[int(np.argmax(self.centroids @ vector))].append(position)
+        self.positions[entry_id] = ("delta", position)
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        k: int = 10,
+        min_score: float = 0.0,
+        filters: Optional[Dict[str, Any]] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """Approximate top-k by cosine similarity over the nprobe closest lists"""
+        if not self.positions:
+            return []
+
+        nprobe = max(1, min(nprobe or self.nprobe, self.n_lists))
+        centroid_scores = self.centroids @ query_vector
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        candidate_ids: List[str] = []
+        candidate_scores: List[np.ndarray] = []
+        for l in probe:
+            start, end = int(self.offsets[l]), int(self.offsets[l + 1])
+            if end > start:
+                self._scan(
+                    self.base_vectors[start:end], self.base_attributes[start:end],
+                    self.base_ids[start:end], query_vector, filters,
+                    candidate_ids, candidate_scores
+                )
+            if self.delta_lists[l]:
+                rows = np.asarray(self.delta_lists[l])
+                self._scan(
+                    self.delta_vectors[rows], self.delta_attributes[rows],
+                    [self.delta_ids[i] for i in rows], query_vector, filters,
+                    candidate_ids, candidate_scores
+                )
+
+        if not candidate_ids:
+            return []
+        scores = np.concatenate(candidate_scores)
+        return [(candidate_ids[i], score) for i, score in top_k(scores, k, min_score)]
+
+    def search_exact(
+        self,
+        query_vector: np.ndarray,
+        k: int = 10,
+        min_score: float = 0.0,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, float]]:
+        """Brute-force top-k over every vector, used as ground truth for recall"""
+        return self.search(query_vector, k, min_score, filters, nprobe=self.n_lists)
+
+    def evaluate_recall(self, k: int = 10, sample_size: int = 100, nprobe: Optional[int] = None, seed: int = 0) -> Dict[str, Any]:
+        """Measure recall@k and latency of the ANN search against exact search"""
+        ids = list(self.positions)
+        if not ids:
+            return {"k": k, "queries": 0, "recall_at_k": None}
+
+        rng = np.random.default_rng(seed)
+        queries = [self._vector(ids[i]) for i in rng.choice(len(ids), min(sample_size, len(ids)), replace=False)]
+
+        found = 0
+        expected = 0
+        ann_time = 0.0
+        exact_time = 0.0
+        for query in queries:
+            started = time.perf_counter()
+            approximate = self.search(query, k, -1.0, nprobe=nprobe)
+            ann_time += time.perf_counter() - started
+
+            started = time.perf_counter()
+            exact = self.search_exact(query, k, -1.0)
+            exact_time += time.perf_counter() - started
+
+            truth = {entry_id for entry_id, _ in exact}
+            found += len(truth & {entry_id for entry_id, _ in approximate})
+            expected += len(truth)
+
+        return {
+            "k": k,
+            "queries": len(queries),
+            "nprobe": nprobe or self.nprobe,
+            "n_lists": self.n_lists,
+            "recall_at_k": round(found / expected, 4) if expected else None,
+            "ann_ms": round(ann_time / len(queries) * 1000, 3),
+            "exact_ms": round(exact_time / len(queries) * 1000, 3),
+        }
+
+    def save(self, path: str):
+        """Fold the delta into the base and write the index as a new version under path.
+
+        Files of a saved version are never rewritten: other workers may have
+        them mapped. The version is staged, renamed into place and then made
+        current by swapping the CURRENT pointer, so load() only ever sees a
+        complete version. Afterwards this index maps the new files itself.
+        """
+        vectors = np.concatenate([self.base_vectors, self.delta_vectors[:len(self.delta_ids)]])
+        attributes = np.concatenate([self.base_attributes, self.delta_attributes[:len(self.delta_ids)]])
+        ids = self.base_ids + self.delta_ids
+
+        assignment = np.argmax(vectors @ self.centroids.T, axis=1) if len(ids) else np.zeros(0, dtype=np.int64)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assignment, minlength=self.n_lists))
+
+        os.makedirs(path, exist_ok=True)
+        name = f"v{time.time_ns()}-{os.getpid()}"
+        staging = os.path.join(path, f".{name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        np.save(os.path.join(staging, "centroids.npy"), self.centroids)
+        np.save(os.path.join(staging, "vectors.npy"), vectors[order])
+        np.save(os.path.join(staging, "attributes.npy"), attributes[order])
+        np.save(os.path.join(staging, "offsets.npy"), offsets)
+        with open(os.path.join(staging, "ids.json"), "w") as f:
+            json.dump([ids[i] for i in order], f)
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump({
+                "format_version": FORMAT_VERSION,
+                "dim": self.dim,
+                "n_lists": self.n_lists,
+                "nprobe": self.nprobe,
+                "count": len(ids),
+                "vocab": self.codes.vocab
+            }, f)
+
+        os.replace(staging, os.path.join(path, name))
+        pointer = os.path.join(path, f".{CURRENT_FILE}.{os.getpid()}")
+        with open(pointer, "w") as f:
+            f.write(name)
+        os.replace(pointer, os.path.join(path, CURRENT_FILE))
+        _prune(path, name)
+
+        self._map(os.path.join(path, name))
+        self.delta_vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self.delta_attributes = np.zeros((0, len(FILTER_FIELDS)), dtype=np.int32)
+        self.delta_ids = []
+        self.delta_lists = [[] for _ in range(self.n_lists)]
+        self.positions = {entry_id: ("base", i) for i, entry_id in enumerate(self.base_ids)}
+
+    @classmethod
+    def load(cls, path: str, nprobe: Optional[int] = None) -> "IVFIndex":
+        """Memory-map the current saved version; pages are shared with other processes reading it"""
+        directory = current_index_dir(path)
+        if directory is None:
+            raise FileNotFoundError(f"No ANN index saved under {path}")
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported ANN index format: {meta.get('format_version')}")
+
+        index = cls(meta["dim"], meta["n_lists"], nprobe or meta["nprobe"])
+        index.codes = AttributeCodes(meta["vocab"])
+        index._map(directory)
+        index.delta_lists = [[] for _ in range(index.n_lists)]
+        index.positions = {entry_id: ("base", i) for i, entry_id in enumerate(index.base_ids)}
+        return index
+
+    def _map(self, directory: str):
+        self.centroids = np.load(os.path.join(directory, "centroids.npy"))
+        self.base_vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        self.base_attributes = np.load(os.path.join(directory, "attributes.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"))
+        with open(os.path.join(directory, "ids.json")) as f:
+            self.base_ids = json.load(f)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "type": "ivf",
+            "entries": len(self.positions),
+            "base_entries": len(self.base_ids),
+            "delta_entries": len(self.delta_ids),
+            "dim": self.dim,
+            "n_lists": self.n_lists,
+            "nprobe": self.nprobe,
+        }
+
+    def _scan(self, vectors, attributes, ids, query_vector, filters, candidate_ids, candidate_scores):
+        mask = self.codes.mask(attributes, filters)
+        if mask is not None:
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                return
+            vectors = vectors[rows]
+            ids = [ids[i] for i in rows]
+        candidate_scores.append(np.asarray(vectors @ query_vector))
+        candidate_ids.extend(ids)
+
+    def _vector(self, entry_id: str) -> np.ndarray:
+        segment, position = self.positions[entry_id]
+        if segment == "base":
+            return np.asarray(self.base_vectors[position])
+        return self.delta_vectors[position]
+
+
+def _prune(path: str, current: str):
+    """Delete all but the newest KEEP_VERSIONS versions (mapped files stay readable on POSIX)"""
+    versions = sorted(
+        (entry for entry in os.listdir(path) if VERSION_NAME.match(entry) and entry != current),
+        key=lambda entry: int(VERSION_NAME.match(entry).group(1)),
+        reverse=True
+    )
+    for name in versions[KEEP_VERSIONS - 1:]:
+        shutil.rmtree(os.path.join(path, name), ignore_errors=True)
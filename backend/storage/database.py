@@ -1,20 +1,45 @@
 """
 Database layer - PostgreSQL with SQLAlchemy
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import base64
+import json
+import time
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import os
-import openai
-from sqlalchemy import create_engine, Column, String, Text, DateTime, JSON, Integer
+import re
+import numpy as np
+from sqlalchemy import create_engine, event, insert, update, and_, or_, Column, String, Text, DateTime, JSON, Integer, LargeBinary, Index, ForeignKey, func, literal, select, union_all
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import inspect as inspect_instance
+from sqlalchemy.orm import sessionmaker, deferred, load_only, undefer
 from sqlalchemy.pool import StaticPool
+from storage.search_index import InvertedIndex
+from storage.vector_index import HashingEmbedder, VectorIndex, vector_to_bytes, vector_from_bytes
+from storage.ann_index import IVFIndex, current_index_dir
+from storage.fulltext import install_fulltext, fulltext_search
+from storage.query_cache import QueryCache, normalize_query
+from storage.disk_cache import DiskCache, cache_key
+from storage.dedup import DedupIndex, MinHasher, signature_to_bytes, signature_from_bytes
+from storage.text_analysis import analyze
+from storage.snapshot import load_snapshot, save_snapshot
+from agents.llm_gateway import complete
 
 Base = declarative_base()
 
 class KnowledgeEntry(Base):
     __tablename__ = 'knowledge_entries'
+    __table_args__ = (
+        # Keyset pagination for /knowledge/list, newest first, optionally per culture/category
+        Index('ix_knowledge_entries_created_at_id', 'created_at', 'id'),
+        Index('ix_knowledge_entries_culture_created_at_id', 'culture', 'created_at', 'id'),
+        Index('ix_knowledge_entries_category_created_at_id', 'category', 'created_at', 'id'),
+    )
     
     id = Column(String, primary_key=True)
     content = Column(Text, nullable=False)
@@ -28,8 +53,96 @@ class KnowledgeEntry(Base):
     concepts = Column(JSON)
     themes = Column(JSON)
     patterns = Column(JSON)  # Reasoning patterns for inference
+    embedding = deferred(Column(LargeBinary))  # float32 vector from HashingEmbedder
+    minhash = deferred(Column(LargeBinary))  # uint32 MinHash signature for near-duplicate detection
+    tokens = deferred(Column(Text))  # space-separated analyze(content, language) terms, computed at ingest
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class CorpusState(Base):
+    """Single row whose version is bumped in the same transaction as every insert.
+    
+    Any process (API workers, job workers, import scripts) that adds entries moves
+    it, so retrieval caches keyed on it never outlive an ingest made elsewhere.
+    """
+    __tablename__ = 'corpus_state'
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class EntryConcept(Base):
+    """Normalized entry <-> concept association (mirrors KnowledgeEntry.concepts)"""
+    __tablename__ = 'entry_concepts'
+    __table_args__ = (Index('ix_entry_concepts_entry_id_concept', 'entry_id', 'concept'),)
+    
+    concept = Column(String, primary_key=True)
+    entry_id = Column(String, ForeignKey('knowledge_entries.id', ondelete='CASCADE'), primary_key=True)
+
+class EntryTheme(Base):
+    """Normalized entry <-> theme association (mirrors KnowledgeEntry.themes)"""
+    __tablename__ = 'entry_themes'
+    __table_args__ = (Index('ix_entry_themes_entry_id_theme', 'entry_id', 'theme'),)
+    
+    theme = Column(String, primary_key=True)
+    entry_id = Column(String, ForeignKey('knowledge_entries.id', ondelete='CASCADE'), primary_key=True)
+
+class EntryPattern(Base):
+    """Normalized entry <-> reasoning pattern association (mirrors KnowledgeEntry.patterns)"""
+    __tablename__ = 'entry_patterns'
+    __table_args__ = (Index('ix_entry_patterns_entry_id_pattern', 'entry_id', 'pattern'),)
+    
+    pattern = Column(String, primary_key=True)
+    entry_id = Column(String, ForeignKey('knowledge_entries.id', ondelete='CASCADE'), primary_key=True)
+
+class EntryMinhashBand(Base):
+    """LSH band buckets of an entry's MinHash signature, so near-duplicate lookups can run in the
+    database instead of an in-process index (fulltext mode keeps no corpus state in the API process)"""
+    __tablename__ = 'entry_minhash_bands'
+    __table_args__ = (Index('ix_entry_minhash_bands_entry_id', 'entry_id'),)
+    
+    band = Column(Integer, primary_key=True)
+    bucket = Column(LargeBinary, primary_key=True)
+    entry_id = Column(String, ForeignKey('knowledge_entries.id', ondelete='CASCADE'), primary_key=True)
+
+# JSON column -> (association model, tag column name); the (tag, entry_id) primary key
+# answers "entries with tag X", the (entry_id, tag) index answers "tags of entry Y"
+TAG_TABLES = {
+    "concepts": (EntryConcept, "concept"),
+    "themes": (EntryTheme, "theme"),
+    "patterns": (EntryPattern, "pattern"),
+}
+
+def normalize_tag(value: Any) -> str:
+    return str(value).strip().lower()
+
+def tag_rows(entry_id: str, values: Optional[List[Any]], column: str) -> List[Dict[str, str]]:
+    """Association rows for one entry's JSON tag list (normalized, deduplicated)"""
+    tags = dict.fromkeys(normalize_tag(v) for v in (values or []) if v is not None)
+    return [{"entry_id": entry_id, column: tag} for tag in tags if tag]
+
+# Bump when the LLM ranking prompt changes so cached rankings are not reused
+RANKING_PROMPT_VERSION = 2
+
+# Rerank prompt sizing: fixed instructions, plus entry snippets sized to the token budget
+RERANK_PROMPT_OVERHEAD_TOKENS = 120
+CHARS_PER_TOKEN = 4
+
+# Bind parameters per statement: SQLite builds before 3.32 allow 999, asyncpg 32767
+SQLITE_MAX_BIND_PARAMS = 999
+POSTGRES_MAX_BIND_PARAMS = 32767
+
+# Reciprocal rank fusion constant for combining vector and BM25 rankings
+RRF_K = 60
+
+# Columns /knowledge/list can project with fields=
+LISTABLE_FIELDS = (
+    "content", "culture", "category", "source", "language", "symbolic_representation",
+    "ipfs_hash", "processed_data", "concepts", "themes", "patterns"
+)
+
+# Snapshot catch-up re-reads rows this far behind the watermark, for inserts that
+# committed after a newer row had already been scanned
+SNAPSHOT_CATCHUP_SLACK = timedelta(minutes=5)
+
 class Database:
     def __init__(self):
         # Get database URL from environment or use SQLite for demo
@@ -39,79 +152,764 @@ class Database:
         if database_url.startswith('postgres://'):
             database_url = database_url.replace('postgres://', 'postgresql://', 1)
         
-        # Create engine
+        # Pool sizing and timeouts (PostgreSQL pools and the async engine)
+        self.pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        self.connect_timeout = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+        self.statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+        
+        # Entries per transaction in store_knowledge_batch; each multi-row INSERT in it is
+        # split further so its bind parameters stay under the database's limit
+        self.insert_chunk_size = max(1, int(os.getenv("DB_INSERT_CHUNK_SIZE", "200")))
+        self.max_bind_params = SQLITE_MAX_BIND_PARAMS if 'sqlite' in database_url else POSTGRES_MAX_BIND_PARAMS
+        
+        # SQLite profile: "performance" (WAL, pooled per-thread connections, tuned pragmas)
+        # or "legacy" (one shared connection, rollback journal)
+        self.sqlite_profile = os.getenv("SQLITE_PROFILE", "performance").lower()
+        self.sqlite_mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+        self.sqlite_cache_kb = int(os.getenv("SQLITE_CACHE_KB", "65536"))
+        self.sqlite_statement_cache = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+        
+        # Create engine (used for startup work: schema, index builds)
         if 'sqlite' in database_url:
-            # SQLite for local development
+            # SQLite for local development and single-node deployments
+            self.engine = create_engine(database_url, **self._sqlite_engine_options(database_url))
+            self._apply_sqlite_pragmas(self.engine)
+        else:
+            # PostgreSQL for production
             self.engine = create_engine(
                 database_url,
-                connect_args={"check_same_thread": False},
-                poolclass=StaticPool
+                pool_pre_ping=True,
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+                pool_recycle=self.pool_recycle,
+                connect_args={
+                    "connect_timeout": self.connect_timeout,
+                    "options": f"-c statement_timeout={self.statement_timeout_ms}"
+                }
             )
-        else:
-            # PostgreSQL for production
-            self.engine = create_engine(database_url, pool_pre_ping=True)
+        
+        # Async engine for request handlers, so DB round trips don't block the event loop
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+        if os.getenv("DB_ASYNC", "true").lower() == "true":
+            self._create_async_engine(database_url)
         
         # Create tables
         Base.metadata.create_all(bind=self.engine)
         
+        self._ensure_corpus_state()
+        
+        # create_all skips indexes on tables that already exist
+        for index in KnowledgeEntry.__table__.indexes:
+            index.create(bind=self.engine, checkfirst=True)
+        
         # Create session factory
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
-        # Setup AI for semantic search
+        # Full-text structures (tsvector/GIN or FTS5) are kept in sync by the database itself
+        self.fulltext_enabled = install_fulltext(self.engine)
+        
+        # Search mode: "semantic" (local vectors), "keyword" (BM25), "fulltext" (ranked in SQL)
+        # or "llm" (per-query LLM ranking)
         self.asi_api_key = os.getenv("ASI_API_KEY", "")
         self.asi_base_url = os.getenv("ASI_BASE_URL", "https://inference.asicloud.cudos.org/v1")
-        self.use_ai_search = bool(self.asi_api_key)
+        self.search_mode = os.getenv("SEARCH_MODE", "semantic").lower()
+        if self.search_mode == "fulltext" and not self.fulltext_enabled:
+            print("⚠️  Full-text search unavailable, using keyword search")
+            self.search_mode = "keyword"
+        self.use_ai_search = self.search_mode == "llm" and bool(self.asi_api_key)
+        
+        # Fulltext mode keeps no corpus state in the API process
+        self.in_memory_search = self.search_mode != "fulltext"
+        
+        # Build the in-process keyword and vector indexes once; store_knowledge keeps them current
+        self.search_index = InvertedIndex()
+        self.embedder = HashingEmbedder(int(os.getenv("EMBEDDING_DIM", "256")))
+        self.semantic_min_score = float(os.getenv("SEMANTIC_MIN_SCORE", "0.1"))
+        
+        # Vector index: "flat" (exact), "ivf" (approximate) or "auto" (ivf once the corpus is large)
+        self.vector_index_mode = os.getenv("VECTOR_INDEX", "auto").lower()
+        self.ann_index_path = os.getenv("ANN_INDEX_PATH", "./search_index/ann")
+        self.ann_min_entries = int(os.getenv("ANN_MIN_ENTRIES", "50000"))
+        self.ann_lists = int(os.getenv("ANN_LISTS", "0"))  # 0 = 4 * sqrt(corpus size)
+        self.ann_nprobe = int(os.getenv("ANN_NPROBE", "8"))
+        self.vector_index = self._open_vector_index()
+        
+        # Memory-mapped snapshot of the indexes: a new worker maps it and only reads newer rows
+        self.snapshot_path = os.getenv("SNAPSHOT_PATH", "./search_index/snapshot")  # empty disables
+        self.snapshot_refresh_rows = int(os.getenv("SNAPSHOT_REFRESH_ROWS", "1000"))
+        self.snapshot_watermark = None
+        self.snapshot_pending = 0  # entries indexed since the snapshot was written
+        
+        # corpus_state version the in-process indexes are caught up to; read before they are
+        # built, so a query that sees a newer one catches up on rows other processes wrote
+        self.corpus_version = None
+        if self.in_memory_search:
+            session = self.SessionLocal()
+            try:
+                self.corpus_version = self._read_corpus_version(session)
+            finally:
+                session.close()
+        
+        if self.in_memory_search:
+            loaded = self._open_snapshot()
+            self._build_search_index(since=self.snapshot_watermark if loaded else None)
+            self._maybe_build_ann_index()
+            self.save_snapshot(min_pending=self.snapshot_refresh_rows if loaded else 0)
+        
+        # Near-duplicate detection at ingest: "link" (reuse the existing entry), "reject" or "off"
+        self.dedup_policy = os.getenv("DEDUP_POLICY", "link").lower()
+        self.minhasher = MinHasher()
+        self.dedup_index = None
+        if self.dedup_policy != "off":
+            self.dedup_index = DedupIndex(self.minhasher, threshold=float(os.getenv("DEDUP_THRESHOLD", "0.8")))
+            # Band buckets are always written to entry_minhash_bands; fulltext mode looks them up
+            # there, the other modes keep the LSH index in memory
+            if self.in_memory_search:
+                self.build_dedup_index()
+            else:
+                self._backfill_dedup_bands()
+        
+        # Retrieval results per normalized query, tagged with the corpus_state version read
+        # from the database, so a result never outlives an ingest by any process
+        self.query_cache = QueryCache(
+            max_entries=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+            max_bytes=int(float(os.getenv("QUERY_CACHE_MAX_MB", "32")) * 1024 * 1024),
+            ttl_seconds=float(os.getenv("QUERY_CACHE_TTL", "300"))
+        )
         
         if self.use_ai_search:
-            self.ai_client = openai.OpenAI(
-                api_key=self.asi_api_key,
-                base_url=self.asi_base_url
+            self.asi_model = os.getenv("ASI_MODEL", "qwen/qwen3-32b")
+        
+        # Reranking: how many first-stage candidates the LLM sees, and the prompt's token budget
+        self.rerank_candidates = max(1, int(os.getenv("RERANK_CANDIDATES", "20")))
+        self.rerank_token_budget = int(os.getenv("RERANK_TOKEN_BUDGET", "1500"))
+        
+        # LLM rankings persist on disk across restarts; the key includes the corpus_state version
+        self.ranking_cache = None
+        self.rerank_fallbacks = 0
+        if self.use_ai_search and int(os.getenv("LLM_RANK_CACHE_SIZE", "10000")) > 0:
+            self.ranking_cache = DiskCache(
+                os.getenv("LLM_CACHE_PATH", "./search_index/llm_cache.db"),
+                max_entries=int(os.getenv("LLM_RANK_CACHE_SIZE", "10000")),
+                max_bytes=int(float(os.getenv("LLM_RANK_CACHE_MAX_MB", "64")) * 1024 * 1024),
+                ttl_seconds=float(os.getenv("LLM_RANK_CACHE_TTL", "86400"))
             )
         
+    def _create_async_engine(self, database_url: str):
+        """Create the asyncpg / aiosqlite engine mirroring the sync engine's settings"""
+        url = make_url(database_url)
+        try:
+            if url.get_backend_name() == "sqlite":
+                self.async_engine = create_async_engine(
+                    url.set(drivername="sqlite+aiosqlite"),
+                    **self._sqlite_engine_options(database_url, use_async=True)
+                )
+                self._apply_sqlite_pragmas(self.async_engine.sync_engine)
+            else:
+                connect_args = {
+                    "timeout": self.connect_timeout,
+                    "command_timeout": self.statement_timeout_ms / 1000
+                }
+                # asyncpg takes ssl as a connect argument rather than libpq's sslmode
+                sslmode = url.query.get("sslmode")
+                if sslmode and sslmode != "disable":
+                    connect_args["ssl"] = "require"
+                self.async_engine = create_async_engine(
+                    url.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"]),
+                    pool_pre_ping=True,
+                    pool_size=self.pool_size,
+                    max_overflow=self.max_overflow,
+                    pool_timeout=self.pool_timeout,
+                    pool_recycle=self.pool_recycle,
+                    connect_args=connect_args
+                )
+        except ImportError as e:
+            print(f"⚠️  Async database driver unavailable ({e}), running queries in a thread pool")
+            return
+        
+        self.AsyncSessionLocal = async_sessionmaker(
+            self.async_engine, autoflush=False, expire_on_commit=False
+        )
+    
+    def _sqlite_engine_options(self, database_url: str, use_async: bool = False) -> Dict[str, Any]:
+        """Pool and connect arguments for the SQLite profile"""
+        connect_args = {"check_same_thread": False, "timeout": self.connect_timeout}
+        in_memory = ":memory:" in database_url or database_url.rstrip("/").endswith("sqlite:")
+        
+        if self.sqlite_profile == "legacy" and use_async and not in_memory:
+            # One pooled connection: sessions queue for it instead of sharing it mid-transaction
+            return {"connect_args": connect_args, "pool_size": 1, "max_overflow": 0}
+        if self.sqlite_profile == "legacy" or in_memory:
+            # A single shared connection (required for in-memory databases)
+            return {"connect_args": connect_args, "poolclass": StaticPool}
+        
+        # Each worker thread checks out its own connection; WAL lets readers run beside the writer
+        connect_args["cached_statements"] = self.sqlite_statement_cache
+        return {
+            "connect_args": connect_args,
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "query_cache_size": self.sqlite_statement_cache * 2
+        }
+    
+    def _apply_sqlite_pragmas(self, engine):
+        """Set the per-connection pragmas of the performance profile"""
+        if self.sqlite_profile == "legacy":
+            return
+        
+        busy_timeout_ms = self.connect_timeout * 1000
+        
+        @event.listens_for(engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                cursor.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+                cursor.execute(f"PRAGMA mmap_size={self.sqlite_mmap_size}")
+                cursor.execute(f"PRAGMA cache_size=-{self.sqlite_cache_kb}")
+                cursor.execute("PRAGMA temp_store=MEMORY")
+            finally:
+                cursor.close()
+    
+    def _ensure_corpus_state(self):
+        try:
+            with self.engine.begin() as conn:
+                if conn.execute(select(CorpusState.id).where(CorpusState.id == 1)).first() is None:
+                    conn.execute(insert(CorpusState).values(id=1, version=0))
+        except IntegrityError:
+            pass  # another worker created it first
+    
+    def _bump_corpus_version(self, session):
+        session.execute(update(CorpusState).where(CorpusState.id == 1).values(version=CorpusState.version + 1))
+    
+    def _read_corpus_version(self, session) -> int:
+        return session.execute(select(CorpusState.version).where(CorpusState.id == 1)).scalar() or 0
+    
+    async def _run(self, fn, *args):
+        """Run fn(session, *args) without blocking the event loop.
+        
+        With the async engine the ORM work runs on an asyncpg/aiosqlite connection;
+        otherwise the sync session is driven from a worker thread.
+        """
+        if self.AsyncSessionLocal:
+            async with self.AsyncSessionLocal() as session:
+                return await session.run_sync(fn, *args)
+        return await asyncio.to_thread(self._run_sync, fn, *args)
+    
+    def _run_sync(self, fn, *args):
+        session = self.SessionLocal()
+        try:
+            return fn(session, *args)
+        finally:
+            session.close()
+    
+    async def close(self):
+        """Dispose of connection pools"""
+        if self.async_engine:
+            await self.async_engine.dispose()
+        self.engine.dispose()
+        if self.ranking_cache:
+            self.ranking_cache.close()
+    
     async def store_knowledge(self, knowledge_data: Dict[str, Any]) -> str:
         """Store knowledge entry"""
-        knowledge_id = str(uuid.uuid4())
+        embedding = self._embed_knowledge(knowledge_data)
+        signature = self.minhasher.signature(knowledge_data["content"])
+        
+        entry_dict = await self._run(self._store_knowledge, knowledge_data, embedding, signature)
+        
+        # Index updates stay on the event loop thread
+        if self.in_memory_search:
+            self.search_index.add(entry_dict)
+            self.vector_index.add(entry_dict["id"], embedding, knowledge_data)
+            self.snapshot_pending += 1
+            if self.dedup_index is not None:
+                self.dedup_index.add(entry_dict["id"], signature)
+        
+        return entry_dict["id"]
+    
+    def _store_knowledge(self, session, knowledge_data: Dict[str, Any], embedding: np.ndarray, signature: np.ndarray) -> Dict[str, Any]:
+        row = self._entry_row(knowledge_data, embedding, signature)
+        entry = KnowledgeEntry(**row)
+        
+        session.add(entry)
+        session.flush()
+        self._store_tags(session, [self._entry_row_tags(entry)])
+        self._store_dedup_bands(session, [(entry.id, signature)])
+        self._bump_corpus_version(session)
+        session.commit()
+        session.refresh(entry)
+        
+        entry_dict = self._entry_to_dict(entry)
+        entry_dict["tokens"] = row["tokens"].split()
+        return entry_dict
+    
+    async def store_knowledge_batch(self, items: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Store many knowledge entries, one transaction of multi-row INSERTs per chunk of insert_chunk_size.
+        
+        Returns ids in input order; entries whose chunk failed to insert get None.
+        """
+        embeddings = [self._embed_knowledge(knowledge_data) for knowledge_data in items]
+        signatures = [self.minhasher.signature(knowledge_data["content"]) for knowledge_data in items]
+        
+        ids: List[Optional[str]] = []
+        for start in range(0, len(items), self.insert_chunk_size):
+            chunk = items[start:start + self.insert_chunk_size]
+            chunk_embeddings = embeddings[start:start + self.insert_chunk_size]
+            chunk_signatures = signatures[start:start + self.insert_chunk_size]
+            try:
+                rows = await self._run(self._store_knowledge_batch, chunk, chunk_embeddings, chunk_signatures)
+            except Exception as e:
+                print(f"❌ Batch insert failed for entries {start}-{start + len(chunk) - 1}: {e}")
+                ids.extend([None] * len(chunk))
+                continue
+            
+            if self.in_memory_search:
+                for row, knowledge_data, embedding in zip(rows, chunk, chunk_embeddings):
+                    self.search_index.add(row)
+                    self.vector_index.add(row["id"], embedding, knowledge_data)
+                self.snapshot_pending += len(rows)
+                if self.dedup_index is not None:
+                    for row, signature in zip(rows, chunk_signatures):
+                        self.dedup_index.add(row["id"], signature)
+            ids.extend(row["id"] for row in rows)
+        
+        return ids
+    
+    def _store_knowledge_batch(
+        self,
+        session,
+        items: List[Dict[str, Any]],
+        embeddings: List[np.ndarray],
+        signatures: List[np.ndarray]
+    ) -> List[Dict[str, Any]]:
+        rows = [self._entry_row(*row) for row in zip(items, embeddings, signatures)]
+        self._insert_many(session, KnowledgeEntry, rows)
+        self._store_tags(session, rows)
+        self._store_dedup_bands(session, [(row["id"], signature) for row, signature in zip(rows, signatures)])
+        self._bump_corpus_version(session)
+        session.commit()
+        return rows
+    
+    def _entry_row_tags(self, entry: KnowledgeEntry) -> Dict[str, Any]:
+        return {"id": entry.id, "concepts": entry.concepts, "themes": entry.themes, "patterns": entry.patterns}
+    
+    def _store_tags(self, session, rows: List[Dict[str, Any]]):
+        """Write the concept/theme/pattern association rows for new entries"""
+        for field, (model, column) in TAG_TABLES.items():
+            tags = [tag for row in rows for tag in tag_rows(row["id"], row.get(field), column)]
+            self._insert_many(session, model, tags)
+    
+    def _store_dedup_bands(self, session, signed: List[Tuple[str, np.ndarray]]):
+        """Write the LSH band rows for new entries' MinHash signatures"""
+        if self.dedup_index is None:
+            return
+        bands = [
+            {"band": band, "bucket": bucket, "entry_id": entry_id}
+            for entry_id, signature in signed
+            for band, bucket in self.dedup_index.band_keys(signature)
+        ]
+        self._insert_many(session, EntryMinhashBand, bands)
+    
+    def _insert_many(self, session, model, rows: List[Dict[str, Any]]):
+        """Multi-row INSERTs of rows, each under the database's bind-parameter limit"""
+        if not rows:
+            return
+        per_statement = max(1, self.max_bind_params // len(rows[0]))
+        for start in range(0, len(rows), per_statement):
+            session.execute(insert(model).values(rows[start:start + per_statement]))
+    
+    def _embed_knowledge(self, knowledge_data: Dict[str, Any]) -> np.ndarray:
+        return self.embedder.embed_entry({
+            **knowledge_data,
+            "concepts": knowledge_data.get("processed_data", {}).get("concepts", []),
+            "themes": knowledge_data.get("processed_data", {}).get("themes", [])
+        })
+    
+    def _entry_row(self, knowledge_data: Dict[str, Any], embedding: np.ndarray, signature: np.ndarray) -> Dict[str, Any]:
+        """Column values for a new knowledge_entries row"""
+        processed = knowledge_data.get("processed_data", {})
+        return {
+            "id": str(uuid.uuid4()),
+            "content": knowledge_data["content"],
+            "culture": knowledge_data["culture"],
+            "category": knowledge_data["category"],
+            "source": knowledge_data.get("source"),
+            "language": knowledge_data.get("language", "en"),
+            "symbolic_representation": knowledge_data["symbolic_representation"],
+            "ipfs_hash": knowledge_data.get("ipfs_hash"),
+            "processed_data": processed,
+            "concepts": processed.get("concepts", []),
+            "themes": processed.get("themes", []),
+            "patterns": processed.get("patterns", []),
+            "embedding": vector_to_bytes(embedding),
+            "minhash": signature_to_bytes(signature),
+            "tokens": " ".join(analyze(knowledge_data["content"], knowledge_data.get("language", "en"))),
+            "created_at": datetime.now(timezone.utc)
+        }
+    
+    async def get_knowledge(self, knowledge_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve specific knowledge entry"""
+        return await self._run(self._get_knowledge, knowledge_id)
+    
+    def _get_knowledge(self, session, knowledge_id: str) -> Optional[Dict[str, Any]]:
+        entry = session.query(KnowledgeEntry).filter(KnowledgeEntry.id == knowledge_id).first()
+        if entry:
+            return self._entry_to_dict(entry)
+        return None
+    
+    def _build_search_index(self, since: Optional[datetime] = None):
+        """Load entries into the inverted index and their stored embeddings into the vector index.
         
+        With since (a snapshot watermark), only rows created from then on are read.
+        """
         session = self.SessionLocal()
         try:
-            entry = KnowledgeEntry(
-                id=knowledge_id,
-                content=knowledge_data["content"],
-                culture=knowledge_data["culture"],
-                category=knowledge_data["category"],
-                source=knowledge_data.get("source"),
-                language=knowledge_data.get("language", "en"),
-                symbolic_representation=knowledge_data["symbolic_representation"],
-                ipfs_hash=knowledge_data.get("ipfs_hash"),
-                processed_data=knowledge_data.get("processed_data", {}),
-                concepts=knowledge_data.get("processed_data", {}).get("concepts", []),
-                themes=knowledge_data.get("processed_data", {}).get("themes", []),
-                patterns=knowledge_data.get("processed_data", {}).get("patterns", []),
-                created_at=datetime.now(timezone.utc)
+            query = session.query(
+                KnowledgeEntry.id,
+                KnowledgeEntry.content,
+                KnowledgeEntry.culture,
+                KnowledgeEntry.category,
+                KnowledgeEntry.language,
+                KnowledgeEntry.concepts,
+                KnowledgeEntry.themes,
+                KnowledgeEntry.tokens,
+                KnowledgeEntry.created_at
             )
+            if since is not None:
+                query = query.filter(KnowledgeEntry.created_at >= since - SNAPSHOT_CATCHUP_SLACK)
             
-            session.add(entry)
+            indexed = 0
+            missing_tokens = []
+            for row in query.yield_per(1000):
+                if row.created_at and (self.snapshot_watermark is None or row.created_at > self.snapshot_watermark):
+                    self.snapshot_watermark = row.created_at
+                if row.id in self.search_index:
+                    continue
+                entry = row._asdict()
+                if entry["tokens"] is None:
+                    # Rows from before the tokens column are analyzed once here
+                    entry["tokens"] = " ".join(analyze(entry["content"], entry["language"] or "en"))
+                    missing_tokens.append({"id": entry["id"], "tokens": entry["tokens"]})
+                self.search_index.add(entry)
+                indexed += 1
+            self.snapshot_pending += indexed
+            
+            # Covers caught-up rows and snapshot entries missing from an older saved ANN index
+            missing_vectors = [entry_id for entry_id in self.search_index.doc_numbers if entry_id not in self.vector_index]
+            
+            for start in range(0, len(missing_tokens), 1000):
+                session.execute(update(KnowledgeEntry), missing_tokens[start:start + 1000])
+            
+            # A memory-mapped ANN index already holds most vectors; only load the rest
+            backfilled = 0
+            for start in range(0, len(missing_vectors), 1000):
+                backfilled += self._load_vectors(session, missing_vectors[start:start + 1000])
             session.commit()
-            session.refresh(entry)
             
-            return knowledge_id
+            print(f"🗂️  Search index built: {len(self.search_index)} entries ({indexed} read from the database), "
+                  f"{len(missing_vectors)} vectors loaded ({backfilled} embeddings, "
+                  f"{len(missing_tokens)} token streams backfilled)")
         finally:
             session.close()
     
-    async def get_knowledge(self, knowledge_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieve specific knowledge entry"""
+    async def _catch_up_search_index(self):
+        """Index rows written since the watermark (by any process) into the in-memory indexes"""
+        rows = await self._run(self._read_rows_since, self.snapshot_watermark)
+        
+        # Index updates stay on the event loop thread
+        indexed = 0
+        for entry in rows:
+            if entry["created_at"] and (self.snapshot_watermark is None or entry["created_at"] > self.snapshot_watermark):
+                self.snapshot_watermark = entry["created_at"]
+            if entry["id"] in self.search_index:
+                continue
+            if entry["tokens"] is None:
+                entry["tokens"] = " ".join(analyze(entry["content"], entry["language"] or "en"))
+            self.search_index.add(entry)
+            
+            vector = vector_from_bytes(entry["embedding"]) if entry["embedding"] else None
+            if vector is None or vector.shape[0] != self.embedder.dim:
+                vector = self.embedder.embed_entry(entry)
+            self.vector_index.add(entry["id"], vector, entry)
+            
+            if self.dedup_index is not None:
+                signature = signature_from_bytes(entry["minhash"]) if entry["minhash"] else None
+                if signature is None or signature.shape[0] != self.minhasher.num_perm:
+                    signature = self.minhasher.signature(entry["content"])
+                self.dedup_index.add(entry["id"], signature)
+            indexed += 1
+        
+        self.snapshot_pending += indexed
+        if indexed:
+            print(f"🗂️  Search index caught up: {indexed} entries written by other processes")
+    
+    def _read_rows_since(self, session, since: Optional[datetime]) -> List[Dict[str, Any]]:
+        query = select(
+            KnowledgeEntry.id,
+            KnowledgeEntry.content,
+            KnowledgeEntry.culture,
+            KnowledgeEntry.category,
+            KnowledgeEntry.language,
+            KnowledgeEntry.concepts,
+            KnowledgeEntry.themes,
+            KnowledgeEntry.tokens,
+            KnowledgeEntry.embedding,
+            KnowledgeEntry.minhash,
+            KnowledgeEntry.created_at
+        )
+        if since is not None:
+            query = query.where(KnowledgeEntry.created_at >= since - SNAPSHOT_CATCHUP_SLACK)
+        return [row._asdict() for row in session.execute(query).all()]
+    
+    def _load_vectors(self, session, ids: List[str]) -> int:
+        """Add stored embeddings for ids to the vector index, embedding rows that have none"""
+        rows = session.query(
+            KnowledgeEntry.id,
+            KnowledgeEntry.content,
+            KnowledgeEntry.culture,
+            KnowledgeEntry.category,
+            KnowledgeEntry.language,
+            KnowledgeEntry.concepts,
+            KnowledgeEntry.themes,
+            KnowledgeEntry.embedding
+        ).filter(KnowledgeEntry.id.in_(ids)).all()
+        
+        backfilled = 0
+        for row in rows:
+            entry = row._asdict()
+            vector = vector_from_bytes(entry["embedding"]) if entry["embedding"] else None
+            if vector is None or vector.shape[0] != self.embedder.dim:
+                # Rows from before embeddings (or a different EMBEDDING_DIM) are embedded once here
+                vector = self.embedder.embed_entry(entry)
+                session.query(KnowledgeEntry).filter(KnowledgeEntry.id == entry["id"]).update(
+                    {KnowledgeEntry.embedding: vector_to_bytes(vector)}, synchronize_session=False
+                )
+                backfilled += 1
+            self.vector_index.add(entry["id"], vector, entry)
+        
+        return backfilled
+    
+    def build_dedup_index(self):
+        """Load stored MinHash signatures into the LSH index, computing any that are missing"""
         session = self.SessionLocal()
         try:
-            entry = session.query(KnowledgeEntry).filter(KnowledgeEntry.id == knowledge_id).first()
-            if entry:
-                return self._entry_to_dict(entry)
-            return None
+            missing = []
+            rows = session.query(KnowledgeEntry.id, KnowledgeEntry.content, KnowledgeEntry.minhash).yield_per(1000)
+            for row in rows:
+                signature = signature_from_bytes(row.minhash) if row.minhash else None
+                if signature is None or signature.shape[0] != self.minhasher.num_perm:
+                    signature = self.minhasher.signature(row.content)
+                    missing.append({"id": row.id, "minhash": signature_to_bytes(signature)})
+                self.dedup_index.add(row.id, signature)
+            
+            # Rows from before signatures existed are backfilled once
+            for start in range(0, len(missing), 1000):
+                session.execute(update(KnowledgeEntry), missing[start:start + 1000])
+            session.commit()
+            
+            print(f"🧬 Dedup index built: {len(self.dedup_index)} signatures ({len(missing)} backfilled)")
         finally:
             session.close()
     
-    def _entry_to_dict(self, entry: KnowledgeEntry) -> Dict[str, Any]:
-        """Convert SQLAlchemy model to dict"""
-        return {
+    def _backfill_dedup_bands(self):
+        """Write band rows (and signatures) for entries stored before entry_minhash_bands existed"""
+        unbanded = (
+            select(KnowledgeEntry.id, KnowledgeEntry.content, KnowledgeEntry.minhash)
+            .where(~select(EntryMinhashBand.entry_id).where(EntryMinhashBand.entry_id == KnowledgeEntry.id).exists())
+            .limit(1000)
+        )
+        backfilled = 0
+        session = self.SessionLocal()
+        try:
+            while True:
+                rows = session.execute(unbanded).all()
+                if not rows:
+                    break
+                signed = []
+                missing = []
+                for row in rows:
+                    signature = signature_from_bytes(row.minhash) if row.minhash else None
+                    if signature is None or signature.shape[0] != self.minhasher.num_perm:
+                        signature = self.minhasher.signature(row.content)
+                        missing.append({"id": row.id, "minhash": signature_to_bytes(signature)})
+                    signed.append((row.id, signature))
+                if missing:
+                    session.execute(update(KnowledgeEntry), missing)
+                self._store_dedup_bands(session, signed)
+                session.commit()
+                backfilled += len(rows)
+        finally:
+            session.close()
+        print(f"🧬 Dedup lookups in the database ({backfilled} entries backfilled)")
+    
+    async def find_duplicate(self, content: str) -> Optional[Dict[str, Any]]:
+        """Closest existing entry whose content is a near-duplicate, as {"id", "similarity"}"""
+        if self.dedup_index is None:
+            return None
+        match = (await self._match_existing([self.minhasher.signature(content)]))[0]
+        return {"id": match[0], "similarity": round(match[1], 4)} if match else None
+    
+    async def find_duplicates(self, contents: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """find_duplicate for a batch, also catching repeats within the batch ({"index", "similarity"})"""
+        if self.dedup_index is None:
+            return [None] * len(contents)
+        
+        signatures = [self.minhasher.signature(content) for content in contents]
+        matches = await self._match_existing(signatures)
+        batch_index = DedupIndex(self.minhasher, threshold=self.dedup_index.threshold)
+        duplicates = []
+        for i, (signature, match) in enumerate(zip(signatures, matches)):
+            if match:
+                duplicates.append({"id": match[0], "similarity": round(match[1], 4)})
+                continue
+            match = batch_index.find(signature)
+            if match:
+                duplicates.append({"index": int(match[0]), "similarity": round(match[1], 4)})
+                continue
+            batch_index.add(str(i), signature)
+            duplicates.append(None)
+        return duplicates
+    
+    async def _match_existing(self, signatures: List[np.ndarray]) -> List[Optional[Tuple[str, float]]]:
+        """Best stored near-duplicate per signature, from memory or from entry_minhash_bands"""
+        if self.in_memory_search:
+            return [self.dedup_index.find(signature) for signature in signatures]
+        return await self._run(self._match_in_database, signatures)
+    
+    def _match_in_database(self, session, signatures: List[np.ndarray]) -> List[Optional[Tuple[str, float]]]:
+        matches = []
+        for signature in signatures:
+            buckets = or_(*[
+                and_(EntryMinhashBand.band == band, EntryMinhashBand.bucket == bucket)
+                for band, bucket in self.dedup_index.band_keys(signature)
+            ])
+            rows = session.execute(
+                select(KnowledgeEntry.id, KnowledgeEntry.minhash).where(
+                    KnowledgeEntry.id.in_(select(EntryMinhashBand.entry_id).where(buckets))
+                )
+            ).all()
+            matches.append(self.dedup_index.best_match(
+                signature, ((row.id, signature_from_bytes(row.minhash)) for row in rows if row.minhash)
+            ))
+        return matches
+    
+    def _open_vector_index(self):
+        """Memory-map a saved ANN index if there is one, otherwise start an exact index"""
+        if self.vector_index_mode != "flat" and current_index_dir(self.ann_index_path):
+            try:
+                index = IVFIndex.load(self.ann_index_path, nprobe=self.ann_nprobe)
+                if index.dim == self.embedder.dim:
+                    print(f"🧭 Loaded ANN index from {self.ann_index_path}: {len(index)} vectors")
+                    return index
+            except Exception as e:
+                print(f"ANN index load failed: {e}, rebuilding")
+        return VectorIndex(self.embedder.dim)
+    
+    def _maybe_build_ann_index(self):
+        """Switch from the exact index to an IVF index once the corpus is big enough"""
+        if not isinstance(self.vector_index, VectorIndex) or self.vector_index_mode == "flat":
+            return
+        if self.vector_index_mode == "auto" and len(self.vector_index) < self.ann_min_entries:
+            return
+        if not len(self.vector_index):
+            return
+        
+        self.vector_index = self.build_ann_index(self.vector_index)
+        self.save_vector_index()
+    
+    def build_ann_index(self, source: VectorIndex, n_lists: Optional[int] = None) -> IVFIndex:
+        """Train an IVF index on the vectors of an exact index and copy them in"""
+        count = len(source)
+        n_lists = n_lists or self.ann_lists or max(1, int(4 * count ** 0.5))
+        print(f"🧭 Training ANN index: {count} vectors, {n_lists} lists")
+        
+        index = IVFIndex(self.embedder.dim, n_lists=n_lists, nprobe=self.ann_nprobe)
+        index.codes = source.codes
+        vectors, attributes = source.matrix()
+        index.train(vectors)
+        
+        # Bulk-assign instead of calling add() per vector
+        index.delta_ids = list(source.ids)
+        index.delta_vectors = np.array(vectors)
+        index.delta_attributes = np.array(attributes)
+        assignment = np.argmax(index.delta_vectors @ index.centroids.T, axis=1)
+        for position, l in enumerate(assignment):
+            index.delta_lists[l].append(position)
+            index.positions[index.delta_ids[position]] = ("delta", position)
+        return index
+    
+    def save_vector_index(self):
+        """Persist the ANN index (no-op for the exact index)"""
+        if isinstance(self.vector_index, IVFIndex):
+            self.vector_index.save(self.ann_index_path)
+            print(f"🧭 Saved ANN index to {self.ann_index_path}: {len(self.vector_index)} vectors")
+    
+    def _open_snapshot(self) -> bool:
+        """Map the current corpus snapshot into the search indexes; False if there is none"""
+        if not self.snapshot_path:
+            return False
+        try:
+            loaded = load_snapshot(self.snapshot_path)
+        except Exception as e:
+            print(f"Snapshot load failed: {e}, rebuilding from the database")
+            return False
+        if loaded is None:
+            return False
+        
+        meta, search_index, vector_index = loaded
+        self.search_index = search_index
+        # A saved ANN index already maps its own vectors; otherwise use the snapshot's
+        if isinstance(self.vector_index, VectorIndex) and vector_index is not None and vector_index.dim == self.embedder.dim:
+            self.vector_index = vector_index
+        self.snapshot_watermark = meta["watermark"]
+        print(f"📸 Mapped snapshot v{meta['version']} from {meta['path']}: {meta['entries']} entries")
+        return True
+    
+    def save_snapshot(self, min_pending: int = 0):
+        """Write the in-process indexes as a new snapshot version (no-op in fulltext mode).
+        
+        Skipped while fewer than min_pending entries were indexed since the last one.
+        """
+        if not (self.in_memory_search and self.snapshot_path) or self.snapshot_pending < min_pending:
+            return
+        try:
+            vectors = self.vector_index if isinstance(self.vector_index, VectorIndex) else None
+            meta = save_snapshot(self.snapshot_path, self.search_index, vectors, self.snapshot_watermark)
+        except Exception as e:
+            print(f"Snapshot save failed: {e}")
+            return
+        self.snapshot_pending = 0
+        print(f"📸 Saved snapshot v{meta['version']} to {meta['path']}: {meta['entries']} entries")
+    
+    def _fetch_entries(self, session, ids: List[str], with_tokens: bool = False) -> List[KnowledgeEntry]:
+        """Load entries by id, preserving the order of ids"""
+        if not ids:
+            return []
+        query = session.query(KnowledgeEntry).filter(KnowledgeEntry.id.in_(ids))
+        if with_tokens:
+            query = query.options(undefer(KnowledgeEntry.tokens))
+        entries = query.all()
+        by_id = {entry.id: entry for entry in entries}
+        return [by_id[entry_id] for entry_id in ids if entry_id in by_id]
+    
+    def _entry_to_dict(self, entry: KnowledgeEntry, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Convert SQLAlchemy model to dict (only id, created_at and fields when given)"""
+        if fields:
+            entry_dict = {"id": entry.id}
+            for field in fields:
+                entry_dict[field] = getattr(entry, field)
+            entry_dict["created_at"] = entry.created_at.isoformat() if entry.created_at else None
+            return entry_dict
+        
+        entry_dict = {
             "id": entry.id,
             "content": entry.content,
             "culture": entry.culture,
@@ -126,208 +924,432 @@ class Database:
             "patterns": entry.patterns if hasattr(entry, 'patterns') else [],
             "created_at": entry.created_at.isoformat() if entry.created_at else None
         }
+        if "tokens" not in inspect_instance(entry).unloaded and entry.tokens is not None:
+            # Search results carry the analyzed terms so reasoning never re-scans content
+            entry_dict["tokens"] = entry.tokens.split()
+        return entry_dict
     
     async def list_knowledge(
         self,
         culture: Optional[str] = None,
         category: Optional[str] = None,
-        limit: int = 50
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
-        """List knowledge entries with optional filters"""
-        session = self.SessionLocal()
+        """List knowledge entries, newest first, with optional filters.
+        
+        cursor continues after the entry it was made from (see make_cursor), so
+        every page is an index range scan regardless of depth. fields limits the
+        columns selected; id and created_at are always included.
+        """
+        if fields:
+            unknown = set(fields) - set(LISTABLE_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        
+        after = self._decode_cursor(cursor) if cursor else None
+        return await self._run(self._list_knowledge, culture, category, limit, after, fields)
+    
+    def _list_knowledge(
+        self,
+        session,
+        culture: Optional[str],
+        category: Optional[str],
+        limit: int,
+        after: Optional[Tuple[datetime, str]],
+        fields: Optional[List[str]]
+    ) -> List[Dict[str, Any]]:
+        query = session.query(KnowledgeEntry)
+        
+        # Project only the requested columns; everything else stays deferred
+        if fields:
+            columns = {"id", "created_at", *fields}
+            query = query.options(load_only(*[getattr(KnowledgeEntry, c) for c in columns]))
+        
+        # Apply filters
+        if culture:
+            query = query.filter(KnowledgeEntry.culture == culture)
+        if category:
+            query = query.filter(KnowledgeEntry.category == category)
+        
+        # Continue strictly after the cursor position
+        if after:
+            created_at, entry_id = after
+            query = query.filter(or_(
+                KnowledgeEntry.created_at < created_at,
+                and_(KnowledgeEntry.created_at == created_at, KnowledgeEntry.id < entry_id)
+            ))
+        
+        # Stable order, then limit results
+        entries = query.order_by(KnowledgeEntry.created_at.desc(), KnowledgeEntry.id.desc()).limit(limit).all()
+        
+        return [self._entry_to_dict(entry, fields) for entry in entries]
+    
+    def make_cursor(self, entry: Dict[str, Any]) -> str:
+        """Opaque cursor for the page that follows entry"""
+        raw = json.dumps([entry["created_at"], entry["id"]])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    
+    def _decode_cursor(self, cursor: str) -> Tuple[datetime, str]:
         try:
-            query = session.query(KnowledgeEntry)
-            
-            # Apply filters
-            if culture:
-                query = query.filter(KnowledgeEntry.culture == culture)
-            if category:
-                query = query.filter(KnowledgeEntry.category == category)
-            
-            # Limit results
-            entries = query.limit(limit).all()
-            
-            return [self._entry_to_dict(entry) for entry in entries]
-        finally:
-            session.close()
+            padded = cursor + "=" * (-len(cursor) % 4)
+            created_at, entry_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(created_at), entry_id
+        except Exception:
+            raise ValueError("Invalid cursor")
     
-    async def query_knowledge(self, query: str) -> List[Dict[str, Any]]:
-        """Query knowledge base with AI-powered semantic search"""
+    async def query_knowledge(
+        self,
+        query: str,
+        culture: Optional[str] = None,
+        category: Optional[str] = None,
+        language: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Query knowledge base with semantic, keyword or LLM-ranked search.
+        
+        culture/category/language restrict the search inside the index (or SQL),
+        so out-of-scope entries are never scored, fetched or sent to the LLM.
+        """
+        filters = {
+            field: value
+            for field, value in (("culture", culture), ("category", category), ("language", language))
+            if value
+        }
+        
+        print(f"🔍 Database query: '{query}', filters={filters}, search_mode={self.search_mode}, use_ai_search={self.use_ai_search}")
         
-        print(f"🔍 Database query: '{query}', use_ai_search={self.use_ai_search}")
+        query_key = normalize_query(query)
+        if filters:
+            query_key += " " + json.dumps(filters, sort_keys=True)
+        version = None
+        if self.query_cache.enabled or self.in_memory_search:
+            version = await self._run(self._read_corpus_version)
+            if self.in_memory_search and version != self.corpus_version:
+                # Another process (worker, import, seed script) wrote rows this one hasn't indexed
+                await self._catch_up_search_index()
+            self.corpus_version = version
+        cached = self.query_cache.get(query_key, version)
+        if cached is not None:
+            print(f"⚡ Query cache hit ({len(cached)} results)")
+            return cached
         
+        fallbacks_before = self.rerank_fallbacks
         if self.use_ai_search:
-            # Use AI semantic search for better results
-            results = await self._ai_semantic_search(query)
+            # Per-query LLM ranking (opt-in, costs one completion per query)
+            results = await self._ai_semantic_search(query, filters)
+        elif self.search_mode == "keyword":
+            results = await self._keyword_search(query, filters)
+        elif self.search_mode == "fulltext":
+            results = await self._fulltext_search(query, filters)
         else:
-            # Fallback to keyword search
-            results = await self._keyword_search(query)
+            results = await self._semantic_search(query, filters)
+            if not results:
+                # Nothing close enough in vector space, fall back to keyword search
+                results = await self._keyword_search(query, filters)
         
         print(f"📊 Database found {len(results)} results")
         if results:
             print(f"   Top result: {results[0].get('content', '')[:100]}")
         
+        # Tag with the version the search started at: an ingest that landed meanwhile makes it stale.
+        # An unranked rerank fallback is not cached, so the next query tries the LLM again
+        if self.rerank_fallbacks == fallbacks_before:
+            self.query_cache.put(query_key, version, results)
+        
         return results
     
-    async def _ai_semantic_search(self, query: str) -> List[Dict[str, Any]]:
-        """AI-powered semantic search using ASI Cloud"""
-        session = self.SessionLocal()
+    async def _fulltext_search(self, query: str, filters: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Full-text search ranked and limited inside the database (tsvector or FTS5)"""
+        return await self._run(self._fulltext_search_sync, query, filters)
+    
+    def _fulltext_search_sync(self, session, query: str, filters: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        return self._scored_entries(session, fulltext_search(session, query, limit=10, filters=filters))
+    
+    async def _semantic_search(self, query: str, filters: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Semantic search by cosine similarity against the local embedding matrix"""
+        hits = self.vector_index.search(
+            self.embedder.embed(query),
+            k=10,
+            min_score=self.semantic_min_score,
+            filters=filters
+        )
         
-        try:
-            # Get all entries
-            entries = session.query(KnowledgeEntry).all()
-            
-            if not entries:
-                return []
-            
-            # Use AI to analyze query and find best matches
-            entries_text = []
-            for idx, entry in enumerate(entries):
-                entry_summary = f"{entry.culture} - {entry.category}: {entry.content[:200]}"
-                entries_text.append(f"[{idx}] {entry_summary}")
-            
-            # Ask AI to rank entries by relevance
-            prompt = f"""Given this user query: "{query}"
+        if not hits:
+            return []
+        
+        hits = [(entry_id, round(score, 4)) for entry_id, score in hits]
+        return await self._run(self._scored_entries, hits)
+    
+    def _scored_entries(self, session, hits: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
+        """Load the entries for (id, score) hits in rank order, with relevance_score set"""
+        entries = self._fetch_entries(session, [entry_id for entry_id, _ in hits], with_tokens=True)
+        scores = dict(hits)
+        
+        results = []
+        for entry in entries:
+            entry_dict = self._entry_to_dict(entry)
+            entry_dict["relevance_score"] = scores[entry.id]
+            results.append(entry_dict)
+        
+        return results
+    
+    async def _ai_semantic_search(self, query: str, filters: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve-then-rerank: local hybrid search picks candidates, ASI Cloud orders them"""
+        candidates = self._first_stage_candidates(query, self.rerank_candidates, filters)
+        if not candidates:
+            return []
+        
+        # Rankings are reused until the corpus changes: every insert bumps the corpus_state
+        # version, which query_knowledge has just read (and caught the indexes up to)
+        ranking_key = None
+        if self.ranking_cache:
+            ranking_key = cache_key(
+                "rank", RANKING_PROMPT_VERSION, self.asi_model, normalize_query(query), filters or None,
+                self.corpus_version
+            )
+            ranked_ids = await asyncio.to_thread(self.ranking_cache.get, ranking_key)
+            if ranked_ids is not None:
+                print(f"⚡ LLM ranking cache hit ({len(ranked_ids)} entries)")
+                return await self._run(self._scored_entries, self._merge_ranking(ranked_ids, candidates))
+        
+        entries = await self._run(self._scored_entries, candidates)
+        
+        # Same prompt size however large the corpus: K candidates, each trimmed to fit the token budget
+        entry_budget = max(0, self.rerank_token_budget - RERANK_PROMPT_OVERHEAD_TOKENS) * CHARS_PER_TOKEN
+        snippet_chars = max(40, min(400, entry_budget // len(entries)))
+        entries_text = []
+        for idx, entry in enumerate(entries):
+            entry_summary = f"{entry['culture']} - {entry['category']}: {entry['content'][:snippet_chars]}"
+            entries_text.append(f"[{idx}] {entry_summary}")
+        
+        # Ask AI to rank entries by relevance
+        prompt = f"""Given this user query: "{query}"
 
 Analyze these cultural knowledge entries and return ONLY the indices (numbers in brackets) of the most relevant entries, ranked by relevance. Return up to 5 indices as a comma-separated list.
 
 Entries:
-{chr(10).join(entries_text[:20])}  
+{chr(10).join(entries_text)}  
 
 Return format: Just the numbers, e.g., "3,7,1,12,5"
 Relevant indices:"""
-            
-            try:
-                response = self.ai_client.chat.completions.create(
-                    model=os.getenv("ASI_MODEL", "qwen/qwen3-32b"),
-                    messages=[
-                        {"role": "system", "content": "You are a cultural knowledge search assistant. Return only the requested indices."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=50,
-                    temperature=0.3
-                )
-                
-                # Parse AI response to get indices
-                ai_response = response.choices[0].message.content.strip()
-                indices = []
-                
-                # Extract numbers from response
-                import re
-                numbers = re.findall(r'\d+', ai_response)
-                indices = [int(n) for n in numbers if int(n) < len(entries)]
-                
-                # Build results from AI-ranked indices
-                results = []
-                for rank, idx in enumerate(indices[:5]):
-                    if idx < len(entries):
-                        entry_dict = self._entry_to_dict(entries[idx])
-                        entry_dict["relevance_score"] = 10 - rank  # Higher score for higher rank
-                        results.append(entry_dict)
-                
-                # If AI didn't return enough results, supplement with keyword search
-                if len(results) < 3:
-                    keyword_results = await self._keyword_search(query)
-                    for kr in keyword_results:
-                        if kr["id"] not in [r["id"] for r in results]:
-                            results.append(kr)
-                            if len(results) >= 5:
-                                break
-                
-                return results
-                
-            except Exception as e:
-                print(f"AI search failed: {e}, falling back to keyword search")
-                return await self._keyword_search(query)
-                
-        finally:
-            session.close()
-    
-    async def _keyword_search(self, query: str) -> List[Dict[str, Any]]:
-        """Keyword-based search (fallback)"""
-        query_lower = query.lower()
-        query_words = query_lower.split()
-        session = self.SessionLocal()
         
         try:
-            # Get all entries
-            entries = session.query(KnowledgeEntry).all()
-            print(f"   Keyword search: checking {len(entries)} entries")
-            results = []
+            started = time.perf_counter()
+            response = await complete(
+                self.asi_api_key,
+                self.asi_base_url,
+                model=self.asi_model,
+                messages=[
+                    {"role": "system", "content": "You are a cultural knowledge search assistant. Return only the requested indices."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=50,
+                temperature=0.3
+            )
             
-            for entry in entries:
-                # Simple relevance scoring
-                score = 0
-                content_lower = entry.content.lower()
-                
-                # Check for exact phrase match in content
-                if query_lower in content_lower:
-                    score += 5
-                
-                # Check for individual word matches in content
-                for word in query_words:
-                    if len(word) > 2 and word in content_lower:
-                        score += 2
-                
-                # Check culture field
-                if entry.culture and query_lower in entry.culture.lower():
-                    score += 3
-                
-                # Check concepts
-                if entry.concepts:
-                    for concept in entry.concepts:
-                        concept_lower = concept.lower()
-                        if concept_lower in query_lower or query_lower in concept_lower:
-                            score += 3
-                        # Check word matches
-                        for word in query_words:
-                            if len(word) > 2 and word in concept_lower:
-                                score += 1
-                
-                # Check themes
-                if entry.themes:
-                    for theme in entry.themes:
-                        theme_normalized = theme.replace("_", " ").lower()
-                        if theme_normalized in query_lower or query_lower in theme_normalized:
-                            score += 3
-                        # Check word matches
-                        for word in query_words:
-                            if len(word) > 2 and word in theme_normalized:
-                                score += 1
-                
-                # Check category
-                if entry.category and query_lower in entry.category.lower():
-                    score += 2
-                
-                if score > 0:
-                    entry_dict = self._entry_to_dict(entry)
-                    entry_dict["relevance_score"] = score
-                    results.append(entry_dict)
+            # Extract indices from the AI response
+            ai_response = response.choices[0].message.content.strip()
+            indices = dict.fromkeys(int(n) for n in re.findall(r'\d+', ai_response) if int(n) < len(entries))
+            ranked_ids = [entries[idx]["id"] for idx in list(indices)[:5]]
             
-            # Sort by relevance
-            results.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+            if ranking_key:
+                usage = getattr(response, "usage", None)
+                await asyncio.to_thread(
+                    self.ranking_cache.put,
+                    ranking_key,
+                    ranked_ids,
+                    cost={"latency_s": time.perf_counter() - started, "tokens": getattr(usage, "total_tokens", 0) or 0}
+                )
             
-            return results[:10]  # Top 10 results
-        finally:
-            session.close()
+            by_id = {entry["id"]: entry for entry in entries}
+            results = []
+            for entry_id, score in self._merge_ranking(ranked_ids, candidates):
+                entry_dict = by_id[entry_id]
+                entry_dict["relevance_score"] = score
+                results.append(entry_dict)
+            return results
+            
+        except Exception as e:
+            self.rerank_fallbacks += 1
+            print(f"⚠️  LLM rerank failed ({type(e).__name__}: {e}), returning {min(len(entries), 10)} "
+                  f"first-stage results unranked ({self.rerank_fallbacks} fallbacks so far)")
+            return entries[:10]
+    
+    def _first_stage_candidates(self, query: str, k: int, filters: Optional[Dict[str, str]] = None) -> List[Tuple[str, float]]:
+        """Top-k (id, score) by reciprocal rank fusion of vector and BM25 rankings"""
+        vector_hits = self.vector_index.search(
+            self.embedder.embed(query), k=k, min_score=self.semantic_min_score, filters=filters
+        )
+        lexical_hits = self.search_index.search(query, limit=k, filters=filters)
+        
+        fused: Dict[str, float] = {}
+        for ranking in ([entry_id for entry_id, _ in vector_hits], [hit["id"] for hit in lexical_hits]):
+            for rank, entry_id in enumerate(ranking):
+                fused[entry_id] = fused.get(entry_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        
+        ranked = sorted(fused.items(), key=lambda hit: hit[1], reverse=True)[:k]
+        return [(entry_id, round(score, 4)) for entry_id, score in ranked]
+    
+    def _merge_ranking(self, ranked_ids: List[str], candidates: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        """LLM-ranked ids first (10 - rank); if it picked fewer than 3, top up to 5 from the first stage"""
+        hits = [(entry_id, 10 - rank) for rank, entry_id in enumerate(ranked_ids)]
+        if len(hits) < 3:
+            chosen = set(ranked_ids)
+            hits.extend((entry_id, score) for entry_id, score in candidates if entry_id not in chosen)
+            hits = hits[:5]
+        return hits
+    
+    async def _keyword_search(self, query: str, filters: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Keyword-based search (fallback) ranked by BM25 over the inverted index"""
+        hits = self.search_index.search(query, limit=10, filters=filters)
+        print(f"   Keyword search: {len(hits)} matches from index of {len(self.search_index)} entries")
+        
+        if not hits:
+            return []
+        
+        hits = [(hit["id"], hit["relevance_score"]) for hit in hits]
+        return await self._run(self._scored_entries, hits)  # Top 10 results
+    
+    async def find_entries_by_tags(
+        self,
+        concepts: Optional[List[str]] = None,
+        themes: Optional[List[str]] = None,
+        patterns: Optional[List[str]] = None,
+        limit: int = 50,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Entries carrying any of the given concepts/themes/patterns, most matching tags first.
+        
+        Each tag is an index lookup on its association table, so the cost follows
+        the number of matches rather than the corpus size. Results include
+        tag_matches (the number of requested tags the entry carries). filters
+        restricts matches to entries with those culture/category/language values.
+        """
+        wanted = {"concepts": concepts, "themes": themes, "patterns": patterns}
+        if not any(wanted.values()):
+            return []
+        return await self._run(self._find_entries_by_tags, wanted, limit, filters)
+    
+    def _find_entries_by_tags(
+        self,
+        session,
+        wanted: Dict[str, Optional[List[str]]],
+        limit: int,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        lookups = []
+        for field, values in wanted.items():
+            tags = list(dict.fromkeys(normalize_tag(v) for v in values or []))
+            if tags:
+                model, column = TAG_TABLES[field]
+                lookups.append(select(model.entry_id).where(getattr(model, column).in_(tags)))
+        
+        matches = union_all(*lookups).subquery()
+        statement = select(matches.c.entry_id, func.count().label("tag_matches"))
+        if filters:
+            statement = statement.join(KnowledgeEntry, KnowledgeEntry.id == matches.c.entry_id).where(
+                *[getattr(KnowledgeEntry, field) == value for field, value in filters.items()]
+            )
+        ranked = session.execute(
+            statement
+            .group_by(matches.c.entry_id)
+            .order_by(func.count().desc(), matches.c.entry_id)
+            .limit(limit)
+        ).all()
+        
+        counts = {row.entry_id: row.tag_matches for row in ranked}
+        results = []
+        for entry in self._fetch_entries(session, list(counts), with_tokens=True):
+            entry_dict = self._entry_to_dict(entry)
+            entry_dict["tag_matches"] = counts[entry.id]
+            results.append(entry_dict)
+        return results
+    
+    async def tag_counts(self, entry_ids: List[str], fields: List[str]) -> Dict[str, Dict[str, int]]:
+        """For each of fields (concepts/themes/patterns), how many of the entries carry each tag.
+        
+        One GROUP BY per association table through its (entry_id, tag) index, so the
+        cost follows the entries' tags, not the corpus.
+        """
+        if not entry_ids:
+            return {field: {} for field in fields}
+        return await self._run(self._tag_counts, entry_ids, fields)
+    
+    def _tag_counts(self, session, entry_ids: List[str], fields: List[str]) -> Dict[str, Dict[str, int]]:
+        counts = {}
+        for field in fields:
+            model, column = TAG_TABLES[field]
+            tag = getattr(model, column)
+            rows = session.execute(
+                select(tag, func.count())
+                .where(model.entry_id.in_(entry_ids))
+                .group_by(tag)
+                .order_by(func.count().desc(), tag)
+            ).all()
+            counts[field] = {row[0]: row[1] for row in rows}
+        return counts
+    
+    async def score_entries_by_tags(
+        self,
+        entry_ids: List[str],
+        weighted: Dict[str, Tuple[List[str], float]]
+    ) -> Dict[str, float]:
+        """Per entry, the summed weight of the wanted tags it carries ({field: (tags, weight per tag)}).
+        
+        Entries carrying none of them are left out.
+        """
+        if not entry_ids:
+            return {}
+        return await self._run(self._score_entries_by_tags, entry_ids, weighted)
+    
+    def _score_entries_by_tags(
+        self,
+        session,
+        entry_ids: List[str],
+        weighted: Dict[str, Tuple[List[str], float]]
+    ) -> Dict[str, float]:
+        lookups = []
+        for field, (values, weight) in weighted.items():
+            tags = list(dict.fromkeys(normalize_tag(v) for v in values or []))
+            if tags:
+                model, column = TAG_TABLES[field]
+                lookups.append(
+                    select(model.entry_id, literal(weight).label("weight"))
+                    .where(model.entry_id.in_(entry_ids), getattr(model, column).in_(tags))
+                )
+        if not lookups:
+            return {}
+        
+        matches = union_all(*lookups).subquery()
+        rows = session.execute(
+            select(matches.c.entry_id, func.sum(matches.c.weight)).group_by(matches.c.entry_id)
+        ).all()
+        return {row[0]: float(row[1]) for row in rows}
     
     async def get_cultures(self) -> List[str]:
         """Get list of all cultures in database"""
-        session = self.SessionLocal()
-        try:
-            # Get distinct cultures
-            cultures = session.query(KnowledgeEntry.culture).distinct().all()
-            return sorted([c[0] for c in cultures])
-        finally:
-            session.close()
+        return await self._run(self._get_cultures)
+    
+    def _get_cultures(self, session) -> List[str]:
+        # Get distinct cultures
+        cultures = session.query(KnowledgeEntry.culture).distinct().all()
+        return sorted([c[0] for c in cultures])
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters for the retrieval caches"""
+        return {
+            "corpus_version": self.corpus_version,
+            "query_cache": self.query_cache.stats(),
+            "llm_ranking_cache": self.ranking_cache.stats() if self.ranking_cache else {"enabled": False},
+            "llm_rerank_fallbacks": self.rerank_fallbacks
+        }
     
     async def check_health(self) -> bool:
         """Health check"""
         try:
-            session = self.SessionLocal()
             # Try a simple query
-            session.query(KnowledgeEntry).first()
-            session.close()
+            await self._run(lambda session: session.query(KnowledgeEntry.id).first())
             return True
         except Exception as e:
             print(f"Database health check failed: {e}")
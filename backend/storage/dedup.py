@@ -0,0 +1,136 @@
+"""
+Near-duplicate detection - MinHash signatures with an LSH bucket index
+A new entry is checked against the corpus before any LLM extraction runs
+"""
+import hashlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from storage.text_analysis import tokenize
+
+MERSENNE_PRIME = (1 << 61) - 1
+SHINGLE_SIZE = 5
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """Character n-grams of the normalized token stream (case, punctuation and spacing insensitive)"""
+    normalized = " ".join(tokenize(text))
+    if len(normalized) <= size:
+        return [normalized] if normalized else []
+    return list({normalized[i:i + size] for i in range(len(normalized) - size + 1)})
+
+
+class MinHasher:
+    """num_perm hash functions (a * x + b) mod p; the fraction of equal
+    signature slots estimates the Jaccard similarity of two shingle sets"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        rng = np.random.default_rng(seed)
+        # As in common MinHash implementations, a * x wraps around 2**64 before the
+        # modulo; that scrambling is what makes each permutation independent
+        self.a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        grams = shingles(text)
+        if not grams:
+            return np.full(self.num_perm, 0xFFFFFFFF, dtype=np.uint32)
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), "little") for g in grams),
+            dtype=np.uint64, count=len(grams)
+        )
+        permuted = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME
+        return (permuted.min(axis=0) & 0xFFFFFFFF).astype(np.uint32)
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(first == second))
+
+
+def signature_to_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype(np.uint32).tobytes()
+
+
+def signature_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint32)
+
+
+class DedupIndex:
+    """LSH over MinHash signatures: signatures are cut into bands, and entries
+    sharing any band bucket are candidates, verified against the threshold.
+
+    With 16 bands of 4 rows, pairs at 0.8 similarity collide with probability
+    ~0.999 while pairs below 0.3 rarely do, so a lookup touches a handful of
+    candidates regardless of corpus size.
+    """
+
+    def __init__(self, hasher: Optional[MinHasher] = None, bands: int = 16, threshold: float = 0.8):
+        self.hasher = hasher or MinHasher()
+        if self.hasher.num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        self.threshold = threshold
+        self.buckets: Dict[Tuple[int, bytes], List[str]] = {}
+        self.signatures: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, entry_id: str) -> bool:
+        return entry_id in self.signatures
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.hasher.signature(text)
+
+    def add(self, entry_id: str, signature: np.ndarray):
+        if entry_id in self.signatures:
+            return
+        self.signatures[entry_id] = signature
+        for key in self.band_keys(signature):
+            self.buckets.setdefault(key, []).append(entry_id)
+
+    def candidates(self, signature: np.ndarray) -> List[str]:
+        found: Dict[str, None] = {}
+        for key in self.band_keys(signature):
+            for entry_id in self.buckets.get(key, ()):
+                found[entry_id] = None
+        return list(found)
+
+    def find(self, signature: np.ndarray, threshold: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        """Most similar indexed entry at or above the threshold, as (id, similarity)"""
+        return self.best_match(
+            signature, ((entry_id, self.signatures[entry_id]) for entry_id in self.candidates(signature)), threshold
+        )
+
+    def best_match(
+        self,
+        signature: np.ndarray,
+        candidates: Iterable[Tuple[str, np.ndarray]],
+        threshold: Optional[float] = None
+    ) -> Optional[Tuple[str, float]]:
+        """Most similar of (id, signature) candidates at or above the threshold"""
+        threshold = self.threshold if threshold is None else threshold
+        best = None
+        for entry_id, other in candidates:
+            score = similarity(signature, other)
+            if score >= threshold and (best is None or score > best[1]):
+                best = (entry_id, score)
+        return best
+
+    def stats(self):
+        return {
+            "entries": len(self.signatures),
+            "buckets": len(self.buckets),
+            "num_perm": self.hasher.num_perm,
+            "bands": self.bands,
+            "threshold": self.threshold,
+        }
+
+    def band_keys(self, signature: np.ndarray) -> Iterator[Tuple[int, bytes]]:
+        """(band number, bucket) pairs; entries sharing any pair are candidates"""
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
@@ -0,0 +1,188 @@
+"""
+Disk Cache - Persistent key/value cache in a local SQLite file
+Used to remember expensive LLM results across requests and restarts
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+
+TOTALS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_totals_insert AFTER INSERT ON cache BEGIN
+        UPDATE cache_totals SET entries = entries + 1, bytes = bytes + new.size WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_totals_delete AFTER DELETE ON cache BEGIN
+        UPDATE cache_totals SET entries = entries - 1, bytes = bytes - old.size WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_totals_update AFTER UPDATE OF size ON cache BEGIN
+        UPDATE cache_totals SET bytes = bytes + new.size - old.size WHERE id = 1;
+    END
+    """,
+]
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable key from any JSON-serializable parts"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class DiskCache:
+    """JSON values with a TTL, evicted least-recently-used past max_entries or max_bytes.
+
+    put() can record what producing the value cost (e.g. {"latency_s": 1.2,
+    "tokens": 830}); every hit adds that cost to the saved_* counters, which is
+    how much work the cache avoided.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.saved: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, cost TEXT, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_created_at ON cache (created_at)")
+
+        # Row count and total size, kept by triggers so bounds checks don't scan the table
+        # (and stay right when several processes share the file)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_totals ("
+                "id INTEGER PRIMARY KEY CHECK (id = 1), entries INTEGER NOT NULL, bytes INTEGER NOT NULL)"
+            )
+            self.conn.execute(
+                "INSERT OR IGNORE INTO cache_totals (id, entries, bytes) "
+                "SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+            )
+            for trigger in TOTALS_TRIGGERS:
+                self.conn.execute(trigger)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT value, cost, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, cost, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self.conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            for name, amount in (json.loads(cost) if cost else {}).items():
+                self.saved[name] = self.saved.get(name, 0) + amount
+        return json.loads(value)
+
+    def put(self, key: str, value: Any, cost: Optional[Dict[str, float]] = None):
+        self.put_many([(key, value, cost)])
+
+    def put_many(self, items: List[Tuple[str, Any, Optional[Dict[str, float]]]]):
+        """Store (key, value, cost) items in one transaction, evicting once at the end"""
+        now = time.time()
+        rows = []
+        for key, value, cost in items:
+            payload = json.dumps(value)
+            rows.append((key, payload, json.dumps(cost) if cost else None, len(payload), now, now))
+        if not rows:
+            return
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete skips triggers
+                self.conn.executemany(
+                    "INSERT INTO cache (key, value, cost, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, cost = excluded.cost, size = excluded.size, "
+                    "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                    rows
+                )
+                self._evict()
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            entries, size = self._totals()
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            **{f"saved_{name}": round(amount, 3) for name, amount in self.saved.items()},
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _evict(self):
+        """Drop expired rows, then least recently used rows until within bounds"""
+        if self.ttl_seconds:
+            self.conn.execute("DELETE FROM cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+        entries, size = self._totals()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+
+        excess_entries = max(0, entries - self.max_entries)
+        excess_bytes = size - self.max_bytes
+        victims = []
+        for key, row_size in self.conn.execute("SELECT key, size FROM cache ORDER BY accessed_at"):
+            if len(victims) >= excess_entries and excess_bytes <= 0:
+                break
+            victims.append((key,))
+            excess_bytes -= row_size
+        self.conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def _totals(self) -> Tuple[int, int]:
+        return self.conn.execute("SELECT entries, bytes FROM cache_totals WHERE id = 1").fetchone()
@@ -0,0 +1,176 @@
+"""
+Full-text search push-down - PostgreSQL tsvector/GIN and SQLite FTS5
+Ranking and top-k run inside the database so only the best rows are returned
+"""
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from storage.text_analysis import tokenize, stop_words
+
+# Entry columns a search can be restricted to (matched exactly, in the same statement)
+FILTER_COLUMNS = ("culture", "category", "language")
+
+# Relative weights per field, mirrored in both backends
+# (PostgreSQL: A=concepts, B=culture/themes, C=content, D=category)
+SQLITE_BM25_WEIGHTS = {
+    "content": 1.0,
+    "culture": 1.5,
+    "category": 1.0,
+    "concepts": 2.0,
+    "themes": 1.5,
+}
+
+POSTGRES_SETUP = [
+    """
+    ALTER TABLE knowledge_entries ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(concepts::text, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(culture, '')), 'B') ||
+        setweight(to_tsvector('english', replace(coalesce(themes::text, ''), '_', ' ')), 'B') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(category, '')), 'D')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_knowledge_entries_search_vector
+    ON knowledge_entries USING GIN (search_vector)
+    """,
+]
+
+# knowledge_entries has a string primary key, so its implicit rowid is not stable (VACUUM may
+# renumber it). The FTS table therefore keeps its own copy of the text, keyed by an explicit
+# INTEGER PRIMARY KEY in knowledge_fts_ids that maps each FTS row to its entry id.
+SQLITE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS knowledge_fts_ids (
+        fts_rowid INTEGER PRIMARY KEY,
+        id TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+        content, culture, category, concepts, themes,
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+]
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS knowledge_fts_insert AFTER INSERT ON knowledge_entries BEGIN
+        INSERT INTO knowledge_fts_ids(id) VALUES (new.id);
+        INSERT INTO knowledge_fts(rowid, content, culture, category, concepts, themes)
+        VALUES (last_insert_rowid(), new.content, new.culture, new.category, new.concepts, new.themes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS knowledge_fts_delete AFTER DELETE ON knowledge_entries BEGIN
+        DELETE FROM knowledge_fts WHERE rowid = (SELECT fts_rowid FROM knowledge_fts_ids WHERE id = old.id);
+        DELETE FROM knowledge_fts_ids WHERE id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS knowledge_fts_update AFTER UPDATE OF content, culture, category, concepts, themes
+    ON knowledge_entries BEGIN
+        UPDATE knowledge_fts
+        SET content = new.content, culture = new.culture, category = new.category,
+            concepts = new.concepts, themes = new.themes
+        WHERE rowid = (SELECT fts_rowid FROM knowledge_fts_ids WHERE id = old.id);
+    END
+    """,
+]
+
+SQLITE_BACKFILL = [
+    "INSERT INTO knowledge_fts_ids(id) SELECT id FROM knowledge_entries",
+    """
+    INSERT INTO knowledge_fts(rowid, content, culture, category, concepts, themes)
+    SELECT m.fts_rowid, e.content, e.culture, e.category, e.concepts, e.themes
+    FROM knowledge_fts_ids m JOIN knowledge_entries e ON e.id = m.id
+    """,
+]
+
+
+def install_fulltext(engine) -> bool:
+    """Create the full-text structures for the engine's dialect (idempotent).
+
+    Returns False when the dialect (or the SQLite build) has no full-text support.
+    """
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "postgresql":
+                for statement in POSTGRES_SETUP:
+                    conn.execute(text(statement))
+                return True
+
+            if dialect == "sqlite":
+                existing = conn.execute(text(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_fts'"
+                )).scalar()
+                if existing and "content_rowid" in existing:
+                    # Earlier external-content layout keyed on the unstable rowid: rebuild it
+                    for name in ("knowledge_fts_insert", "knowledge_fts_delete", "knowledge_fts_update"):
+                        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+                    conn.execute(text("DROP TABLE knowledge_fts"))
+                    existing = None
+                for statement in SQLITE_TABLES:
+                    conn.execute(text(statement))
+                if not existing:
+                    conn.execute(text("DELETE FROM knowledge_fts_ids"))
+                    for statement in SQLITE_BACKFILL:
+                        conn.execute(text(statement))
+                for statement in SQLITE_TRIGGERS:
+                    conn.execute(text(statement))
+                return True
+    except Exception as e:
+        print(f"Full-text search setup failed: {e}")
+    return False
+
+
+def fulltext_search(
+    session,
+    query: str,
+    limit: int = 10,
+    filters: Optional[Dict[str, Any]] = None
+) -> List[Tuple[str, float]]:
+    """Return (entry id, score) for the top matches within filters, ranked by the database"""
+    excluded = stop_words((filters or {}).get("language") or "en")
+    terms = [t for t in dict.fromkeys(tokenize(query)) if t not in excluded]
+    if not terms:
+        return []
+
+    filters = {column: filters[column] for column in FILTER_COLUMNS if filters and filters.get(column)}
+    params: Dict[str, Any] = {"limit": limit, **filters}
+
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        rows = session.execute(text(
+            f"""
+            SELECT id, ts_rank_cd(search_vector, query) AS score
+            FROM knowledge_entries, to_tsquery('english', :terms) AS query
+            WHERE search_vector @@ query{_filter_sql(filters, "")}
+            ORDER BY score DESC
+            LIMIT :limit
+            """
+        ), {**params, "terms": " | ".join(terms)})
+    else:
+        weights = ", ".join(str(w) for w in SQLITE_BM25_WEIGHTS.values())
+        rows = session.execute(text(
+            f"""
+            SELECT e.id, -bm25(knowledge_fts, {weights}) AS score
+            FROM knowledge_fts
+            JOIN knowledge_fts_ids m ON m.fts_rowid = knowledge_fts.rowid
+            JOIN knowledge_entries e ON e.id = m.id
+            WHERE knowledge_fts MATCH :terms{_filter_sql(filters, "e.")}
+            ORDER BY bm25(knowledge_fts, {weights})
+            LIMIT :limit
+            """
+        ), {**params, "terms": " OR ".join(f'"{t}"' for t in terms)})
+
+    return [(row[0], float(row[1])) for row in rows]
+
+
+def _filter_sql(filters: Dict[str, Any], prefix: str) -> str:
+    """AND clauses binding each filter column to its own parameter"""
+    return "".join(f" AND {prefix}{column} = :{column}" for column in filters)
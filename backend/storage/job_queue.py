@@ -0,0 +1,247 @@
+"""
+Job Queue - Durable background jobs in a local SQLite file
+Ingestion requests are queued here and drained by a bounded pool of workers; jobs survive restarts
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+
+class QueueFull(Exception):
+    """Raised by enqueue() when the backlog is at its limit"""
+
+
+class LeaseLost(Exception):
+    """The job's lease ran out and another worker claimed it; this attempt must stop"""
+
+
+class JobQueue:
+    """Jobs move queued -> running -> succeeded | failed.
+
+    A claimed job holds a lease that the worker renews (renew(), and every
+    stage update) while it runs; if the worker (or its process) dies, the
+    lease runs out and another worker claims the job again, so several
+    processes can share one queue file. The attempt number returned by
+    claim() is the claim token: updates for an attempt that is no longer the
+    job's current one raise LeaseLost instead of overwriting the new claim.
+    fail() with retry=True requeues the job with exponential backoff until
+    max_attempts.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_pending: int = 1000,
+        max_attempts: int = 3,
+        lease_seconds: float = 300,
+        retry_base_seconds: float = 5,
+        retention_seconds: float = 7 * 86400
+    ):
+        self.path = path
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retention_seconds = retention_seconds
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, stage TEXT, stages TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, error TEXT, result TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+            "available_at REAL NOT NULL, lease_until REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_available ON jobs (status, available_at)")
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        """Add a job; raises QueueFull when max_pending jobs are already queued or running"""
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        with self._transaction() as conn:
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} ingestion jobs pending (max {self.max_pending})")
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, stage, stages, created_at, updated_at, available_at) "
+                "VALUES (?, ?, ?, 'queued', 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), json.dumps([{"stage": "queued", "at": now}]), now, now, now)
+            )
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Take the oldest runnable job (queued and due, or running with an expired lease)"""
+        now = time.time()
+        with self._transaction() as conn:
+            # A lease that ran out on its last attempt means the job keeps killing its worker
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', stage = 'failed', error = 'worker lost while running', "
+                "lease_until = NULL, updated_at = ? WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                "OR (status = 'running' AND lease_until < ?) ORDER BY available_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ? WHERE id = ?",
+                (now + self.lease_seconds, now, row["id"])
+            )
+        job = self._to_dict(row)
+        job["status"] = "running"
+        job["attempts"] += 1
+        return job
+
+    def renew(self, job_id: str, attempt: int) -> bool:
+        """Extend the lease of a running attempt; False once it has been lost"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND attempts = ? AND status = 'running'",
+                (now + self.lease_seconds, now, job_id, attempt)
+            )
+        return cursor.rowcount > 0
+
+    def set_stage(self, job_id: str, attempt: int, stage: str):
+        """Record progress and renew the lease"""
+        now = time.time()
+        with self._transaction() as conn:
+            self._append_stage(conn, job_id, attempt, stage, now)
+            conn.execute(
+                "UPDATE jobs SET stage = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                (stage, now + self.lease_seconds, now, job_id)
+            )
+
+    def release(self, job_id: str, attempt: int):
+        """Hand an interrupted job back (e.g. on shutdown) without counting the attempt"""
+        now = time.time()
+        with self._transaction() as conn:
+            self._append_stage(conn, job_id, attempt, "requeued", now)
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'requeued', attempts = MAX(attempts - 1, 0), "
+                "available_at = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (now, now, job_id)
+            )
+
+    def complete(self, job_id: str, attempt: int, result: Dict[str, Any]):
+        self._finish(job_id, attempt, "succeeded", "done", result=result)
+
+    def fail(self, job_id: str, attempt: int, error: str, retry: bool = False) -> bool:
+        """Record a failed attempt; returns True if the job was requeued for another try"""
+        now = time.time()
+        requeue = retry and attempt < self.max_attempts
+        with self._transaction() as conn:
+            self._append_stage(conn, job_id, attempt, "retrying" if requeue else "failed", now)
+            if requeue:
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', stage = 'retrying', error = ?, available_at = ?, "
+                    "lease_until = NULL, updated_at = ? WHERE id = ?",
+                    (error, now + self.retry_base_seconds * 2 ** (attempt - 1), now, job_id)
+                )
+                return True
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', stage = 'failed', error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE id = ?",
+                (error, now, job_id)
+            )
+        return False
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "jobs": self.counts(),
+            "max_pending": self.max_pending,
+            "max_attempts": self.max_attempts,
+            "lease_seconds": self.lease_seconds,
+        }
+
+    def prune(self) -> int:
+        """Delete finished jobs older than retention_seconds"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+                (time.time() - self.retention_seconds,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """One write transaction, taken up front so concurrent workers serialize on it"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _finish(self, job_id: str, attempt: int, status: str, stage: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        now = time.time()
+        with self._transaction() as conn:
+            self._append_stage(conn, job_id, attempt, stage, now)
+            conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, result = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (status, stage, json.dumps(result, default=str) if result is not None else None, error, now, job_id)
+            )
+
+    @staticmethod
+    def _append_stage(conn: sqlite3.Connection, job_id: str, attempt: int, stage: str, now: float):
+        """Add a stage to the attempt's history; raises LeaseLost if the attempt no longer holds the job"""
+        row = conn.execute(
+            "SELECT stages FROM jobs WHERE id = ? AND attempts = ? AND status = 'running'", (job_id, attempt)
+        ).fetchone()
+        if row is None:
+            raise LeaseLost(f"job {job_id} attempt {attempt} no longer holds its lease")
+        stages = json.loads(row["stages"])
+        stages.append({"stage": stage, "at": now})
+        conn.execute("UPDATE jobs SET stages = ? WHERE id = ?", (json.dumps(stages), job_id))
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "status": row["status"],
+            "stage": row["stage"],
+            "stages": json.loads(row["stages"]),
+            "attempts": row["attempts"],
+            "error": row["error"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
@@ -0,0 +1,84 @@
+"""
+Keyword Matcher - Aho-Corasick automaton over analyzed tokens
+Many keyword tables compiled once; one pass over a text's tokens yields every hit,
+whole words only (so "we" never matches inside "weave")
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+from storage.text_analysis import analyze
+
+
+class KeywordMatcher:
+    """Match labelled keyword tables against analyzed token streams.
+
+    tables maps a group name to {label: keywords}; a keyword may be a phrase
+    ("shared responsibility"), matched as consecutive tokens. Keywords go
+    through the same analyze() pipeline as the text, so "Sharing" finds
+    "share". The automaton walks tokens rather than characters: the cost of a
+    match is linear in the text and independent of how many keywords exist.
+    """
+
+    def __init__(self, tables: Mapping[str, Mapping[str, Iterable[str]]], language: str = "en"):
+        self.language = language
+        self.groups = list(tables)
+        # Label order per group, so results come back in declaration order
+        self.labels: Dict[str, List[str]] = {group: list(table) for group, table in tables.items()}
+
+        # Node 0 is the root; goto[node][token] -> node, out[node] -> (group, label index)
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[str, int]]] = [[]]
+        for group, table in tables.items():
+            for index, keywords in enumerate(table.values()):
+                for keyword in keywords:
+                    self._insert(analyze(keyword, language), (group, index))
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self.goto)
+
+    def match(self, tokens: Sequence[str]) -> Dict[str, List[str]]:
+        """Labels hit by the tokens, per group, in each table's declaration order"""
+        found: Dict[str, set] = {group: set() for group in self.groups}
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for token in tokens:
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            for group, index in out[node]:
+                found[group].add(index)
+        return {group: [self.labels[group][i] for i in sorted(hits)] for group, hits in found.items()}
+
+    def match_text(self, text: str) -> Dict[str, List[str]]:
+        return self.match(analyze(text, self.language))
+
+    def _insert(self, tokens: List[str], output: Tuple[str, int]):
+        if not tokens:
+            return
+        node = 0
+        for token in tokens:
+            child = self.goto[node].get(token)
+            if child is None:
+                child = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+                self.goto[node][token] = child
+            node = child
+        if output not in self.out[node]:
+            self.out[node].append(output)
+
+    def _link(self):
+        """Breadth-first failure links; each node also emits its failure chain's outputs"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and token not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(token, 0)
+                self.out[child].extend(o for o in self.out[self.fail[child]] if o not in self.out[child])
@@ -0,0 +1,108 @@
+"""
+Query Cache - In-process LRU/TTL cache of retrieval results
+Entries are tagged with the corpus version they were computed at, so an ingest
+(which bumps the version) makes every older result a miss
+"""
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from storage.text_analysis import tokenize
+
+
+def normalize_query(query: str) -> str:
+    """Case, punctuation and whitespace insensitive cache key"""
+    return " ".join(tokenize(query))
+
+
+class QueryCache:
+    """LRU cache bounded by entry count and (approximate) bytes, with a TTL.
+
+    Values are stored serialized as JSON: that gives a cheap size estimate and
+    hands every caller its own copy, so a cached result can't be mutated.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[str, Tuple[int, float, str]]" = OrderedDict()  # key -> (version, stored_at, payload)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str, version: int) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached value for key if it was computed at this corpus version"""
+        cached = self.entries.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+
+        cached_version, stored_at, payload = cached
+        if cached_version != version:
+            self._remove(key)
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return json.loads(payload)
+
+    def put(self, key: str, version: int, value: List[Dict[str, Any]]):
+        if not self.enabled:
+            return
+        payload = json.dumps(value)
+        if len(payload) > self.max_bytes:
+            return
+
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (version, time.monotonic(), payload)
+        self.bytes += len(payload)
+
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: str):
+        _, _, payload = self.entries.pop(key)
+        self.bytes -= len(payload)
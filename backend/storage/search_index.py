@@ -0,0 +1,318 @@
+"""
+Search Index - In-process inverted index with BM25 ranking over knowledge entries
+Built once at startup and updated incrementally on ingest
+"""
+import heapq
+import json
+import math
+import os
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import numpy as np
+
+from storage.text_analysis import analyze
+from storage.vector_index import AttributeCodes, FILTER_FIELDS
+
+FORMAT_VERSION = 2
+
+# Per-field weights applied to term frequencies before BM25 saturation
+DEFAULT_FIELD_BOOSTS = {
+    "content": 1.0,
+    "concepts": 2.0,
+    "themes": 1.5,
+    "culture": 1.5,
+    "category": 1.0,
+}
+
+
+class InvertedIndex:
+    """BM25F ranking over content, concepts, themes, culture and category.
+
+    Postings keep per-field term frequencies for every entry. Document
+    frequencies and field lengths are updated as entries are added or removed,
+    so answering a query touches only the postings of its terms and never
+    re-reads the corpus. culture/category/language filters are checked against
+    per-entry attribute codes before a posting is scored.
+
+    An index loaded from a snapshot keeps its postings in a read-only base
+    segment (CSR arrays, memory-mapped); entries added afterwards go to the
+    in-memory postings dict, and save() folds both into a new base.
+    """
+
+    def __init__(
+        self,
+        field_boosts: Optional[Dict[str, float]] = None,
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        self.field_boosts = dict(field_boosts or DEFAULT_FIELD_BOOSTS)
+        self.fields = list(self.field_boosts)
+        self.k1 = k1
+        self.b = b
+
+        # term -> {doc number: [tf per field]}
+        self.postings: Dict[str, Dict[int, List[int]]] = {}
+
+        # Entry ids are mapped to dense doc numbers; removed slots become None
+        self.doc_ids: List[Optional[str]] = []
+        self.doc_numbers: Dict[str, int] = {}
+        self.doc_lengths: Dict[int, List[int]] = {}
+        self.doc_attributes: Dict[int, Tuple[int, ...]] = {}
+        self.total_lengths = [0] * len(self.fields)
+        self.codes = AttributeCodes()
+
+        # Base segment: doc numbers below base_count; postings of base_terms[term] are
+        # base_docs / base_tfs rows base_offsets[i]:base_offsets[i + 1]
+        self.base_count = 0
+        self.base_terms: Dict[str, int] = {}
+        self.base_offsets = np.zeros(1, dtype=np.int64)
+        self.base_docs = np.zeros(0, dtype=np.int32)
+        self.base_tfs = np.zeros((0, len(self.fields)), dtype=np.int32)
+        self.base_lengths = np.zeros((0, len(self.fields)), dtype=np.int32)
+        self.base_attributes = np.zeros((0, len(FILTER_FIELDS)), dtype=np.int32)
+        self.base_removed: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.doc_numbers)
+
+    def __contains__(self, entry_id: str) -> bool:
+        return entry_id in self.doc_numbers
+
+    def add(self, entry: Dict[str, Any]):
+        """Index (or re-index) a single entry"""
+        entry_id = entry["id"]
+        if entry_id in self.doc_numbers:
+            self.remove(entry_id)
+
+        doc = len(self.doc_ids)
+        self.doc_ids.append(entry_id)
+        self.doc_numbers[entry_id] = doc
+
+        field_tokens = self._field_tokens(entry)
+        lengths = [len(field_tokens[field]) for field in self.fields]
+        self.doc_lengths[doc] = lengths
+        self.doc_attributes[doc] = tuple(self.codes.encode(entry).tolist())
+        for i, length in enumerate(lengths):
+            self.total_lengths[i] += length
+
+        for i, field in enumerate(self.fields):
+            for term in field_tokens[field]:
+                tfs = self.postings.setdefault(term, {}).get(doc)
+                if tfs is None:
+                    tfs = [0] * len(self.fields)
+                    self.postings[term][doc] = tfs
+                tfs[i] += 1
+
+    def remove(self, entry_id: str):
+        """Drop an entry from the index"""
+        doc = self.doc_numbers.pop(entry_id, None)
+        if doc is None:
+            return
+
+        self.doc_ids[doc] = None
+        if doc < self.base_count:
+            # Base postings are read-only: the doc is skipped when scoring until the next save()
+            self.base_removed.add(doc)
+            for i, length in enumerate(self.base_lengths[doc]):
+                self.total_lengths[i] -= int(length)
+            return
+
+        del self.doc_attributes[doc]
+        for i, length in enumerate(self.doc_lengths.pop(doc)):
+            self.total_lengths[i] -= length
+
+        for term in [t for t, docs in self.postings.items() if doc in docs]:
+            del self.postings[term][doc]
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def document_frequency(self, term: str) -> int:
+        frequency = len(self.postings.get(term, ()))
+        position = self.base_terms.get(term)
+        if position is not None:
+            frequency += int(self.base_offsets[position + 1] - self.base_offsets[position])
+        return frequency
+
+    def search(self, query: str, limit: int = 10, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Return [{"id", "relevance_score"}] for the top entries by BM25 score.
+
+        The query is analyzed in the language filter's language, as entries in it were at ingest.
+        """
+        language = (filters or {}).get("language") or "en"
+        scores = self.score(analyze(query, language, remove_stop_words=True), filters)
+        if not scores:
+            return []
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [
+            {"id": self.doc_ids[doc], "relevance_score": round(score, 4)}
+            for doc, score in top
+        ]
+
+    def score(self, terms: List[str], filters: Optional[Dict[str, Any]] = None) -> Dict[int, float]:
+        """Accumulate BM25F scores per doc number for the given query terms (within filters)"""
+        total_docs = len(self.doc_numbers)
+        if not total_docs:
+            return {}
+        wanted = self.codes.wanted(filters)
+
+        avg_lengths = [max(total / total_docs, 1.0) for total in self.total_lengths]
+        boosts = [self.field_boosts[field] for field in self.fields]
+        scores: Dict[int, float] = {}
+        base_docs: List[np.ndarray] = []
+        base_scores: List[np.ndarray] = []
+
+        for term in set(terms):
+            frequency = self.document_frequency(term)
+            if not frequency:
+                continue
+            idf = math.log(1 + (total_docs - frequency + 0.5) / (frequency + 0.5))
+
+            position = self.base_terms.get(term)
+            if position is not None:
+                # Vectorized over the term's base postings
+                start, end = int(self.base_offsets[position]), int(self.base_offsets[position + 1])
+                docs = np.asarray(self.base_docs[start:end])
+                tfs = np.asarray(self.base_tfs[start:end])
+                if wanted:
+                    rows = np.flatnonzero(self.codes.mask(self.base_attributes[docs], filters))
+                    docs, tfs = docs[rows], tfs[rows]
+                norms = 1 - self.b + self.b * self.base_lengths[docs] / np.asarray(avg_lengths)
+                weighted_tf = (tfs * np.asarray(boosts) / norms).sum(axis=1)
+                base_docs.append(docs)
+                base_scores.append(idf * weighted_tf / (self.k1 + weighted_tf))
+
+            for doc, tfs in self.postings.get(term, {}).items():
+                if wanted and any(self.doc_attributes[doc][i] != code for i, code in wanted):
+                    continue
+                lengths = self.doc_lengths[doc]
+                weighted_tf = 0.0
+                for i, tf in enumerate(tfs):
+                    if tf:
+                        norm = 1 - self.b + self.b * lengths[i] / avg_lengths[i]
+                        weighted_tf += boosts[i] * tf / norm
+                scores[doc] = scores.get(doc, 0.0) + idf * weighted_tf / (self.k1 + weighted_tf)
+
+        if base_docs:
+            docs, positions = np.unique(np.concatenate(base_docs), return_inverse=True)
+            totals = np.bincount(positions, weights=np.concatenate(base_scores))
+            for doc, total in zip(docs.tolist(), totals.tolist()):
+                if doc not in self.base_removed:
+                    scores[doc] = total
+
+        return scores
+
+    def save(self, path: str):
+        """Write all live entries as a base segment (CSR postings) to a directory"""
+        live = [doc for doc, entry_id in enumerate(self.doc_ids) if entry_id is not None]
+        renumber = np.full(len(self.doc_ids), -1, dtype=np.int64)
+        renumber[live] = np.arange(len(live))
+
+        lengths = np.zeros((len(live), len(self.fields)), dtype=np.int32)
+        base_live = [doc for doc in live if doc < self.base_count]
+        if base_live:
+            lengths[renumber[base_live]] = self.base_lengths[base_live]
+        for doc, doc_lengths in self.doc_lengths.items():
+            lengths[renumber[doc]] = doc_lengths
+
+        attributes = np.zeros((len(live), len(FILTER_FIELDS)), dtype=np.int32)
+        if base_live:
+            attributes[renumber[base_live]] = self.base_attributes[base_live]
+        for doc, codes in self.doc_attributes.items():
+            attributes[renumber[doc]] = codes
+
+        terms = sorted(set(self.base_terms) | set(self.postings))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_chunks: List[np.ndarray] = []
+        tf_chunks: List[np.ndarray] = []
+        for i, term in enumerate(terms):
+            docs = np.zeros(0, dtype=np.int64)
+            tfs = np.zeros((0, len(self.fields)), dtype=np.int32)
+            position = self.base_terms.get(term)
+            if position is not None:
+                start, end = int(self.base_offsets[position]), int(self.base_offsets[position + 1])
+                docs = renumber[np.asarray(self.base_docs[start:end])]
+                tfs = np.asarray(self.base_tfs[start:end])
+                kept = docs >= 0
+                docs, tfs = docs[kept], tfs[kept]
+            delta = self.postings.get(term)
+            if delta:
+                docs = np.concatenate([docs, renumber[list(delta)]])
+                tfs = np.concatenate([tfs, np.asarray(list(delta.values()), dtype=np.int32)])
+            doc_chunks.append(docs)
+            tf_chunks.append(tfs)
+            offsets[i + 1] = offsets[i] + len(docs)
+
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "term_offsets.npy"), offsets)
+        np.save(os.path.join(path, "posting_docs.npy"),
+                np.concatenate(doc_chunks).astype(np.int32) if terms else np.zeros(0, dtype=np.int32))
+        np.save(os.path.join(path, "posting_tfs.npy"),
+                np.concatenate(tf_chunks).astype(np.int32) if terms else np.zeros((0, len(self.fields)), dtype=np.int32))
+        np.save(os.path.join(path, "doc_lengths.npy"), lengths)
+        np.save(os.path.join(path, "attributes.npy"), attributes)
+        with open(os.path.join(path, "terms.json"), "w") as f:
+            json.dump(terms, f)
+        with open(os.path.join(path, "ids.json"), "w") as f:
+            json.dump([self.doc_ids[doc] for doc in live], f)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({
+                "format_version": FORMAT_VERSION,
+                "fields": self.fields,
+                "field_boosts": self.field_boosts,
+                "k1": self.k1,
+                "b": self.b,
+                "count": len(live),
+                "terms": len(terms),
+                "vocab": self.codes.vocab,
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "InvertedIndex":
+        """Memory-map a saved index; posting pages are shared with other processes on the host"""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported search index format: {meta.get('format_version')}")
+
+        index = cls(meta["field_boosts"], meta["k1"], meta["b"])
+        index.base_offsets = np.load(os.path.join(path, "term_offsets.npy"), mmap_mode="r")
+        index.base_docs = np.load(os.path.join(path, "posting_docs.npy"), mmap_mode="r")
+        index.base_tfs = np.load(os.path.join(path, "posting_tfs.npy"), mmap_mode="r")
+        index.base_lengths = np.load(os.path.join(path, "doc_lengths.npy"), mmap_mode="r")
+        index.base_attributes = np.load(os.path.join(path, "attributes.npy"), mmap_mode="r")
+        index.codes = AttributeCodes(meta["vocab"])
+        with open(os.path.join(path, "terms.json")) as f:
+            index.base_terms = {term: i for i, term in enumerate(json.load(f))}
+        with open(os.path.join(path, "ids.json")) as f:
+            index.doc_ids = json.load(f)
+
+        index.base_count = len(index.doc_ids)
+        index.doc_numbers = {entry_id: doc for doc, entry_id in enumerate(index.doc_ids)}
+        index.total_lengths = [int(total) for total in np.asarray(index.base_lengths).sum(axis=0)] \
+            if index.base_count else [0] * len(index.fields)
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.doc_numbers),
+            "base_entries": self.base_count - len(self.base_removed),
+            "delta_entries": len(self.doc_lengths),
+            "terms": len(set(self.base_terms) | set(self.postings)),
+        }
+
+    def _field_tokens(self, entry: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Analyzed terms per field; content uses the persisted tokens when the entry has them"""
+        language = entry.get("language") or "en"
+        content_tokens = entry.get("tokens")
+        if content_tokens is None:
+            content_tokens = analyze(entry.get("content") or "", language)
+        elif isinstance(content_tokens, str):
+            content_tokens = content_tokens.split()
+        return {
+            "content": list(content_tokens),
+            "concepts": analyze(" ".join(entry.get("concepts") or []), language),
+            "themes": analyze(" ".join(entry.get("themes") or []), language),
+            "culture": analyze(entry.get("culture") or ""),
+            "category": analyze(entry.get("category") or ""),
+        }
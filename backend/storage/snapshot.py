@@ -0,0 +1,101 @@
+"""
+Corpus Snapshot - Versioned, memory-mapped copy of the in-process search indexes
+One worker writes it; new workers map it and only catch up on rows newer than its watermark
+"""
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from storage.search_index import InvertedIndex
+from storage.vector_index import VectorIndex
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+
+# Older versions kept around for workers that still have them mapped
+KEEP_VERSIONS = 2
+
+
+def read_snapshot_meta(root: str) -> Optional[Dict[str, Any]]:
+    """Metadata of the current snapshot version, or None if there is none"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            name = f.read().strip()
+        with open(os.path.join(root, name, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("format_version") != FORMAT_VERSION:
+        return None
+    meta["path"] = os.path.join(root, name)
+    return meta
+
+
+def save_snapshot(
+    root: str,
+    search_index: InvertedIndex,
+    vector_index: Optional[VectorIndex],
+    watermark: Optional[datetime]
+) -> Dict[str, Any]:
+    """Write a new snapshot version and atomically make it the current one.
+
+    watermark is the newest created_at the indexes are known to be complete up
+    to; readers catch up on rows from there. vector_index is None when vectors
+    live in a saved ANN index instead.
+    """
+    previous = read_snapshot_meta(root)
+    version = previous["version"] + 1 if previous else 1
+    name = f"v{version:06d}-{os.getpid()}"
+    staging = os.path.join(root, f".{name}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+
+    search_index.save(os.path.join(staging, "postings"))
+    if vector_index is not None:
+        vector_index.save(os.path.join(staging, "vectors"))
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "watermark": watermark.isoformat() if watermark else None,
+        "entries": len(search_index),
+        "vectors": vector_index is not None,
+        "written_at": time.time(),
+    }
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    # Readers only ever see complete directories: rename it, then swap the pointer
+    os.replace(staging, os.path.join(root, name))
+    pointer = os.path.join(root, f".{CURRENT_FILE}.{os.getpid()}")
+    with open(pointer, "w") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(root, CURRENT_FILE))
+
+    _prune(root, name)
+    meta["path"] = os.path.join(root, name)
+    return meta
+
+
+def load_snapshot(root: str) -> Optional[Tuple[Dict[str, Any], InvertedIndex, Optional[VectorIndex]]]:
+    """Memory-map the current snapshot: (meta, search index, vector index or None)"""
+    meta = read_snapshot_meta(root)
+    if meta is None:
+        return None
+
+    search_index = InvertedIndex.load(os.path.join(meta["path"], "postings"))
+    vector_index = VectorIndex.load(os.path.join(meta["path"], "vectors")) if meta["vectors"] else None
+    meta["watermark"] = datetime.fromisoformat(meta["watermark"]) if meta["watermark"] else None
+    return meta, search_index, vector_index
+
+
+def _prune(root: str, current: str):
+    """Delete all but the newest KEEP_VERSIONS versions (mapped files stay readable on POSIX)"""
+    versions = sorted(
+        (entry for entry in os.listdir(root) if entry.startswith("v") and entry != current),
+        reverse=True
+    )
+    for name in versions[KEEP_VERSIONS - 1:]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
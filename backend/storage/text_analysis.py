@@ -0,0 +1,111 @@
+"""
+Text Analysis - Shared normalization, tokenization, stop-words and light stemming
+One pipeline for ingestion, indexing, search and reasoning, so "Oríkì", "ORIKI" and
+"oriki" are the same term everywhere and keywords match whole words only
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, List
+
+# Letters and digits; underscores split words so "collective_good" -> "collective", "good"
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+# Function words that carry no meaning on their own, per language
+STOP_WORDS_BY_LANGUAGE: Dict[str, FrozenSet[str]] = {
+    "en": frozenset("""
+        a an and are as at be but by do does for from has have how i in is it its me
+        my not of on or our so that the their them they this to us was we what when
+        where which who why will with you your about can should would
+    """.split()),
+    "fr": frozenset("""
+        le la les un une des du de et ou en au aux a est sont ce cet cette ces il elle
+        ils elles nous vous je tu on que qui quoi dans par pour sur pas ne se sa son ses
+    """.split()),
+    "es": frozenset("""
+        el la los las un una unos unas y o de del en a al es son que quien con por para
+        su sus se lo le les no como mas pero este esta estos estas nosotros yo tu
+    """.split()),
+    "pt": frozenset("""
+        o a os as um uma uns umas e ou de do da dos das em no na nos nas ao que quem com
+        por para seu sua se nao como mas este esta eu tu nos
+    """.split()),
+    "sw": frozenset("""
+        na ya wa za la kwa ni katika cha vya kama lakini au hii huu hao sisi wao yeye mimi
+    """.split()),
+    "yo": frozenset("""
+        ati ni si ti ko o a won awa emi iwo fun pelu sugbon tabi yi naa
+    """.split()),
+}
+
+# Default stop-words (English) for callers that don't know the language
+STOP_WORDS = STOP_WORDS_BY_LANGUAGE["en"]
+
+# English suffixes, longest first: (suffix, replacement, minimum stem length)
+ENGLISH_SUFFIXES = (
+    ("sses", "ss", 2),
+    ("ies", "y", 2),
+    ("ness", "", 3),
+    ("ing", "", 3),
+    ("ed", "", 3),
+    ("ly", "", 3),
+    ("es", "", 3),
+    ("s", "", 3),
+)
+
+
+def normalize(text: str) -> str:
+    """Unicode compatibility normalization (NFKC) and case folding"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def fold_diacritics(text: str) -> str:
+    """Strip combining marks: "oríkì" -> "oriki", "ẹ̀kọ́" -> "eko" """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized, diacritic-folded word tokens (stop-words kept, no stemming)"""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(fold_diacritics(normalize(text)))
+
+
+def stop_words(language: str = "en") -> FrozenSet[str]:
+    return STOP_WORDS_BY_LANGUAGE.get((language or "en")[:2].lower(), STOP_WORDS)
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str, language: str = "en") -> str:
+    """Light suffix stripping: enough to conflate plurals and common inflections.
+
+    English strips one suffix (-s, -es, -ies, -ed, -ing, -ly, -ness) and a final
+    -e, so "shares", "shared", "sharing" and "share" all become "shar". French,
+    Spanish and Portuguese only drop a plural -s; other languages are left as is.
+    """
+    language = (language or "en")[:2].lower()
+    if language == "en":
+        for suffix, replacement, min_stem in ENGLISH_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= min_stem:
+                if suffix == "es" and not token[:-2].endswith(("s", "x", "z", "ch", "sh")):
+                    continue
+                if suffix == "s" and token.endswith(("ss", "us", "is")):
+                    break
+                token = token[:-len(suffix)] + replacement
+                break
+        if token.endswith("e") and len(token) > 3:
+            token = token[:-1]
+        return token
+    if language in ("fr", "es", "pt") and token.endswith("s") and len(token) > 3:
+        return token[:-1]
+    return token
+
+
+def analyze(text: str, language: str = "en", remove_stop_words: bool = False) -> List[str]:
+    """Full pipeline: normalize, fold diacritics, tokenize, (drop stop-words), stem"""
+    tokens = tokenize(text)
+    if remove_stop_words:
+        excluded = stop_words(language)
+        tokens = [t for t in tokens if t not in excluded]
+    return [stem(t, language) for t in tokens]
@@ -0,0 +1,259 @@
+"""
+Vector Index - Local text embeddings and brute-force similarity search
+Embeddings are computed without any network call, so ranking costs nothing per query
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from storage.text_analysis import tokenize, STOP_WORDS
+
+DEFAULT_DIM = 256
+
+# Entry attributes that vector searches can be restricted to
+FILTER_FIELDS = ("culture", "category", "language")
+
+
+class HashingEmbedder:
+    """Projects text into a fixed-size vector with the hashing trick.
+
+    Word unigrams, word bigrams and character trigrams of the non-stop-word
+    tokens are hashed into signed buckets, weighted by log-scaled frequency and
+    L2-normalised, so cosine similarity reduces to a dot product.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+        self._bucket_cache: Dict[str, Tuple[int, float]] = {}
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a single text as a float32 unit vector"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        counts: Dict[str, float] = {}
+
+        tokens = [token for token in tokenize(text) if token not in STOP_WORDS]
+        for token in tokens:
+            counts[token] = counts.get(token, 0.0) + 1.0
+            padded = f"<{token}>"
+            for i in range(len(padded) - 2):
+                gram = "#" + padded[i:i + 3]
+                counts[gram] = counts.get(gram, 0.0) + 0.25
+        for first, second in zip(tokens, tokens[1:]):
+            bigram = f"{first} {second}"
+            counts[bigram] = counts.get(bigram, 0.0) + 0.5
+
+        for feature, count in counts.items():
+            bucket, sign = self._bucket(feature)
+            vector[bucket] += sign * np.log1p(count)
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def embed_entry(self, entry: Dict[str, Any]) -> np.ndarray:
+        """Embed the searchable fields of a knowledge entry"""
+        themes = [t.replace("_", " ") for t in (entry.get("themes") or [])]
+        parts = [
+            entry.get("content") or "",
+            entry.get("culture") or "",
+            entry.get("category") or "",
+            " ".join(entry.get("concepts") or []),
+            " ".join(themes),
+        ]
+        return self.embed(" ".join(parts))
+
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        # Stable across processes, unlike the builtin hash()
+        cached = self._bucket_cache.get(feature)
+        if cached is None:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            cached = (value % self.dim, 1.0 if (value >> 63) & 1 else -1.0)
+            if len(self._bucket_cache) < 200_000:
+                self._bucket_cache[feature] = cached
+        return cached
+
+
+class AttributeCodes:
+    """Encodes culture/category/language values as small integers for masking"""
+
+    def __init__(self, vocab: Optional[Dict[str, Dict[str, int]]] = None):
+        self.vocab = vocab or {field: {} for field in FILTER_FIELDS}
+
+    def encode(self, attributes: Optional[Dict[str, Any]]) -> np.ndarray:
+        attributes = attributes or {}
+        codes = np.empty(len(FILTER_FIELDS), dtype=np.int32)
+        for i, field in enumerate(FILTER_FIELDS):
+            values = self.vocab[field]
+            value = attributes.get(field) or ""
+            codes[i] = values.setdefault(value, len(values))
+        return codes
+
+    def wanted(self, filters: Optional[Dict[str, Any]]) -> List[Tuple[int, int]]:
+        """(column, code) pairs a row must match; code -1 (matches nothing) for unseen values"""
+        return [
+            (i, self.vocab[field].get(filters[field], -1))
+            for i, field in enumerate(FILTER_FIELDS)
+            if filters and filters.get(field)
+        ]
+
+    def mask(self, codes: np.ndarray, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Boolean row mask for an (n, fields) code array, or None when unfiltered"""
+        mask = None
+        for i, code in self.wanted(filters):
+            field_mask = codes[:, i] == code
+            mask = field_mask if mask is None else mask & field_mask
+        return mask
+
+
+def top_k(scores: np.ndarray, k: int, min_score: float) -> List[Tuple[int, float]]:
+    """Pick the k best (position, score) pairs above min_score without a full sort"""
+    if not len(scores):
+        return []
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [(int(i), float(scores[i])) for i in top if scores[i] > min_score]
+
+
+class VectorIndex:
+    """Dense float32 matrix of entry embeddings with exact top-k search.
+
+    An index loaded from a snapshot keeps its vectors in a memory-mapped base
+    segment; vectors added afterwards go to the in-memory matrix after it.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM, initial_capacity: int = 1024):
+        self.dim = dim
+        self.vectors = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self.attributes = np.zeros((initial_capacity, len(FILTER_FIELDS)), dtype=np.int32)
+        self.codes = AttributeCodes()
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+
+        # Base segment: positions below base_count live in base_vectors / base_attributes
+        self.base_count = 0
+        self.base_vectors = np.zeros((0, dim), dtype=np.float32)
+        self.base_attributes = np.zeros((0, len(FILTER_FIELDS)), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, entry_id: str) -> bool:
+        return entry_id in self.positions
+
+    def add(self, entry_id: str, vector: np.ndarray, attributes: Optional[Dict[str, Any]] = None):
+        """Insert or replace the vector for an entry"""
+        position = self.positions.get(entry_id)
+        if position is not None and position < self.base_count:
+            # Base pages are mapped copy-on-write, so a replacement stays private to this process
+            self.base_vectors[position] = vector
+            self.base_attributes[position] = self.codes.encode(attributes)
+            return
+
+        if position is None:
+            position = len(self.ids)
+            if position - self.base_count == self.vectors.shape[0]:
+                self.vectors = _grow(self.vectors)
+                self.attributes = _grow(self.attributes)
+            self.ids.append(entry_id)
+            self.positions[entry_id] = position
+        self.vectors[position - self.base_count] = vector
+        self.attributes[position - self.base_count] = self.codes.encode(attributes)
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        k: int = 10,
+        min_score: float = 0.0,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, float]]:
+        """Return (entry id, cosine similarity) for the k most similar entries"""
+        if not self.ids:
+            return []
+
+        hits: List[Tuple[str, float]] = []
+        for vectors, attributes, offset in self._segments():
+            mask = self.codes.mask(attributes, filters)
+            if mask is None:
+                segment_hits = top_k(vectors @ query_vector, k, min_score)
+                hits.extend((self.ids[offset + i], score) for i, score in segment_hits)
+                continue
+
+            # Score only the rows that pass the filters
+            rows = np.flatnonzero(mask)
+            segment_hits = top_k(vectors[rows] @ query_vector, k, min_score)
+            hits.extend((self.ids[offset + rows[i]], score) for i, score in segment_hits)
+
+        if self.base_count:
+            hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:k]
+
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All vectors and attribute codes in position order (copies the base segment)"""
+        delta_count = len(self.ids) - self.base_count
+        if not self.base_count:
+            return self.vectors[:delta_count], self.attributes[:delta_count]
+        return (
+            np.concatenate([self.base_vectors, self.vectors[:delta_count]]),
+            np.concatenate([self.base_attributes, self.attributes[:delta_count]]),
+        )
+
+    def save(self, path: str):
+        """Write every vector as a base segment to a directory"""
+        vectors, attributes = self.matrix()
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), vectors)
+        np.save(os.path.join(path, "attributes.npy"), attributes)
+        with open(os.path.join(path, "ids.json"), "w") as f:
+            json.dump(self.ids, f)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"dim": self.dim, "count": len(self.ids), "vocab": self.codes.vocab}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "VectorIndex":
+        """Memory-map a saved index; pages are shared with other processes reading the same files"""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+
+        index = cls(meta["dim"], initial_capacity=1024)
+        index.codes = AttributeCodes(meta["vocab"])
+        index.base_vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="c")
+        index.base_attributes = np.load(os.path.join(path, "attributes.npy"), mmap_mode="c")
+        with open(os.path.join(path, "ids.json")) as f:
+            index.ids = json.load(f)
+        index.base_count = len(index.ids)
+        index.positions = {entry_id: i for i, entry_id in enumerate(index.ids)}
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "type": "flat",
+            "entries": len(self.ids),
+            "base_entries": self.base_count,
+            "dim": self.dim,
+        }
+
+    def _segments(self):
+        if self.base_count:
+            yield self.base_vectors, self.base_attributes, 0
+        delta_count = len(self.ids) - self.base_count
+        yield self.vectors[:delta_count], self.attributes[:delta_count], self.base_count
+
+
+def _grow(array: np.ndarray) -> np.ndarray:
+    grown = np.zeros((max(array.shape[0] * 2, 16),) + array.shape[1:], dtype=array.dtype)
+    grown[:array.shape[0]] = array
+    return grown
+
+
+def vector_to_bytes(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def vector_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.float32)
@@ -3,6 +3,7 @@ Test script for multi-modal endpoints
 """
 import requests
 import os
+import time
 
 API_URL = "http://localhost:8000"
 
@@ -30,10 +31,20 @@ def test_multimodal_ingest():
         
         response = requests.post(f"{API_URL}/multimodal/ingest", data=data)
         
-        if response.status_code == 200:
-            print("✅ Multi-modal ingest endpoint working")
-            print(f"Response: {response.json()}")
-            return True
+        if response.status_code == 202:
+            # Ingestion runs as a background job: poll it until it finishes
+            job_url = f"{API_URL}{response.json()['status_url']}"
+            for _ in range(60):
+                job = requests.get(job_url).json()
+                if job["status"] in ("succeeded", "failed"):
+                    break
+                time.sleep(1)
+            if job["status"] == "succeeded":
+                print("✅ Multi-modal ingest endpoint working")
+                print(f"Result: {job['result']}")
+                return True
+            print(f"❌ Multi-modal ingest job {job['status']}: {job.get('error')}")
+            return False
         else:
             print(f"❌ Multi-modal ingest failed: {response.status_code}")
             print(f"Error: {response.text}")
@@ -0,0 +1,15 @@
+"""
+Shared fixtures: a throwaway SQLite database for tests that construct Database()
+"""
+import pytest
+
+
+@pytest.fixture
+def database_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'knowledge.db'}")
+    monkeypatch.setenv("SEARCH_MODE", "semantic")
+    monkeypatch.setenv("SNAPSHOT_PATH", "")
+    monkeypatch.setenv("ANN_INDEX_PATH", str(tmp_path / "ann"))
+    monkeypatch.setenv("ASI_API_KEY", "")
+    monkeypatch.chdir(tmp_path)
+
@@ -0,0 +1,15 @@
+"""
+Test data builders
+"""
+
+
+def knowledge(content: str, **processed) -> dict:
+    """store_knowledge input as the ingestion pipeline produces it"""
+    return {
+        "content": content,
+        "culture": "swahili",
+        "category": "proverb",
+        "language": "en",
+        "symbolic_representation": "(proverb)",
+        "processed_data": {"concepts": [], "themes": [], **processed},
+    }
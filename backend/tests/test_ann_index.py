@@ -0,0 +1,105 @@
+"""
+IVF index persistence: versioned saves must not disturb workers reading an older version
+"""
+import os
+import threading
+
+import numpy as np
+
+from storage.ann_index import CURRENT_FILE, KEEP_VERSIONS, IVFIndex, VERSION_NAME, current_index_dir
+
+DIM = 16
+
+
+def unit_vectors(count: int, seed: int) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_index(vectors: np.ndarray, prefix: str = "e") -> IVFIndex:
+    index = IVFIndex(DIM, n_lists=4, nprobe=4)
+    index.train(vectors)
+    for i, vector in enumerate(vectors):
+        index.add(f"{prefix}{i}", vector, {"culture": "yoruba" if i % 2 else "akan"})
+    return index
+
+
+def test_save_load_round_trip(tmp_path):
+    vectors = unit_vectors(64, seed=0)
+    index = build_index(vectors)
+    expected = index.search(vectors[3], k=5)
+    index.save(str(tmp_path))
+
+    loaded = IVFIndex.load(str(tmp_path))
+    assert len(loaded) == 64
+    assert loaded.search(vectors[3], k=5) == expected
+    akan = loaded.search(vectors[3], k=64, min_score=-1.0, filters={"culture": "akan"})
+    assert sorted(entry_id for entry_id, _ in akan) == sorted(f"e{i}" for i in range(0, 64, 2))
+    # The saver maps its own files afterwards and keeps no delta
+    assert index.stats()["delta_entries"] == 0 and len(index) == 64
+
+
+def test_save_writes_new_version_and_prunes(tmp_path):
+    index = build_index(unit_vectors(32, seed=1))
+    for _ in range(KEEP_VERSIONS + 2):
+        index.save(str(tmp_path))
+
+    versions = [name for name in os.listdir(tmp_path) if VERSION_NAME.match(name)]
+    assert len(versions) == KEEP_VERSIONS
+    with open(tmp_path / CURRENT_FILE) as f:
+        assert current_index_dir(str(tmp_path)) == os.path.join(str(tmp_path), f.read().strip())
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_reader_keeps_its_version_while_writer_saves(tmp_path):
+    vectors = unit_vectors(64, seed=2)
+    writer = build_index(vectors)
+    writer.save(str(tmp_path))
+
+    reader = IVFIndex.load(str(tmp_path))
+    query = vectors[7]
+    before = reader.search(query, k=10)
+    mapped = np.array(reader.base_vectors)
+
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        try:
+            while not stop.is_set():
+                assert reader.search(query, k=10) == before
+        except Exception as e:  # surfaced to the main thread below
+            errors.append(e)
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    try:
+        # Enough saves that the reader's version is pruned from disk while it is still mapped
+        for round_ in range(KEEP_VERSIONS + 2):
+            for i, vector in enumerate(unit_vectors(16, seed=100 + round_)):
+                writer.add(f"new{round_}-{i}", vector)
+            writer.save(str(tmp_path))
+    finally:
+        stop.set()
+        thread.join()
+
+    assert not errors
+    assert np.array_equal(np.asarray(reader.base_vectors), mapped)
+    assert len(reader) == 64
+    assert len(IVFIndex.load(str(tmp_path))) == 64 + 16 * (KEEP_VERSIONS + 2)
+
+
+def test_load_reads_legacy_flat_layout(tmp_path):
+    vectors = unit_vectors(32, seed=3)
+    index = build_index(vectors)
+    index.save(str(tmp_path))
+
+    # Indexes saved before versioning kept their files directly in the index directory
+    version = current_index_dir(str(tmp_path))
+    for name in os.listdir(version):
+        os.replace(os.path.join(version, name), tmp_path / name)
+    os.rmdir(version)
+    os.remove(tmp_path / CURRENT_FILE)
+
+    assert current_index_dir(str(tmp_path)) == str(tmp_path)
+    assert IVFIndex.load(str(tmp_path)).search(vectors[0], k=3) == index.search(vectors[0], k=3)
@@ -0,0 +1,71 @@
+"""
+Database: in-process indexes and the query cache follow rows written by other processes
+"""
+import asyncio
+
+from sqlalchemy import event
+
+from storage.database import Database
+from tests.helpers import knowledge
+
+
+def test_rows_from_another_process_become_searchable(database_env):
+    async def scenario():
+        reader = Database()
+        writer = Database()
+        try:
+            assert await reader.query_knowledge("zebra stripes") == []
+
+            knowledge_id = await writer.store_knowledge(knowledge("The zebra keeps its stripes"))
+
+            results = await reader.query_knowledge("zebra stripes")
+            assert [result["id"] for result in results] == [knowledge_id]
+            assert knowledge_id in reader.search_index and knowledge_id in reader.vector_index
+            # The reader's own dedup index now knows the entry too
+            assert (await reader.find_duplicate("The zebra keeps its stripes"))["id"] == knowledge_id
+        finally:
+            await reader.close()
+            await writer.close()
+
+    asyncio.run(scenario())
+
+
+def test_catch_up_skips_rows_already_indexed(database_env):
+    async def scenario():
+        db = Database()
+        try:
+            knowledge_id = await db.store_knowledge(knowledge("Rain does not fall on one roof alone"))
+            await db.query_knowledge("rain roof")
+            await db.query_knowledge("rain roof")
+            assert len(db.search_index) == 1 and knowledge_id in db.search_index
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_batch_insert_stays_under_sqlite_parameter_limit(database_env):
+    async def scenario():
+        db = Database()
+        largest = []
+
+        def count_parameters(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("INSERT") and not executemany:
+                largest.append(len(parameters))
+
+        engines = [db.engine] + ([db.async_engine.sync_engine] if db.async_engine else [])
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", count_parameters)
+        try:
+            items = []
+            for i in range(150):
+                item = knowledge(f"Proverb number {i} about the baobab tree and the {i * 7919} stars")
+                item["processed_data"] = {"concepts": ["wisdom", f"tree{i}"], "themes": ["nature"], "patterns": ["growth"]}
+                items.append(item)
+            ids = await db.store_knowledge_batch(items)
+            assert len(ids) == 150 and all(ids)
+            assert largest and max(largest) <= 999
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+"""
+Disk cache bounds: LRU eviction driven by trigger-maintained totals
+"""
+import sqlite3
+
+from storage.disk_cache import DiskCache
+
+
+def table_totals(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+
+
+def test_evicts_least_recently_used_past_max_entries(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), max_entries=3)
+    for i in range(3):
+        cache.put(f"k{i}", i)
+    assert cache.get("k0") == 0  # k1 is now the least recently used
+    cache.put("k3", 3)
+
+    assert cache.get("k1") is None
+    assert [cache.get(key) for key in ("k0", "k2", "k3")] == [0, 2, 3]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_totals_follow_every_writer(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = DiskCache(path, max_entries=5)
+    second = DiskCache(path, max_entries=5)
+    for i in range(8):
+        (first if i % 2 else second).put(f"k{i}", {"value": i})
+    first.put("k7", {"value": "a longer replacement value"})
+
+    stats = first.stats()
+    assert (stats["entries"], stats["bytes"]) == table_totals(path)
+    assert stats["entries"] == 5
+
+
+def test_max_bytes(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), max_bytes=100)
+    cache.put_many([(f"k{i}", "x" * 30, None) for i in range(5)])
+    assert cache.stats()["bytes"] <= 100
+
+
+def test_totals_initialized_for_existing_cache_file(tmp_path):
+    path = str(tmp_path / "cache.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, cost TEXT, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO cache VALUES ('old', '1', NULL, 1, 9e9, 9e9)")
+
+    cache = DiskCache(path, ttl_seconds=0)
+    assert cache.stats()["entries"] == 1
+    cache.put("new", 2)
+    assert (cache.stats()["entries"], cache.stats()["bytes"]) == table_totals(path)
@@ -0,0 +1,110 @@
+"""
+Job queue leases: an attempt whose lease ran out must not overwrite the job's new claim
+"""
+import time
+
+import pytest
+
+from storage.job_queue import JobQueue, LeaseLost, QueueFull
+
+LEASE = 0.05
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), max_pending=3, max_attempts=3, lease_seconds=LEASE, retry_base_seconds=0)
+    yield queue
+    queue.close()
+
+
+def expire_lease():
+    time.sleep(LEASE * 2)
+
+
+def test_claim_complete(queue):
+    job_id = queue.enqueue("ingest", {"content": "x"})
+    job = queue.claim()
+    assert job["id"] == job_id and job["attempts"] == 1
+    assert queue.claim() is None
+
+    queue.set_stage(job_id, 1, "extracting")
+    queue.complete(job_id, 1, {"knowledge_id": "k1"})
+
+    stored = queue.get(job_id)
+    assert stored["status"] == "succeeded"
+    assert [stage["stage"] for stage in stored["stages"]] == ["queued", "extracting", "done"]
+
+
+def test_late_complete_after_lease_expiry(queue):
+    job_id = queue.enqueue("ingest", {"content": "x"})
+    assert queue.claim()["attempts"] == 1
+    expire_lease()
+
+    # Another worker takes the job over
+    assert queue.claim()["attempts"] == 2
+
+    # The first worker wakes up and tries to finish its attempt
+    with pytest.raises(LeaseLost):
+        queue.complete(job_id, 1, {"knowledge_id": "stale"})
+    with pytest.raises(LeaseLost):
+        queue.set_stage(job_id, 1, "storing")
+    with pytest.raises(LeaseLost):
+        queue.fail(job_id, 1, "boom", retry=True)
+    assert queue.renew(job_id, 1) is False
+
+    job = queue.get(job_id)
+    assert job["status"] == "running" and job["attempts"] == 2 and job["result"] is None
+
+    queue.complete(job_id, 2, {"knowledge_id": "fresh"})
+    job = queue.get(job_id)
+    assert job["status"] == "succeeded" and job["result"] == {"knowledge_id": "fresh"}
+
+
+def test_renew_keeps_the_lease(queue):
+    job_id = queue.enqueue("ingest", {"content": "x"})
+    queue.claim()
+    for _ in range(4):
+        time.sleep(LEASE / 2)
+        assert queue.renew(job_id, 1)
+    assert queue.claim() is None
+    queue.complete(job_id, 1, {})
+
+
+def test_lease_lost_on_last_attempt_fails_job(queue):
+    job_id = queue.enqueue("ingest", {"content": "x"})
+    for _ in range(queue.max_attempts):
+        queue.claim()
+        expire_lease()
+
+    assert queue.claim() is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and job["error"] == "worker lost while running"
+
+
+def test_fail_retries_until_max_attempts(queue):
+    job_id = queue.enqueue("ingest", {"content": "x"})
+    for attempt in range(1, queue.max_attempts):
+        assert queue.claim()["attempts"] == attempt
+        assert queue.fail(job_id, attempt, "timeout", retry=True) is True
+        assert queue.get(job_id)["status"] == "queued"
+
+    queue.claim()
+    assert queue.fail(job_id, queue.max_attempts, "timeout", retry=True) is False
+    assert queue.get(job_id)["status"] == "failed"
+
+
+def test_release_does_not_count_the_attempt(queue):
+    job_id = queue.enqueue("ingest", {"content": "x"})
+    queue.claim()
+    queue.release(job_id, 1)
+
+    job = queue.get(job_id)
+    assert job["status"] == "queued" and job["attempts"] == 0
+    assert queue.claim()["attempts"] == 1
+
+
+def test_enqueue_rejects_when_full(queue):
+    for _ in range(queue.max_pending):
+        queue.enqueue("ingest", {})
+    with pytest.raises(QueueFull):
+        queue.enqueue("ingest", {})
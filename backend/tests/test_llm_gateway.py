@@ -0,0 +1,149 @@
+"""
+LLM gateway admission: cancelled waiters must not leak slots, retries go back through the queue
+"""
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+import agents.llm_gateway as llm_gateway
+from agents.llm_gateway import BACKGROUND, INTERACTIVE, LLMGateway
+
+
+def make_gateway(**kwargs) -> LLMGateway:
+    settings = {"rate": 0, "min_concurrency": 1, "max_concurrency": 1, "initial_concurrency": 1, "max_retries": 2}
+    return LLMGateway("test", **{**settings, **kwargs})
+
+
+def rate_limit_error(retry_after: str = "0") -> openai.RateLimitError:
+    request = httpx.Request("POST", "http://llm.test/chat/completions")
+    response = httpx.Response(429, request=request, headers={"retry-after": retry_after})
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        gateway = make_gateway()
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+            return "first"
+
+        first = asyncio.create_task(gateway.call(hold))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(gateway.call(hold))
+        await asyncio.sleep(0)
+        assert gateway.in_flight == 1 and gateway.queued[INTERACTIVE] == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        release.set()
+        assert await first == "first"
+        assert await gateway.call(hold) == "first"
+        assert gateway.in_flight == 0 and gateway.queued[INTERACTIVE] == 0
+
+    asyncio.run(scenario())
+
+
+def test_slot_granted_to_a_cancelled_waiter_is_handed_on():
+    async def scenario():
+        gateway = make_gateway()
+        await gateway._acquire(INTERACTIVE)
+        waiter = asyncio.create_task(gateway._acquire(BACKGROUND))
+        await asyncio.sleep(0)
+
+        # The slot is freed and granted to the waiter, which is cancelled in the same tick
+        gateway._release()
+        assert gateway.in_flight == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert gateway.in_flight == 0
+        await asyncio.wait_for(gateway._acquire(INTERACTIVE), timeout=1)
+        assert gateway.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_interactive_waiters_go_first():
+    async def scenario():
+        gateway = make_gateway()
+        order = []
+        release = asyncio.Event()
+
+        async def record(name):
+            order.append(name)
+            await release.wait()
+
+        blocker = asyncio.create_task(gateway.call(lambda: record("blocker")))
+        await asyncio.sleep(0)
+        calls = [
+            asyncio.create_task(gateway.call(lambda name=name: record(name), priority=priority))
+            for name, priority in (("bg1", BACKGROUND), ("ui1", INTERACTIVE), ("bg2", BACKGROUND), ("ui2", INTERACTIVE))
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(blocker, *calls)
+        assert order == ["blocker", "ui1", "ui2", "bg1", "bg2"]
+
+    asyncio.run(scenario())
+
+
+def test_transient_failure_is_requeued(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "RETRY_BASE_SECONDS", 0)
+
+    async def scenario():
+        gateway = make_gateway()
+        attempts = []
+
+        async def flaky():
+            attempts.append(gateway.in_flight)
+            if len(attempts) == 1:
+                raise openai.APIConnectionError(request=httpx.Request("POST", "http://llm.test"))
+            return "ok"
+
+        assert await gateway.call(flaky) == "ok"
+        # Each attempt held its own slot, released before the retry queued again
+        assert attempts == [1, 1] and gateway.in_flight == 0
+        assert gateway.counters["retries"] == 1 and gateway.counters["succeeded"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit_requeues_and_cuts_limit_once():
+    async def scenario():
+        gateway = make_gateway(max_concurrency=8, initial_concurrency=8)
+        failures = {"left": 4}
+
+        async def limited():
+            if failures["left"]:
+                failures["left"] -= 1
+                raise rate_limit_error()
+            return "ok"
+
+        results = await asyncio.gather(*[gateway.call(limited) for _ in range(4)])
+        assert results == ["ok"] * 4
+        # One burst of 429s halves the limit once
+        assert gateway.counters["rate_limited"] == 4 and gateway.counters["limit_cuts"] == 1
+        assert int(gateway.limit) == 4
+
+    asyncio.run(scenario())
+
+
+def test_non_transient_error_is_not_retried():
+    async def scenario():
+        gateway = make_gateway()
+
+        async def broken():
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            await gateway.call(broken)
+        assert gateway.counters["retries"] == 0 and gateway.counters["failed"] == 1
+        assert gateway.in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,63 @@
+"""
+Reasoning over stored entries: scoring and pattern aggregation through the tag tables
+"""
+import asyncio
+
+from agents.reasoning_engine import ReasoningEngine
+from storage.database import Database
+from tests.helpers import knowledge
+
+ENTRIES = [
+    knowledge("Judge the case by both sides", concepts=["Fairness", "justice"], themes=["ethics"], patterns=["balance"]),
+    knowledge("A single bracelet does not jingle", concepts=["community"], themes=["collective_good"], patterns=["unity_diversity"]),
+    knowledge("The elder's words are a lamp", concepts=["respect"], themes=["wisdom"], patterns=[]),
+]
+
+
+def stored_entries(db: Database):
+    async def store():
+        ids = await db.store_knowledge_batch(ENTRIES)
+        return [await db.get_knowledge(knowledge_id) for knowledge_id in ids]
+    return store()
+
+
+def test_tag_tables_match_the_entry_lists(database_env):
+    async def scenario():
+        db = Database()
+        try:
+            entries = await stored_entries(db)
+            with_tables = ReasoningEngine(db=db)
+            without_tables = ReasoningEngine()
+            intent = {"type": "ethical", "concepts": ["fairness", "justice"], "seeking": "moral_guidance"}
+
+            relevant = await with_tables._find_relevant_knowledge(intent, [dict(e) for e in entries])
+            expected = await without_tables._find_relevant_knowledge(intent, [dict(e) for e in entries])
+            assert [(e["id"], e["relevance_score"]) for e in relevant] == [(e["id"], e["relevance_score"]) for e in expected]
+            assert relevant[0]["relevance_score"] == 2 * 2 + 3
+
+            assert sorted(await with_tables._extract_patterns(entries)) == sorted(await without_tables._extract_patterns(entries))
+            assert {"balance", "unity_diversity", "collective_good", "ethics", "wisdom"} <= set(
+                await with_tables._extract_patterns(entries)
+            )
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_tag_aggregates(database_env):
+    async def scenario():
+        db = Database()
+        try:
+            ids = [entry["id"] for entry in await stored_entries(db)]
+            counts = await db.tag_counts(ids[:2], ["concepts", "themes"])
+            assert counts["concepts"] == {"community": 1, "fairness": 1, "justice": 1}
+            assert counts["themes"] == {"collective_good": 1, "ethics": 1}
+
+            scores = await db.score_entries_by_tags(ids, {"concepts": (["FAIRNESS", "respect"], 2), "themes": (["wisdom"], 3)})
+            assert scores == {ids[0]: 2.0, ids[2]: 5.0}
+            assert await db.score_entries_by_tags(ids, {"concepts": ([], 2)}) == {}
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
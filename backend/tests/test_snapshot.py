@@ -0,0 +1,84 @@
+"""
+Corpus snapshots: versioned save, atomic CURRENT swap, pruning and memory-mapped load
+"""
+import os
+from datetime import datetime, timezone
+
+from storage.search_index import InvertedIndex
+from storage.snapshot import CURRENT_FILE, KEEP_VERSIONS, load_snapshot, read_snapshot_meta, save_snapshot
+from storage.vector_index import HashingEmbedder, VectorIndex
+
+ENTRIES = [
+    {"id": "a", "content": "The tortoise shares the harvest with the village", "culture": "yoruba", "category": "folktale", "language": "en"},
+    {"id": "b", "content": "Ananse the spider gathers wisdom in a pot", "culture": "akan", "category": "folktale", "language": "en"},
+    {"id": "c", "content": "Ubuntu: a person is a person through other people", "culture": "zulu", "category": "proverb", "language": "en"},
+]
+
+
+def build_indexes():
+    embedder = HashingEmbedder(dim=64)
+    search_index = InvertedIndex()
+    vector_index = VectorIndex(dim=64)
+    for entry in ENTRIES:
+        search_index.add(entry)
+        vector_index.add(entry["id"], embedder.embed_entry(entry), entry)
+    return embedder, search_index, vector_index
+
+
+def test_load_without_snapshot(tmp_path):
+    assert read_snapshot_meta(str(tmp_path)) is None
+    assert load_snapshot(str(tmp_path)) is None
+
+
+def test_round_trip(tmp_path):
+    embedder, search_index, vector_index = build_indexes()
+    watermark = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    meta = save_snapshot(str(tmp_path), search_index, vector_index, watermark)
+    assert meta["version"] == 1 and meta["entries"] == 3
+
+    loaded_meta, loaded_search, loaded_vectors = load_snapshot(str(tmp_path))
+    assert loaded_meta["watermark"] == watermark
+    assert loaded_search.search("spider wisdom") == search_index.search("spider wisdom")
+    assert loaded_search.search("harvest", filters={"culture": "akan"}) == []
+
+    query = embedder.embed("tortoise harvest")
+    assert loaded_vectors.search(query, k=2) == vector_index.search(query, k=2)
+
+
+def test_snapshot_without_vectors(tmp_path):
+    _, search_index, _ = build_indexes()
+    save_snapshot(str(tmp_path), search_index, None, None)
+
+    meta, loaded_search, loaded_vectors = load_snapshot(str(tmp_path))
+    assert meta["watermark"] is None
+    assert loaded_vectors is None
+    assert len(loaded_search) == 3
+
+
+def test_versions_advance_and_prune(tmp_path):
+    _, search_index, vector_index = build_indexes()
+    for _ in range(KEEP_VERSIONS + 2):
+        meta = save_snapshot(str(tmp_path), search_index, vector_index, None)
+
+    assert meta["version"] == KEEP_VERSIONS + 2
+    assert read_snapshot_meta(str(tmp_path))["path"] == meta["path"]
+    with open(tmp_path / CURRENT_FILE) as f:
+        assert os.path.join(str(tmp_path), f.read().strip()) == meta["path"]
+    versions = sorted(name for name in os.listdir(tmp_path) if name.startswith("v"))
+    assert len(versions) == KEEP_VERSIONS
+    assert os.path.basename(meta["path"]) == versions[-1]
+
+
+def test_loaded_snapshot_survives_newer_saves(tmp_path):
+    _, search_index, vector_index = build_indexes()
+    save_snapshot(str(tmp_path), search_index, vector_index, None)
+    _, reader, _ = load_snapshot(str(tmp_path))
+    expected = reader.search("ubuntu people")
+
+    # The writer moves on until the reader's version is pruned from disk
+    search_index.add({"id": "d", "content": "People of the river", "culture": "igbo", "category": "proverb"})
+    for _ in range(KEEP_VERSIONS + 1):
+        save_snapshot(str(tmp_path), search_index, vector_index, None)
+
+    assert reader.search("ubuntu people") == expected
+    assert len(load_snapshot(str(tmp_path))[1]) == 4
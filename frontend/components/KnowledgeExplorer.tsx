@@ -21,7 +21,10 @@ export default function KnowledgeExplorer() {
     try {
       const [knowledgeRes, culturesRes] = await Promise.all([
         axios.get(`${API_URL}/knowledge/list`, {
-          params: selectedCulture ? { culture: selectedCulture } : {}
+          params: {
+            fields: 'content,culture,category,source,symbolic_representation,ipfs_hash',
+            ...(selectedCulture ? { culture: selectedCulture } : {})
+          }
         }),
         axios.get(`${API_URL}/cultures`)
       ])
@@ -42,7 +42,7 @@ export default function KnowledgeGraph() {
   const loadKnowledgeGraph = async () => {
     try {
       // Fetch all knowledge entries
-      const response = await axios.get(`${API_URL}/knowledge/list?limit=50`)
+      const response = await axios.get(`${API_URL}/knowledge/list?limit=50&fields=culture,concepts,themes`)
       const knowledge = response.data.knowledge
 
       if (!knowledge || knowledge.length === 0) {